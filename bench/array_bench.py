@@ -0,0 +1,59 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+wide Array[N, Model] hierarchy
+
+rows of cells, each cell with a parameterised rule and its own clock, so that the clocked
+simulation has one clock domain per cell with coincident edges
+'''
+
+from purple import Integer, Boolean, Model, Clock, AtomicRuleSimulator, ClockedSimulator
+
+
+def declare(width, height):
+    class Cell(Model):
+        count: Integer[...] = 0
+        carry: Boolean = False
+        clk: Clock[step, reset]
+
+        rules: [step, reset]
+
+        def step(self, n: Integer[1, 4]):
+            self.guard(not self.carry)
+            self.count += n
+            self.carry = self.count > 20
+
+        def reset(self):
+            self.guard(self.carry)
+            self.count = 0
+            self.carry = False
+
+    class Row(Model):
+        cells: width * Cell
+
+    class Grid(Model):
+        rows: height * Row
+
+    return Grid
+
+
+def bench(timer, scale):
+    width, height = 16 * scale, 4
+    with timer.phase('declaration', 1):
+        Grid = declare(width, height)
+    with timer.phase('elaboration', width * height):
+        system = Grid()
+
+    num_steps = 5000 * scale
+    sim = AtomicRuleSimulator(system, random_seed = 1)
+    with timer.phase('atomic', num_steps):
+        sim.run(num_steps, show_print = False)
+
+    num_cycles = 20
+    system = Grid()
+    sim = ClockedSimulator(system, dict(period_ps = 1000), random_seed = 1)
+    with timer.phase('clocked', num_cycles * width * height):
+        sim.run(cycles = num_cycles, show_print = False)
@@ -0,0 +1,112 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+ROB-style checking with StimulusIOTestbenchBase.checksearch
+
+the spec is a reorder buffer which may complete any held entry, showing only its tag, and
+retires completed entries in completion order, showing their payloads
+tags are reused, so that the search has to backtrack when it completes the wrong one of
+two entries with equal tags; the number of completed entries waiting to retire is limited,
+which limits how far back the search has to go
+the stimulus is made by a reference python model of the spec
+'''
+
+import random
+
+from purple import (
+    Integer, Record, Tuple, Model, Port, StimulusIOTestbenchBase, StimulusInput, StimulusOutput,
+    StimulusIOCheckerState,
+)
+
+
+def declare(window, retire_depth, num_tags, num_payloads):
+    Tag = Integer[num_tags]
+    Payload = Integer[num_payloads]
+
+    class Entry(Record):
+        tag: Tag
+        payload: Payload
+
+    class ReorderSpec(Model):
+        held: Tuple[Entry]
+        completed: Tuple[Payload]
+        request: Port[Entry]
+        completion: Port[Tag]
+        retirement: Port[Payload]
+
+        rules: [accept, complete, retire]
+
+        def accept(self):
+            self.guard(len(self.held) < window)
+            self.held.append(self.request)
+
+        def complete(self, slot: Integer[window]):
+            self.guard(slot < len(self.held) and len(self.completed) < retire_depth)
+            entry = self.held.pop(slot)
+            self.completion = entry.tag
+            self.completed.append(entry.payload)
+
+        def retire(self):
+            self.guard(self.completed)
+            self.retirement = self.completed.pop(0)
+
+    class ReorderChecker(StimulusIOTestbenchBase):
+        requests: StimulusInput[Entry]
+        completions: StimulusOutput[Tag]
+        retirements: StimulusOutput[Payload]
+        dut: ReorderSpec[
+            _.request << requests.port_for_spec_input,
+            _.completion >> completions.port_for_spec_output,
+            _.retirement >> retirements.port_for_spec_output,
+        ]
+
+        def stimulus_inputs(self):
+            return (self.requests,)
+
+        def stimulus_outputs(self):
+            return (self.completions, self.retirements)
+
+    return ReorderChecker, Entry
+
+
+def push_stimulus(testbench, Entry, num_entries, window, retire_depth, num_tags, num_payloads, seed):
+    'runs a reference model of the spec, pushing its inputs and outputs'
+    rng = random.Random(seed)
+    held = []
+    completed = []
+    num_accepted = 0
+    time_ps = 0
+    while num_accepted < num_entries or held or completed:
+        time_ps += 1000
+        choice = rng.random()
+        if completed and (choice < 0.5 or len(completed) == retire_depth or num_accepted == num_entries and not held):
+            testbench.retirements.queue.push(completed.pop(0), time_ps)
+        elif num_accepted < num_entries and len(held) < window and (not held or choice < 0.8):
+            entry = Entry(tag = rng.randrange(num_tags), payload = rng.randrange(num_payloads))
+            held.append(entry)
+            testbench.requests.queue.push(entry, time_ps)
+            num_accepted += 1
+        else:
+            entry = held.pop(rng.randrange(len(held)))
+            completed.append(entry.payload)
+            testbench.completions.queue.push(entry.tag, time_ps)
+    testbench.finalise_all_stimulus()
+
+
+def bench(timer, scale):
+    window, retire_depth, num_tags, num_payloads = 4, 2, 2, 16
+    with timer.phase('declaration', 1):
+        ReorderChecker, Entry = declare(window, retire_depth, num_tags, num_payloads)
+    with timer.phase('elaboration', 1):
+        testbench = ReorderChecker()
+
+    num_entries = 200 * scale
+    push_stimulus(testbench, Entry, num_entries, window, retire_depth, num_tags, num_payloads, 1)
+    checker_state = StimulusIOCheckerState(testbench)
+    with timer.phase('checksearch', num_entries):
+        checker_state = testbench.checksearch(checker_state)
+    assert checker_state.passed()
+    timer.phases['checksearch']['rules_tested'] = checker_state.num_invocations
@@ -0,0 +1,43 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+Command line parsing for benchmarks
+
+Also the timer used by every benchmark
+'''
+
+import argparse
+import contextlib
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--bench_name', type = str, default = '', help = 'comma-separated, default is all')
+parser.add_argument('--quick', type = (lambda x: int(x) != 0), default = False)
+parser.add_argument('--history', type = str, default = 'history.json')
+parser.add_argument('--baseline', type = str, default = 'baseline.json')
+parser.add_argument('--save_baseline', type = (lambda x: int(x) != 0), default = False)
+parser.add_argument('--tolerance', type = float, default = 0.25, help = 'fractional slowdown flagged')
+parser.add_argument('--min_seconds', type = float, default = 0.05, help = 'shorter phases are not compared')
+parser.add_argument('--fail_on_regression', type = (lambda x: int(x) != 0), default = False)
+args = parser.parse_args()
+
+
+class Timer:
+    '''records the phases of one benchmark
+
+    each phase is a number of operations (rules, cycles, states, components) and the time
+    taken to do them, from which ops/sec is calculated
+    '''
+    def __init__(self):
+        self.phases = dict() # name:{seconds, ops, ops_per_sec}
+
+    @contextlib.contextmanager
+    def phase(self, name, ops = 1):
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        self.phases[name] = dict(seconds = seconds, ops = ops, ops_per_sec = ops / max(seconds, 1e-9))
+        print(f'    {name:24} {ops:10} ops {seconds:9.3f} s {ops / max(seconds, 1e-9):12.1f} ops/s')
@@ -0,0 +1,115 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+Lean path of the atomic-rule simulator
+
+the same runs with printing off, with and without lean_run
+a bomb (as in tst/bomb_test.py, but re-armed so that it never deadlocks) whose rules are
+mostly guarded, and a chain of handshaked stages passing packet records, a little like
+tst/packet_in_packet_test.py, whose rules are mostly record reads and writes
+'''
+
+import enum
+
+from purple import Integer, Boolean, Enumeration, Record, Model, AtomicRuleSimulator
+
+
+BombState = enum.Enum('BombState', 'Ready Counting Exploded Safe')
+
+
+class Bomb(Model):
+    state: Enumeration[BombState] = BombState.Ready
+    count: Integer[100] = 0
+    num_explosions: Integer[...] = 0
+
+    rules: [prime, countdown, cut_blue_wire, cut_red_wire, rearm]
+
+    def prime(self, countdown_duration: Integer[10, 100]):
+        self.guard(self.state is BombState.Ready)
+        self.count = countdown_duration
+        self.state = BombState.Counting
+
+    def countdown(self):
+        self.guard(self.state is BombState.Counting)
+        self.count -= 1
+        if self.count == 0:
+            self.state = BombState.Exploded
+            self.print('-----BOOM-----')
+
+    def cut_blue_wire(self):
+        self.guard(self.state is BombState.Counting)
+        self.state = BombState.Safe
+        self.print('phew')
+
+    def cut_red_wire(self):
+        self.guard(self.state is BombState.Counting)
+        self.state = BombState.Exploded
+        self.print('-----BADABOOM-----')
+
+    def rearm(self):
+        self.guard(self.state in (BombState.Exploded, BombState.Safe))
+        if self.state is BombState.Exploded:
+            self.num_explosions += 1
+        self.state = BombState.Ready
+
+
+def declare_chain(num_stages):
+    class Flit(Record):
+        tag: Integer[...]
+        hops: Integer[...] = 0
+        last: Boolean = False
+
+    class Stage(Model):
+        flit: Flit
+        valid: Boolean = False
+        forwarded: Integer[...] = 0
+
+    class Chain(Model):
+        stages: num_stages * Stage
+        next_tag: Integer[...] = 0
+        delivered: Integer[...] = 0
+
+        rules: [inject, forward, deliver]
+
+        def inject(self, last: Boolean):
+            first = self.stages[0]
+            self.guard(not first.valid)
+            first.flit = Flit(tag = self.next_tag, last = last)
+            first.valid = True
+            self.next_tag += 1
+
+        def forward(self, s: Integer[num_stages - 1]):
+            stage = self.stages[s]
+            dest = self.stages[s + 1]
+            self.guard(stage.valid and not dest.valid)
+            flit = stage.flit
+            dest.flit = Flit(tag = flit.tag, hops = flit.hops + 1, last = flit.last)
+            dest.valid = True
+            stage.valid = False
+            stage.forwarded += 1
+
+        def deliver(self):
+            stage = self.stages[-1]
+            self.guard(stage.valid)
+            stage.valid = False
+            self.delivered += 1
+
+    return Chain
+
+
+def bench(timer, scale):
+    num_steps = 5000 * scale
+    for lean_run in (False, True):
+        sim = AtomicRuleSimulator(Bomb(), random_seed = 1, lean_run = lean_run)
+        with timer.phase('bomb lean' if lean_run else 'bomb', num_steps):
+            sim.run(num_steps, show_print = False)
+
+    Chain = declare_chain(8)
+    num_steps = 2000 * scale
+    for lean_run in (False, True):
+        sim = AtomicRuleSimulator(Chain(), random_seed = 1, lean_run = lean_run)
+        with timer.phase('chain lean' if lean_run else 'chain', num_steps):
+            sim.run(num_steps, show_print = False)
@@ -0,0 +1,81 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+deep Record and Union nesting
+
+a binary tree of records, each level holding either a further record or a small integer,
+with rules which rebuild paths through the tree and switch union members
+'''
+
+from purple import Integer, Record, Model, Clock, AtomicRuleSimulator, ClockedSimulator
+
+
+def declare(depth):
+    class Level0(Record):
+        a: Integer[16] = 0
+        b: Integer[16] = 0
+
+    level = Level0
+    for d in range(1, depth + 1):
+        class Level(Record):
+            left: level | Integer[4] = 0
+            right: level
+            size: Integer[...] = 0
+        Level.__name__ = f'Level{d}'
+        level = Level
+
+    class Tree(Model):
+        tree: level
+        path_bits: Integer[2**depth] = 0
+        clk: Clock[walk, graft, prune]
+
+        rules: [walk, graft, prune]
+
+        def walk(self, bits: Integer[2**depth], v: Integer[16]):
+            # follow right links, down to the leaf record
+            node = self.tree
+            for _ in range(depth):
+                node.size += 1
+                node = node.right
+            node.a = v
+            node.b = (node.b + bits) % 16
+            self.path_bits = bits
+
+        def graft(self, level: Integer[depth]):
+            # left member becomes a record copied from the right
+            node = self.tree
+            for _ in range(level):
+                node = node.right
+            self.guard(not isinstance(node.left, Record))
+            node.left = node.right
+
+        def prune(self, level: Integer[depth], v: Integer[4]):
+            node = self.tree
+            for _ in range(level):
+                node = node.right
+            self.guard(isinstance(node.left, Record))
+            node.left = v
+
+    return Tree
+
+
+def bench(timer, scale):
+    depth = 6
+    with timer.phase('declaration', depth):
+        Tree = declare(depth)
+    with timer.phase('elaboration', 10):
+        for _ in range(10):
+            system = Tree()
+
+    num_steps = 2000 * scale
+    sim = AtomicRuleSimulator(system, random_seed = 1)
+    with timer.phase('atomic', num_steps):
+        sim.run(num_steps, show_print = False)
+
+    num_cycles = 200 * scale
+    sim = ClockedSimulator(Tree(), dict(period_ps = 1000), random_seed = 1)
+    with timer.phase('clocked', num_cycles):
+        sim.run(cycles = num_cycles, show_print = False)
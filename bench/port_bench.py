@@ -0,0 +1,63 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+port-dense interconnect
+
+a ring of stages, each with several output ports bound to input ports of the next stages,
+so that every rule invocation goes through port writes and handlers in other components
+'''
+
+from purple import Integer, Model, Port, Clock, AtomicRuleSimulator, ClockedSimulator
+
+
+def declare(num_stages):
+    class Stage(Model):
+        total: Integer[...] = 0
+        received: Integer[...] = 0
+        out_near: Port[Integer[8]]
+        out_far: Port[Integer[8]]
+        in_near: Port[Integer[8]] >> take
+        in_far: Port[Integer[8]] >> take
+        clk: Clock[send]
+
+        rules: [send]
+
+        def take(self, v):
+            self.total = (self.total + v) % 1000
+            self.received += 1
+
+        def send(self, v: Integer[8], far: Integer[2]):
+            if far:
+                self.out_far = v
+            else:
+                self.out_near = v
+
+    class Fabric(Model):
+        stages: num_stages * Stage
+        for i in range(num_stages):
+            stages[i].out_near >> stages[(i + 1) % num_stages].in_near
+            stages[i].out_far >> stages[(i + num_stages // 2) % num_stages].in_far
+
+    return Fabric
+
+
+def bench(timer, scale):
+    num_stages = 16 * scale
+    with timer.phase('declaration', 1):
+        Fabric = declare(num_stages)
+    with timer.phase('elaboration', num_stages):
+        system = Fabric()
+
+    num_steps = 5000 * scale
+    sim = AtomicRuleSimulator(system, random_seed = 1)
+    with timer.phase('atomic', num_steps):
+        sim.run(num_steps, show_print = False)
+
+    num_cycles = 20
+    system = Fabric()
+    sim = ClockedSimulator(system, dict(period_ps = 1000), random_seed = 1)
+    with timer.phase('clocked', num_cycles * num_stages):
+        sim.run(cycles = num_cycles, show_print = False)
@@ -0,0 +1,88 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+Tuple-heavy queues
+
+a ring of stages, each with an input queue of packet records, moving packets to the
+next stage's queue and counting them on the way
+the atomic rules move one packet each; the clocked rule moves the whole ring
+'''
+
+from purple import Integer, Record, Tuple, Model, Clock, AtomicRuleSimulator, ClockedSimulator
+
+
+def declare(num_stages, depth):
+    class Packet(Record):
+        tag: Integer[...]
+        hops: Integer[...] = 0
+
+    class Stage(Model):
+        queue: Tuple[Packet]
+        forwarded: Integer[...] = 0
+
+    class Ring(Model):
+        stages: num_stages * Stage
+        next_tag: Integer[...] = 0
+        in_flight: Integer[...] = 0
+        clk: Clock[cycle]
+
+        rules: [inject, forward, deliver]
+
+        def inject(self, s: Integer[num_stages]):
+            # leaving free slots in the ring means a packet can always move
+            stage = self.stages[s]
+            self.guard(len(stage.queue) < depth and self.in_flight < num_stages * (depth - 1))
+            stage.queue.append(Packet(tag = self.next_tag))
+            self.next_tag += 1
+            self.in_flight += 1
+
+        def forward(self, s: Integer[num_stages]):
+            stage = self.stages[s]
+            dest = self.stages[(s + 1) % num_stages]
+            self.guard(stage.queue and len(dest.queue) < depth)
+            packet = stage.queue.pop(0)
+            dest.queue.append(Packet(tag = packet.tag, hops = packet.hops + 1))
+            stage.forwarded += 1
+
+        def deliver(self, s: Integer[num_stages]):
+            stage = self.stages[s]
+            self.guard(stage.queue and stage.queue[0].hops >= num_stages)
+            stage.queue.pop(0)
+            self.in_flight -= 1
+
+        def cycle(self, s: Integer[num_stages]):
+            # the whole ring moves on one clock edge, so one rule
+            heads = [stage.queue[0] if stage.queue else None for stage in self.stages]
+            for i,stage in enumerate(self.stages):
+                dest = self.stages[(i + 1) % num_stages]
+                if heads[i] is not None and len(dest.queue) < depth:
+                    stage.queue.pop(0)
+                    dest.queue.append(Packet(tag = heads[i].tag, hops = heads[i].hops + 1))
+                    stage.forwarded += 1
+            if len(self.stages[s].queue) < depth:
+                self.stages[s].queue.append(Packet(tag = self.next_tag))
+                self.next_tag += 1
+
+    return Ring
+
+
+def bench(timer, scale):
+    num_stages, depth = 8, 8 * scale
+    with timer.phase('declaration', 1):
+        Ring = declare(num_stages, depth)
+    with timer.phase('elaboration', 10):
+        for _ in range(10):
+            system = Ring()
+
+    num_steps = 5000 * scale
+    sim = AtomicRuleSimulator(system, random_seed = 1)
+    with timer.phase('atomic', num_steps):
+        sim.run(num_steps, show_print = False)
+
+    num_cycles = 2000 * scale
+    sim = ClockedSimulator(Ring(), dict(period_ps = 1000), random_seed = 1)
+    with timer.phase('clocked', num_cycles):
+        sim.run(cycles = num_cycles, show_print = False)
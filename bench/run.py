@@ -0,0 +1,150 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Benchmarks
+======================
+
+Benchmark runner
+
+Each benchmark is a python module named xyz_bench.py with a function
+    bench(timer, scale)
+which declares, elaborates and simulates a synthetic model, timing each phase with
+timer.phase(); scale is 1 for --quick 1 and larger otherwise
+
+Each benchmark is run in a forked process so that its peak RSS can be measured
+
+Results are appended to a JSON history file (a list of runs) and compared against a
+baseline file, which is written by --save_baseline 1
+A phase is flagged as a regression if its ops/sec is lower than the baseline by more than
+the tolerance, unless it is too short to time reliably
+Timings are only comparable between runs on the same machine with the same --quick setting
+'''
+
+import datetime
+import importlib
+import json
+import multiprocessing
+import pathlib
+import platform
+import resource
+import subprocess
+import sys
+
+import cli
+
+assert __name__ == '__main__'
+
+here = pathlib.Path(__file__).parent
+
+
+def bench_names():
+    if cli.args.bench_name:
+        return cli.args.bench_name.split(',')
+    return sorted(p.name[:-len('_bench.py')] for p in here.glob('*_bench.py'))
+
+
+def run_one(name, connection):
+    module = importlib.import_module(name + '_bench')
+    timer = cli.Timer()
+    module.bench(timer, 1 if cli.args.quick else 10)
+    # kilobytes on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss //= 1024
+    connection.send(dict(phases = timer.phases, peak_rss_kb = peak_rss))
+
+
+def run_forked(name):
+    context = multiprocessing.get_context('fork')
+    parent_end, child_end = context.Pipe()
+    process = context.Process(target = run_one, args = (name, child_end))
+    process.start()
+    child_end.close()
+    try:
+        result = parent_end.recv()
+    except EOFError:
+        result = None
+    process.join()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd = here, capture_output = True, text = True,
+        ).stdout.strip()
+    except OSError:
+        return ''
+
+
+def read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def write_json(path, content):
+    with open(path, 'w') as f:
+        json.dump(content, f, indent = 1)
+
+
+def regressions(results, baseline, tolerance, min_seconds):
+    'list of (bench, phase, ops_per_sec, baseline ops_per_sec)'
+    found = []
+    for name,result in results.items():
+        base = baseline.get(name, None)
+        if base is None or result is None:
+            continue
+        for phase,timing in result['phases'].items():
+            base_timing = base['phases'].get(phase, None)
+            if base_timing is None or min(timing['seconds'], base_timing['seconds']) < min_seconds:
+                continue
+            if timing['ops_per_sec'] < base_timing['ops_per_sec'] * (1 - tolerance):
+                found.append((name, phase, timing['ops_per_sec'], base_timing['ops_per_sec']))
+    return found
+
+
+results = dict()
+for name in bench_names():
+    print('===============', name)
+    results[name] = run_forked(name)
+    if results[name] is None:
+        print('===============', name, 'FAIL')
+    else:
+        print('    peak RSS', results[name]['peak_rss_kb'], 'kB')
+
+history_path = here / cli.args.history
+history = read_json(history_path, [])
+history.append(dict(
+    time = datetime.datetime.now().isoformat(timespec = 'seconds'),
+    commit = git_commit(),
+    python = platform.python_version(),
+    machine = platform.node(),
+    quick = cli.args.quick,
+    results = results,
+))
+write_json(history_path, history)
+
+baseline_path = here / cli.args.baseline
+if cli.args.save_baseline:
+    write_json(baseline_path, dict(quick = cli.args.quick, results = results))
+    print('baseline saved to', baseline_path)
+else:
+    baseline = read_json(baseline_path, None)
+    if baseline is None:
+        print('no baseline, save one with --save_baseline 1')
+    elif baseline['quick'] != cli.args.quick:
+        print('baseline was made with a different --quick setting, not compared')
+    else:
+        found = regressions(results, baseline['results'], cli.args.tolerance, cli.args.min_seconds)
+        for name,phase,ops_per_sec,base_ops_per_sec in found:
+            print(f'REGRESSION {name} {phase}: {ops_per_sec:.1f} ops/s, baseline {base_ops_per_sec:.1f} ops/s')
+        if not found:
+            print('no regressions against baseline')
+        if found and cli.args.fail_on_regression:
+            sys.exit(1)
+
+if any(r is None for r in results.values()):
+    sys.exit(1)
@@ -47,14 +47,9 @@ FIXME
             x: MyRecord | Const[None] # needs "if x is None"  maybe allow (MyRecord | None)
             y: Optional[MyRecord] # same but has a method y.is_valid() which may not fly for Leaf
             z: Optional[MyRecordorLeaf] # syntactic sugar for Const[None]
-    rules with parameters get very slow
-        rather than generating a separate rule for each parameter set during elaboration
-        choose a parameter set after rule selection, by randomisation of record/leaf
-        saves memory, saves startup time, might increase simulation time
     coverage definition methods
     array with enum keys
             myarray: Array[enum_class, element_class] = {dict_of_initial_values}
-    save/restore
     ability to suppress a rule in subclass
     cosimulation with Verilog-DPI
     does Interface generalise to using registered-output port and initial values?
@@ -198,3 +193,6 @@ from .parameterise import *
 from .interface import *
 from .simulator import *
 from .verif import *
+from .snapshot import *
+from .regression import *
+from .explorer import *
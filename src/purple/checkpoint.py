@@ -0,0 +1,129 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Compact binary checkpoints of a simulation, used by SimulatorBase.save() and restore()
+
+A checkpoint holds
+    every leaf value, by leaf id (elaboration order, see leaf_table.py)
+    the simulator random number generator state and seed
+    simulator attributes such as num_invocations and time_ps
+    clock event times, counts and periods, in find_clock() order
+
+Leaf values are converted to plain python scalars and tuples by their state types
+(_dp_encode_value) and serialised with marshal, optionally compressed with zlib
+A checkpoint can only be restored into a system elaborated from the same declarations
+
+Python hash values differ between processes, so the model state hash is not saved but is
+updated on restore as each leaf changes
+
+Stimulus queue storage is shared with the implementation model and is not saved
+'''
+
+import marshal
+import zlib
+
+from . import common, rule
+
+MAGIC = b'PURPLECK'
+VERSION = 1
+
+CheckpointMismatch = common.PurpleException.subclass('CheckpointMismatch')
+
+
+def leaf_state_type(component, leaf_name):
+    return type(component)._dp_state_types[leaf_name]
+
+
+def encode_leaves(system):
+    table = system._dp_leaf_table
+    return tuple(
+        leaf_state_type(c, n)._dp_encode_value(object.__getattribute__(c, n))
+        for c,n in zip(table.components, table.names)
+    )
+
+
+def decode_leaves(system, leaves):
+    table = system._dp_leaf_table
+    CheckpointMismatch.insist(len(leaves) == len(table), 'checkpoint leaves do not match the system')
+    decode_changes(system, enumerate(leaves))
+
+
+def decode_changes(system, changes):
+    'set leaves from (leaf_id, plain encoding) pairs, updating the model state hash'
+    table = system._dp_leaf_table
+    for leaf_id,plain in changes:
+        component = table.components[leaf_id]
+        leaf_name = table.names[leaf_id]
+        current = object.__getattribute__(component, leaf_name)
+        value = leaf_state_type(component, leaf_name)._dp_decode_value(component, leaf_name, plain)
+        change = rule.LeafStateChange(table, leaf_id, current, value)
+        change.update_model_state_hash(current, value)
+        component._dp_raw_setattr(leaf_name, value)
+
+
+def encode(simulator):
+    system = simulator.system
+    assert system._dp_current_invocation is None, 'cannot save a checkpoint inside a rule'
+    return dict(
+        version = VERSION,
+        leaves = encode_leaves(system),
+        seed = simulator.seed,
+        random_state = simulator.rand_gen.getstate(),
+        simulator_state = simulator.checkpoint_state(),
+        clocks = tuple(
+            (c.next_event_time_ps, c.num_events, getattr(c, 'period_ps', None))
+            for c in system.find_clock()
+        ),
+    )
+
+
+def decode(simulator, content):
+    system = simulator.system
+    assert system._dp_current_invocation is None, 'cannot restore a checkpoint inside a rule'
+    CheckpointMismatch.insist(content['version'] == VERSION, 'unsupported checkpoint version', content['version'])
+    clocks = tuple(system.find_clock())
+    CheckpointMismatch.insist(len(clocks) == len(content['clocks']), 'checkpoint clocks do not match the system')
+
+    decode_leaves(system, content['leaves'])
+    simulator.seed = content['seed']
+    simulator.rand_gen.setstate(content['random_state'])
+    for clock,(next_event_time_ps, num_events, period_ps) in zip(clocks, content['clocks']):
+        clock.next_event_time_ps = next_event_time_ps
+        clock.num_events = num_events
+        if period_ps is not None:
+            clock.period_ps = period_ps
+    simulator.restore_checkpoint_state(content['simulator_state'])
+
+
+def to_bytes(content, compress = True):
+    data = marshal.dumps(content)
+    if compress:
+        data = zlib.compress(data, 1)
+    return MAGIC + bytes((compress,)) + data
+
+
+def from_bytes(data):
+    CheckpointMismatch.insist(data[:len(MAGIC)] == MAGIC, 'not a purple checkpoint')
+    compressed = data[len(MAGIC)]
+    data = data[len(MAGIC) + 1:]
+    if compressed:
+        data = zlib.decompress(data)
+    return marshal.loads(data)
+
+
+def write(destination, data):
+    if hasattr(destination, 'write'):
+        destination.write(data)
+    else:
+        with open(destination, 'wb') as f:
+            f.write(data)
+
+
+def read(source):
+    if hasattr(source, 'read'):
+        return source.read()
+    with open(source, 'rb') as f:
+        return f.read()
@@ -17,7 +17,9 @@ contains the actual client objects (rules) sensitive to the clock
 
 import inspect
 
-from . import rule
+from . import common, rule
+
+WriteConflict = common.PurpleException.subclass('WriteConflict')
 
 
 class Clock:
@@ -26,10 +28,13 @@ class Clock:
         self.driven_by_another_clock = False
         self.next_event_time_ps = 0
         self.num_events = 0
-        self.rules = rules
         if elaborated:
-            rule_methods = set(r.method for r in rules)
-            self.rules_by_method = {m:[r for r in rules if r.method is m] for m in rule_methods}
+            # rules is a list of ParameterisedRule, each a sequence of Rule
+            self.parameterised_rules = rules
+            self.rules = common.ChainSequence(rules)
+            self.rules_by_method = {r.method:r for r in rules}
+        else:
+            self.rules = rules
 
     def __class_getitem__(cls, client_refs):
         # called on declaration
@@ -38,7 +43,7 @@ class Clock:
         return cls(client_refs)
 
     def elaborate(self, owner):
-        '''create a useable clock object with a list of rule objects
+        '''create a useable clock object with a list of parameterised rule objects
 
         must be called after state elaboration
         flag any downstream clocks as not directly visible from top-level
@@ -64,12 +69,12 @@ class Clock:
                         client = client._dp_clocks[n]
                 if isinstance(client, Clock):
                     client.driven_by_another_clock = True
-                    rules.extend(client.rules)
+                    rules.extend(client.parameterised_rules)
                     continue
                 else:
                     rule_name = cref.name[-1]
 
-            rules.extend(rule.construct_all(rule_owner, rule_name))
+            rules.append(rule.construct_all(rule_owner, rule_name))
 
         return type(self)(self.client_refs, rules, elaborated = True)
 
@@ -77,22 +82,36 @@ class Clock:
         self.period_ps = period_ps
         self.next_event_time_ps += phase_ps
 
-    def event(self, selected_rules, show_print = True, print_headers = True):
+    def event(self, selected_rules, show_print = True, print_headers = True, buffered = False, evaluate = None):
         '''clock event
 
         invoke all selected bound rules
             revert system state after each one so they are all concurrent
         re-apply all system state changes
         update next-event time of clock object
+        return the committed invocations
+
+        if buffered, rule writes are only checked and hashed when committed, once, and a leaf
+        written by more than one rule raises WriteConflict
+
+        evaluate(clock, selected_rules) can replace the invocation of the selected rules here,
+        returning the uncommitted invocations that were not guarded, in order (see
+        ParallelEdgeEvaluator in simulator.py)
         '''
         assert not self.driven_by_another_clock
 
-        successful = []
-        for r in selected_rules:
-            inv = r.invoke(check = True, print_headers = False, show_print = False)
-            if not inv.guarded:
-                inv.revert_state()
-                successful.append(inv)
+        if evaluate is None:
+            successful = []
+            for r in selected_rules:
+                inv = r.invoke(check = True, print_headers = False, show_print = False, buffered = buffered)
+                if not inv.guarded:
+                    inv.revert_state()
+                    successful.append(inv)
+        else:
+            successful = evaluate(self, selected_rules)
+
+        if buffered:
+            self.check_write_conflicts(successful)
 
         for inv in successful:
             inv.apply_state()
@@ -101,6 +120,18 @@ class Clock:
 
         self.next_event_time_ps += self.period_ps
         self.num_events += 1
+        return successful
+
+    @staticmethod
+    def check_write_conflicts(invocations):
+        writers = dict() # leaf_id:invocation
+        for inv in invocations:
+            for leaf_id in inv.state_changes:
+                other = writers.setdefault(leaf_id, inv)
+                if other is not inv:
+                    raise WriteConflict(
+                        f'{inv.leaf_table.full_name(leaf_id)} written by {other.rule} and {inv.rule} on one clock edge'
+                    )
 
     def __lt__(self, other):
         # allows use of min() to find next clock that fires
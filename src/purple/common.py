@@ -9,9 +9,13 @@ constant (singleton) objects used in Purple
 exception classes
 
 base class for purple components with any methods that are shared eg by Model and Record
+
+indexable sequences built on demand, for large sets of possible values and rules
 '''
 
+import bisect
 import inspect
+from collections.abc import Sequence
 
 
 class FixedConstant:
@@ -52,6 +56,11 @@ GuardFailed = PurpleException.subclass('GuardFailed')
 ComponentName = tuple[str]  ## FIXME
 
 
+# callable(component, attr_name) while a rule invocation is recording its state reads
+# None otherwise, so that untracked simulation only pays for this test
+state_read_hook = None
+
+
 class PurpleComponent:
     '''base class used for detecting Purple classes
 
@@ -91,6 +100,8 @@ class PurpleComponent:
 
     def _dp_raw_getattr(self, attr_name):
         'immediate get-attribute with checks bypassed'
+        if state_read_hook is not None:
+            state_read_hook(self, attr_name)
         return object.__getattribute__(self, attr_name)
 
     def _dp_raw_setattr(self, attr_name, value):
@@ -142,12 +153,16 @@ class PurpleComponent:
             # this test is to break infinite recursion
             return value
         else:
-            try:
-                state_type = self._dp_state_types[attr_name]
+            state_type = object.__getattribute__(self, '_dp_state_types').get(attr_name, None)
+            if state_type is None:
+                return value
+            if state_read_hook is not None:
+                state_read_hook(self, attr_name)
+            if value is UnDefined or state_type._dp_checks_reads:
+                # hierarchical name only made when it may be needed
                 full_name = getattr(self, 'name', ()) + (attr_name,)
                 return state_type._dp_instance_checkattr(value, full_name)
-            except KeyError:
-                return value
+            return value
 
     @classmethod
     def _dp_elaborate(cls,
@@ -155,6 +170,9 @@ class PurpleComponent:
     ):
         assert False, 'abstract base method called; not a static-state class'
 
+    # set if _dp_instance_checkattr() does more than check for UnDefined
+    _dp_checks_reads = False
+
     @classmethod
     def _dp_instance_checkattr(cls, value, name = ()):
         ReadUnDefined.insist(value is not UnDefined, f'Error reading undefined attribute: {".".join(name)}')
@@ -168,6 +186,47 @@ class PurpleComponent:
     def _dp_all_possible_values(cls):
         assert False, 'abstract base method called; not a class with finite possible values'
 
+    @classmethod
+    def _dp_indexable_possible_values(cls):
+        'all possible values as a sequence with len() and indexing, in _dp_all_possible_values order'
+        values = cls._dp_all_possible_values()
+        if isinstance(values, (range, tuple, list)):
+            return values
+        return tuple(values)
+
+    @classmethod
+    def _dp_encode_value(cls, value):
+        '''plain form of a value of this state type, for checkpoints, made of python scalars and tuples
+
+        scalars (int, bool, str, etc) are usually returned unchanged
+        anything else is a tuple whose first element is a tag string
+        '''
+        if value is UnDefined:
+            return ('u',)
+        if value is UnSelected:
+            return ('s',)
+        return cls._dp_encode_defined_value(value)
+
+    @classmethod
+    def _dp_decode_value(cls, owner, name, plain):
+        '''inverse of _dp_encode_value()
+
+        owner and name are where the value will be stored (if known), as for casting
+        '''
+        if plain == ('u',):
+            return UnDefined
+        if plain == ('s',):
+            return UnSelected
+        return cls._dp_decode_defined_value(owner, name, plain)
+
+    @classmethod
+    def _dp_encode_defined_value(cls, value):
+        assert False, f'abstract base method called; cannot encode a value of {cls}'
+
+    @classmethod
+    def _dp_decode_defined_value(cls, owner, name, plain):
+        assert False, f'abstract base method called; cannot decode a value of {cls}'
+
     @classmethod
     def _dp_bind_local_handler(cls, handler_name):
         assert False, 'abstract base method called; not a port-class'
@@ -329,14 +388,100 @@ class LocalGuards_ContextManager:
         self.current_inv = top._dp_current_invocation
 
     def __enter__(self):
-        self.state_changes_on_enter = self.current_inv.state_changes.copy()
-        self.printout_on_enter = self.current_inv.printout.copy()
+        self.mark_on_enter = self.current_inv.mark()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         if exc_type is GuardFailed:
-            self.current_inv.revert_state()
-            self.current_inv.state_changes = self.state_changes_on_enter
-            self.current_inv.apply_state()
-            self.current_inv.printout = self.printout_on_enter
+            self.current_inv.rollback(self.mark_on_enter)
             return True
+
+
+def sequence_size(sequence):
+    'like len(), but not limited to sys.maxsize for sequences defined here'
+    if isinstance(sequence, (ProductSequence, ChainSequence)):
+        return sequence.size
+    return len(sequence)
+
+
+class ProductSequence(Sequence):
+    '''cartesian product of sequences, with elements made on demand
+
+    order is the same as nested iteration, ie the first sequence is most significant
+    make() converts a tuple of values, one from each sequence, to an element
+    '''
+    def __init__(self, sequences, make = tuple):
+        self.sequences = tuple(sequences)
+        self.sizes = tuple(sequence_size(s) for s in self.sequences)
+        self.make = make
+        self.size = 1
+        for n in self.sizes:
+            self.size *= n
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.make(self.values_at(index))
+
+    def values_at(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(f'index out of range for sequence of size {self.size}')
+        values = []
+        for sequence,n in zip(reversed(self.sequences), reversed(self.sizes)):
+            index,i = divmod(index, n)
+            values.append(sequence[i])
+        return tuple(reversed(values))
+
+    def __iter__(self):
+        for values in self.iter_values(self.sequences):
+            yield self.make(values)
+
+    @classmethod
+    def iter_values(cls, sequences):
+        if not sequences:
+            yield ()
+        else:
+            for first_value in sequences[0]:
+                for other_values in cls.iter_values(sequences[1:]):
+                    yield (first_value, *other_values)
+
+
+class ChainSequence(Sequence):
+    'concatenation of sequences, without copying them'
+    def __init__(self, sequences):
+        self.sequences = tuple(sequences)
+        self.offsets = []
+        self.size = 0
+        for s in self.sequences:
+            self.offsets.append(self.size)
+            self.size += sequence_size(s)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        n,local_index = self.locate(index)
+        return self.sequences[n][local_index]
+
+    def locate(self, index):
+        'which sequence an index falls in, and the index within it'
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(f'index out of range for sequence of size {self.size}')
+        # empty sequences share an offset with the next one; bisect_right skips them
+        n = bisect.bisect_right(self.offsets, index) - 1
+        return n, index - self.offsets[n]
+
+    def __iter__(self):
+        for s in self.sequences:
+            yield from s
+
+    def __add__(self, other):
+        return tuple(self) + tuple(other)
+
+    def __radd__(self, other):
+        return tuple(other) + tuple(self)
@@ -0,0 +1,207 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+State coverage collected during simulation, see SimulatorBase.collect_coverage()
+
+    visited states, identified by the model state hash (see rule.py)
+        kept exactly in a set up to exact_limit states
+        beyond that, estimated by a HyperLogLog counter with 2**precision registers
+    number of times each rule was committed, by rule name
+    histogram of values taken by each leaf, by leaf id (names in leaf_names)
+        values are keyed by their checkpoint encoding (see checkpoint.py), usually just the
+        value for integer and boolean leaves
+        at most max_values_per_leaf different values per leaf, others counted together
+
+Work per committed invocation is constant apart from the leaves written
+
+Results can be pickled (eg from regression worker processes) and merged
+The model state hash uses python string hashes, so coverage from different processes can only
+be merged if they share the hash seed, eg forked from one parent (as in regression.py) or run
+with the same PYTHONHASHSEED
+'''
+
+import math
+
+from . import common
+
+MASK_64 = (1 << 64) - 1
+
+OTHER_VALUES = ('other',)
+
+CoverageMismatch = common.PurpleException.subclass('CoverageMismatch')
+
+
+def mix_64(h):
+    'fold a model state hash into 64 well-mixed bits (splitmix64 finaliser)'
+    h &= MASK_64
+    h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & MASK_64
+    h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & MASK_64
+    return h ^ (h >> 31)
+
+
+class HyperLogLog:
+    'estimate of the number of distinct 64-bit values added'
+    def __init__(self, precision = 14):
+        assert 4 <= precision <= 18
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, h):
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        CoverageMismatch.insist(other.precision == self.precision, 'HyperLogLog precision differs')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def copy(self):
+        c = HyperLogLog(self.precision)
+        c.registers[:] = self.registers
+        return c
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        e = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        num_zero = self.registers.count(0)
+        if e <= 2.5 * m and num_zero:
+            # small range correction
+            e = m * math.log(m / num_zero)
+        return int(e + 0.5)
+
+
+class StateCoverage:
+    def __init__(self, system,
+        exact_limit = 100000,
+        precision = 14,
+        histograms = True,
+        max_values_per_leaf = 256,
+    ):
+        self.exact_limit = exact_limit
+        self.states = set()
+        self.estimator = None
+        self.precision = precision
+        self.rule_counts = dict() # rule name:number of commits
+        self.rule_names = dict() # (id(parameterised_rule), param_index):rule name
+        self.max_values_per_leaf = max_values_per_leaf
+
+        self.leaf_table = table = system._dp_leaf_table
+        self.system = system
+        self.leaf_names = [table.full_name(i) for i in range(len(table))]
+        self.state_types = [type(c)._dp_state_types[n] for c,n in zip(table.components, table.names)]
+        self.histograms = dict() if histograms else None # leaf_id:{value:count}
+
+        # initial state
+        self.add_state(system._dp_model_state_hash)
+        if histograms:
+            for leaf_id,(c,n) in enumerate(zip(table.components, table.names)):
+                self.add_value(leaf_id, object.__getattribute__(c, n))
+
+    def __getstate__(self):
+        # no references to the system, so can be sent between processes
+        state = dict(vars(self))
+        for n in ('system', 'leaf_table', 'state_types', 'rule_names'):
+            state[n] = None
+        return state
+
+    def record(self, invocations):
+        'called after each committed step, with its invocations'
+        for invocation in invocations:
+            rule = invocation.rule
+            key = id(rule.parameterised_rule), rule.param_index
+            name = self.rule_names.get(key, None)
+            if name is None:
+                name = self.rule_names[key] = str(rule)
+            self.rule_counts[name] = self.rule_counts.get(name, 0) + 1
+            if self.histograms is not None:
+                for leaf_id,change in invocation.state_changes.items():
+                    self.add_value(leaf_id, change.value_after)
+        self.add_state(self.system._dp_model_state_hash)
+
+    def add_state(self, model_state_hash):
+        h = mix_64(model_state_hash)
+        if self.estimator is None:
+            self.states.add(h)
+            if len(self.states) > self.exact_limit:
+                self.switch_to_estimate()
+        else:
+            self.estimator.add(h)
+
+    def switch_to_estimate(self):
+        self.estimator = HyperLogLog(self.precision)
+        for h in self.states:
+            self.estimator.add(h)
+        self.states = None
+
+    def add_value(self, leaf_id, value):
+        key = self.state_types[leaf_id]._dp_encode_value(value)
+        histogram = self.histograms.setdefault(leaf_id, dict())
+        if key not in histogram and len(histogram) >= self.max_values_per_leaf:
+            key = OTHER_VALUES
+        histogram[key] = histogram.get(key, 0) + 1
+
+    @property
+    def exact(self):
+        return self.estimator is None
+
+    @property
+    def num_states(self):
+        'number of distinct states visited, estimated if not exact'
+        return len(self.states) if self.exact else self.estimator.estimate()
+
+    def leaf_histogram(self, leaf_name):
+        'histogram of the values of a leaf, by full name (eg "top.sub.leaf")'
+        return self.histograms.get(self.leaf_names.index(leaf_name), dict())
+
+    def copy(self):
+        c = object.__new__(type(self))
+        vars(c).update(vars(self))
+        c.states = None if self.states is None else set(self.states)
+        c.estimator = None if self.estimator is None else self.estimator.copy()
+        c.rule_counts = dict(self.rule_counts)
+        if self.histograms is not None:
+            c.histograms = {i:dict(h) for i,h in self.histograms.items()}
+        return c
+
+    def merge(self, other):
+        'add the coverage of another run of the same system into this'
+        CoverageMismatch.insist(self.leaf_names == other.leaf_names, 'coverage of a different system')
+        if self.exact and other.exact and len(self.states | other.states) <= self.exact_limit:
+            self.states |= other.states
+        else:
+            if self.exact:
+                self.switch_to_estimate()
+            if other.exact:
+                for h in other.states:
+                    self.estimator.add(h)
+            else:
+                self.estimator.merge(other.estimator)
+
+        for name,count in other.rule_counts.items():
+            self.rule_counts[name] = self.rule_counts.get(name, 0) + count
+
+        if self.histograms is not None and other.histograms is not None:
+            for leaf_id,other_histogram in other.histograms.items():
+                histogram = self.histograms.setdefault(leaf_id, dict())
+                for key,count in other_histogram.items():
+                    if key not in histogram and len(histogram) >= self.max_values_per_leaf:
+                        key = OTHER_VALUES
+                    histogram[key] = histogram.get(key, 0) + count
+
+    def show(self, max_rules = 20, max_values = 10):
+        print('** state coverage **')
+        print('  states visited:', self.num_states, '' if self.exact else '(estimate)')
+        print('  rules committed:', sum(self.rule_counts.values()), 'by', len(self.rule_counts), 'different rules')
+        for name,count in sorted(self.rule_counts.items(), key = lambda x: -x[1])[:max_rules]:
+            print('   ', count, name)
+        if self.histograms is not None:
+            print('  leaf values:')
+            for leaf_id,histogram in sorted(self.histograms.items()):
+                values = sorted(histogram.items(), key = lambda x: -x[1])
+                print('   ', self.leaf_names[leaf_id], len(histogram), 'values', values[:max_values])
@@ -0,0 +1,359 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Exhaustive exploration of the reachable state space of a system of atomic rules
+
+    explorer = StateSpaceExplorer(Top(), invariants = [lambda top: top.x <= top.limit])
+    result = explorer.explore()
+    result.show()
+
+Breadth-first (shortest witness traces) or depth-first, from the current system state, over
+every rule of the system; reports
+    deadlock states (no rule enabled)
+    invariant violations (an invariant returns False or raises AssertionError)
+    exceptions raised by rules
+each with a witness trace of rules from the initial state
+Exploration stops at the first violation or exception unless stop_on_failure is False, but not
+at deadlocks, which may be expected; only max_witnesses deadlocks are kept
+
+Bounded by max_depth (number of rules from the initial state) and by max_states, which also
+bounds memory to roughly 4 * (number of leaves) + 100 bytes per state
+
+States are stored packed: each leaf value is interned per leaf, by its checkpoint encoding
+(see checkpoint.py), as a small integer code, and a state is a run of codes in one flat array
+States are deduplicated by model state hash (modulo 2**64, so it can also be stored in an
+array) and then by comparing codes
+
+With num_workers, states are expanded by forked worker processes (see replica.py) which are
+sent the codes of the states to expand; new interned values are sent as their encodings and
+results come back as encodings, so no leaf values cross between processes
+'''
+
+import array
+import collections
+
+from . import replica
+
+MASK_64 = (1 << 64) - 1
+
+
+class ExplorationResult:
+    def __init__(self, explorer):
+        self.num_states = explorer.num_states
+        self.num_transitions = explorer.num_transitions
+        self.max_depth = max(explorer.depths, default = 0)
+        self.num_depth_limited = explorer.num_depth_limited
+        self.reached_max_states = explorer.reached_max_states
+        self.stopped = explorer.stopped
+        self.num_deadlocks = explorer.num_deadlocks
+
+        # (state_id, witness trace) and for violations and errors also a description
+        self.deadlocks = [(i, explorer.trace(i)) for i in explorer.deadlocks]
+        self.violations = [(i, explorer.trace(i), name) for i,name in explorer.violations]
+        self.errors = [
+            (i, explorer.trace(i) + [explorer.rules[rule_index]], message)
+            for i,rule_index,message in explorer.errors
+        ]
+
+    @property
+    def complete(self):
+        'every reachable state was explored'
+        return not (self.num_depth_limited or self.reached_max_states or self.stopped)
+
+    @property
+    def passed(self):
+        return not (self.deadlocks or self.violations or self.errors)
+
+    def show(self, max_trace_length = 20):
+        print('** state space exploration **')
+        print('  states:', self.num_states, ' transitions:', self.num_transitions, ' depth:', self.max_depth)
+        if self.num_depth_limited:
+            print('  incomplete:', self.num_depth_limited, 'states at depth limit')
+        if self.reached_max_states:
+            print('  incomplete: state limit reached')
+        if self.stopped:
+            print('  incomplete: stopped at first failure')
+        print('  deadlocks:', self.num_deadlocks, ' violations:', len(self.violations), ' errors:', len(self.errors))
+        failures = [(f'deadlock in state {i}', t) for i,t in self.deadlocks]
+        failures.extend((f'{name} violated in state {i}', t) for i,t,name in self.violations)
+        failures.extend((f'{message} from state {i}', t) for i,t,message in self.errors)
+        for description,trace in failures:
+            print('   ', description, 'after', len(trace), 'rules')
+            for r in trace[-max_trace_length:]:
+                print('       ', r)
+
+
+class StateSpaceExplorer:
+    def __init__(self, system,
+        invariants = (),
+        depth_first = False,
+        max_depth = None,
+        max_states = 10000000,
+        num_workers = 0,
+        batch_size = 64,
+        stop_on_failure = True,
+        max_witnesses = 10,
+    ):
+        self.system = system
+        self.invariants = list(invariants)
+        self.depth_first = depth_first
+        self.max_depth = max_depth
+        self.max_states = max_states
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.stop_on_failure = stop_on_failure
+        self.max_witnesses = max_witnesses
+
+        self.rules = list(system.rule_sequence())
+        table = system._dp_leaf_table
+        self.components = table.components
+        self.leaf_names = table.names
+        self.state_types = [type(c)._dp_state_types[n] for c,n in zip(table.components, table.names)]
+        self.num_leaves = len(table)
+
+        # interned leaf values, per leaf: encoding:code and code:encoding (and decoded value)
+        self.codes_by_plain = [dict() for _ in range(self.num_leaves)]
+        self.plains = [[] for _ in range(self.num_leaves)]
+        self.values = [[] for _ in range(self.num_leaves)]
+        self.interned = [] # (leaf_id, plain) in the order interned, for workers
+
+        # packed states
+        self.codes = array.array('I')
+        self.hashes = array.array('Q')
+        self.parents = array.array('q')
+        self.parent_rules = array.array('q')
+        self.depths = array.array('I')
+        self.index = dict() # hash:state_id
+        self.collisions = dict() # bytes of codes:state_id, for a different state with an indexed hash
+
+        self.current_codes = None
+        self.num_transitions = 0
+        self.num_depth_limited = 0
+        self.num_deadlocks = 0
+        self.reached_max_states = False
+        self.stopped = False
+        self.deadlocks = []
+        self.violations = []
+        self.errors = []
+
+    @property
+    def num_states(self):
+        return len(self.hashes)
+
+    def explore(self):
+        'explore from the current system state, which is restored afterwards'
+        system = self.system
+        assert system._dp_current_invocation is None, 'cannot explore inside a rule'
+        initial_hash = system._dp_model_state_hash
+        initial_values = [object.__getattribute__(c, n) for c,n in zip(self.components, self.leaf_names)]
+
+        codes = [self.intern(i, self.encode(i, v)) for i,v in enumerate(initial_values)]
+        for leaf_id,(code,v) in enumerate(zip(codes, initial_values)):
+            self.values[leaf_id][code] = v
+        self.current_codes = list(codes)
+        self.add_state(codes, initial_hash & MASK_64, -1, -1, 0)
+        violated = self.check_invariants()
+        if violated is not None:
+            self.violations.append((0, violated))
+        else:
+            self.search()
+
+        for leaf_id,value in enumerate(initial_values):
+            self.components[leaf_id]._dp_raw_setattr(self.leaf_names[leaf_id], value)
+        system._dp_raw_setattr('_dp_model_state_hash', initial_hash)
+        self.current_codes = None
+        return ExplorationResult(self)
+
+    def search(self):
+        frontier = collections.deque([0])
+        workers = None
+        if self.num_workers:
+            workers = replica.ReplicaWorkers(self.num_workers, self.worker_main, self)
+            num_synced = len(self.interned)
+        try:
+            while frontier and not self.stopped:
+                num_batch = self.batch_size * max(self.num_workers, 1)
+                if self.depth_first:
+                    batch = [frontier.pop() for _ in range(min(num_batch, len(frontier)))]
+                else:
+                    batch = [frontier.popleft() for _ in range(min(num_batch, len(frontier)))]
+                requests = [(self.state_codes(i), self.hashes[i]) for i in batch]
+
+                if workers is None:
+                    expanded = [self.expand(*r) for r in requests]
+                else:
+                    new_interned = self.interned[num_synced:]
+                    num_synced = len(self.interned)
+                    ranges = replica.split_range(0, len(requests), len(workers))
+                    for w,(start,stop) in enumerate(ranges):
+                        workers.send(w, (new_interned, requests[start:stop]))
+                    expanded = []
+                    for w in range(len(workers)):
+                        reply = workers.recv(w)
+                        assert not isinstance(reply, str), f'state expansion failed in worker: {reply}'
+                        expanded.extend(reply)
+
+                for state_id,(codes,_),successors in zip(batch, requests, expanded):
+                    self.absorb(state_id, codes, successors, frontier)
+                    if self.stopped:
+                        break
+        finally:
+            if workers is not None:
+                workers.close()
+
+    def absorb(self, state_id, codes, successors, frontier):
+        'record the successors of an expanded state'
+        depth = self.depths[state_id] + 1
+        num_enabled = 0
+        for rule_index,model_state_hash,changes,failure in successors:
+            if changes is None:
+                # rule raised an exception
+                self.errors.append((state_id, rule_index, failure))
+                self.stopped = self.stop_on_failure
+                continue
+            num_enabled += 1
+            self.num_transitions += 1
+            new_codes = list(codes)
+            for leaf_id,plain in changes:
+                new_codes[leaf_id] = self.intern(leaf_id, plain)
+            if self.find_state(new_codes, model_state_hash) is not None:
+                continue
+            if self.num_states >= self.max_states:
+                self.reached_max_states = True
+                continue
+            new_id = self.add_state(new_codes, model_state_hash, state_id, rule_index, depth)
+            if failure is not None:
+                self.violations.append((new_id, failure))
+                self.stopped = self.stop_on_failure
+            elif self.max_depth is not None and depth >= self.max_depth:
+                self.num_depth_limited += 1
+            else:
+                frontier.append(new_id)
+
+        if not num_enabled:
+            self.num_deadlocks += 1
+            if len(self.deadlocks) < self.max_witnesses:
+                self.deadlocks.append(state_id)
+
+    def add_state(self, codes, model_state_hash, parent, parent_rule, depth):
+        state_id = len(self.hashes)
+        self.codes.extend(codes)
+        self.hashes.append(model_state_hash)
+        self.parents.append(parent)
+        self.parent_rules.append(parent_rule)
+        self.depths.append(depth)
+        if model_state_hash in self.index:
+            self.collisions[array.array('I', codes).tobytes()] = state_id
+        else:
+            self.index[model_state_hash] = state_id
+        return state_id
+
+    def find_state(self, codes, model_state_hash):
+        state_id = self.index.get(model_state_hash, None)
+        if state_id is None:
+            return None
+        packed = array.array('I', codes)
+        n = self.num_leaves
+        if self.codes[state_id * n:(state_id + 1) * n] == packed:
+            return state_id
+        return self.collisions.get(packed.tobytes(), None)
+
+    def state_codes(self, state_id):
+        n = self.num_leaves
+        return self.codes[state_id * n:(state_id + 1) * n].tolist()
+
+    def trace(self, state_id):
+        'rules leading from the initial state to a state'
+        rules = []
+        while self.parents[state_id] >= 0:
+            rules.append(self.rules[self.parent_rules[state_id]])
+            state_id = self.parents[state_id]
+        return rules[::-1]
+
+    def set_state(self, state_id):
+        'put the system into an explored state, eg to examine a failure'
+        self.current_codes = self.current_codes or [None] * self.num_leaves
+        self.go_to(self.state_codes(state_id), self.hashes[state_id])
+
+    def encode(self, leaf_id, value):
+        return self.state_types[leaf_id]._dp_encode_value(value)
+
+    def intern(self, leaf_id, plain):
+        codes = self.codes_by_plain[leaf_id]
+        code = codes.get(plain, None)
+        if code is None:
+            code = codes[plain] = len(self.plains[leaf_id])
+            self.plains[leaf_id].append(plain)
+            self.values[leaf_id].append(None)
+            self.interned.append((leaf_id, plain))
+        return code
+
+    def value(self, leaf_id, code):
+        v = self.values[leaf_id][code]
+        if v is None:
+            component = self.components[leaf_id]
+            leaf_name = self.leaf_names[leaf_id]
+            v = self.state_types[leaf_id]._dp_decode_value(component, leaf_name, self.plains[leaf_id][code])
+            self.values[leaf_id][code] = v
+        return v
+
+    def go_to(self, codes, model_state_hash):
+        current = self.current_codes
+        for leaf_id,code in enumerate(codes):
+            if current[leaf_id] != code:
+                self.components[leaf_id]._dp_raw_setattr(self.leaf_names[leaf_id], self.value(leaf_id, code))
+                current[leaf_id] = code
+        self.system._dp_raw_setattr('_dp_model_state_hash', model_state_hash)
+
+    def check_invariants(self):
+        'name of the first invariant that does not hold, or None'
+        for invariant in self.invariants:
+            try:
+                holds = invariant(self.system)
+            except AssertionError:
+                holds = False
+            if not holds:
+                return getattr(invariant, '__name__', str(invariant))
+        return None
+
+    def expand(self, codes, model_state_hash):
+        '''invoke every rule from a state
+
+        returns, for each rule that is not guarded, (rule_index, hash, changes, failure)
+            changes is a tuple of (leaf_id, encoded value), or None if the rule raised an exception
+            failure is the name of a violated invariant, or the exception
+        '''
+        self.go_to(codes, model_state_hash)
+        successors = []
+        for rule_index,rule in enumerate(self.rules):
+            result = rule.invoke(check = False, print_headers = False, show_print = False)
+            if result.exc_type is not None:
+                successors.append((rule_index, None, None, f'{result.exc_type.__name__}: {result.exc_value}'))
+            elif not result.guarded:
+                changes = tuple(
+                    (leaf_id, self.encode(leaf_id, change.value_after))
+                    for leaf_id,change in result.state_changes.items()
+                )
+                failure = self.check_invariants()
+                successor_hash = self.system._dp_model_state_hash & MASK_64
+                result.revert_state()
+                successors.append((rule_index, successor_hash, changes, failure))
+        return successors
+
+    @staticmethod
+    def worker_main(connection, explorer):
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            new_interned, requests = message
+            try:
+                for leaf_id,plain in new_interned:
+                    explorer.intern(leaf_id, plain)
+                reply = [explorer.expand(*r) for r in requests]
+            except Exception as e:
+                reply = f'{type(e).__name__}: {e}'
+            connection.send(reply)
@@ -0,0 +1,167 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Bounded undo/redo history of a simulation, see SimulatorBase.keep_history()
+
+A step is one committed rule invocation (atomic-rule simulator) or one clock event
+(clocked simulator, any number of rules)
+Each recent step is stored as its leaf changes (leaf_id, value before, value after) with the
+model state hash and simulator position (eg num_invocations) after it; leaf values are never
+modified in place so these are just references
+Printout and Rule/Invocation objects are not kept
+
+Memory is bounded by a maximum number of recent steps and of leaf changes in them
+The oldest step beyond these is folded into a base state (all leaf values before the first
+recent step) and a full copy of the base state is kept every snapshot_interval steps, up to
+max_snapshots of them
+So stepping back is exact within the recent steps and to the nearest snapshot before that
+
+The random number generator is not rewound
+'''
+
+import collections
+
+
+class StepHistory:
+    def __init__(self, system, position,
+        depth = 10000,
+        max_changes = 1000000,
+        snapshot_interval = 10000,
+        max_snapshots = 10,
+    ):
+        self.system = system
+        self.leaf_table = system._dp_leaf_table
+        self.depth = max(depth, 1)
+        self.max_changes = max_changes
+        self.snapshot_interval = snapshot_interval
+        self.max_snapshots = max_snapshots
+        self.reset(position)
+
+    def reset(self, position):
+        'forget everything, the current system state becomes step 0'
+        self.steps = collections.deque() # (changes, model_state_hash, position) after each step
+        self.num_changes = 0
+        self.base_step = 0
+        self.base = self.current_values(), self.system._dp_model_state_hash, position
+        self.snapshots = collections.deque() # (step, values, model_state_hash, position), before base_step
+        self.current_step = 0
+
+    def current_values(self):
+        table = self.leaf_table
+        return [object.__getattribute__(c, n) for c,n in zip(table.components, table.names)]
+
+    @property
+    def last_step(self):
+        return self.base_step + len(self.steps)
+
+    @property
+    def first_step(self):
+        return self.snapshots[0][0] if self.snapshots else self.base_step
+
+    def record(self, invocations, position):
+        'a step has been committed, made of the state changes of some invocations'
+        if self.current_step != self.last_step:
+            self.truncate()
+
+        changes = dict() # leaf_id:(value_before, value_after)
+        for invocation in invocations:
+            for leaf_id,change in invocation.state_changes.items():
+                before = changes[leaf_id][0] if leaf_id in changes else change.value_before
+                changes[leaf_id] = before, change.value_after
+        changes = tuple((leaf_id, before, after) for leaf_id,(before,after) in changes.items())
+
+        self.steps.append((changes, self.system._dp_model_state_hash, position))
+        self.num_changes += len(changes)
+        self.current_step += 1
+        while len(self.steps) > self.depth or (self.num_changes > self.max_changes and len(self.steps) > 1):
+            self.fold_oldest()
+
+    def fold_oldest(self):
+        changes, model_state_hash, position = self.steps.popleft()
+        self.num_changes -= len(changes)
+        values = self.base[0]
+        for leaf_id,before,after in changes:
+            values[leaf_id] = after
+        self.base = values, model_state_hash, position
+        self.base_step += 1
+        if self.max_snapshots and self.base_step % self.snapshot_interval == 0:
+            self.snapshots.append((self.base_step, list(values), model_state_hash, position))
+            if len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popleft()
+
+    def truncate(self):
+        'forget the steps after the current one, as simulation continues from here'
+        if self.current_step >= self.base_step:
+            while self.last_step > self.current_step:
+                changes, model_state_hash, position = self.steps.pop()
+                self.num_changes -= len(changes)
+        else:
+            # at an old snapshot, which becomes the base
+            step, values, model_state_hash, position = self.snapshot(self.current_step)
+            self.base = list(values), model_state_hash, position
+            self.base_step = step
+            self.steps.clear()
+            self.num_changes = 0
+            while self.snapshots and self.snapshots[-1][0] > step:
+                self.snapshots.pop()
+
+    def snapshot(self, step):
+        return next(s for s in self.snapshots if s[0] == step)
+
+    def back_target(self, num_steps):
+        'nearest reachable step at or before num_steps back'
+        target = self.current_step - num_steps
+        if target >= self.base_step:
+            return target
+        earlier = [s[0] for s in self.snapshots if s[0] <= target]
+        return earlier[-1] if earlier else self.first_step
+
+    def forward_target(self, num_steps):
+        'nearest reachable step at or after num_steps forward'
+        target = min(self.current_step + num_steps, self.last_step)
+        if target >= self.base_step:
+            return target
+        later = [s[0] for s in self.snapshots if target <= s[0] < self.base_step]
+        return later[0] if later else self.base_step
+
+    def go_to(self, step):
+        'change system state to that after a reachable step; return the simulator position'
+        if step < self.base_step:
+            step, values, model_state_hash, position = self.snapshot(step)
+            self.set_all(values, model_state_hash)
+            self.current_step = step
+            return position
+
+        if self.current_step < self.base_step:
+            self.set_all(*self.base[:2])
+            self.current_step = self.base_step
+        while self.current_step > step:
+            self.current_step -= 1
+            changes = self.steps[self.current_step - self.base_step][0]
+            self.set_changes((leaf_id, before) for leaf_id,before,after in changes)
+        while self.current_step < step:
+            changes = self.steps[self.current_step - self.base_step][0]
+            self.set_changes((leaf_id, after) for leaf_id,before,after in changes)
+            self.current_step += 1
+
+        if step == self.base_step:
+            model_state_hash, position = self.base[1:]
+        else:
+            model_state_hash, position = self.steps[step - self.base_step - 1][1:]
+        self.system._dp_raw_setattr('_dp_model_state_hash', model_state_hash)
+        return position
+
+    def set_changes(self, leaf_values):
+        table = self.leaf_table
+        for leaf_id,value in leaf_values:
+            table.components[leaf_id]._dp_raw_setattr(table.names[leaf_id], value)
+
+    def set_all(self, values, model_state_hash):
+        table = self.leaf_table
+        for component,leaf_name,value in zip(table.components, table.names, values):
+            if object.__getattribute__(component, leaf_name) is not value:
+                component._dp_raw_setattr(leaf_name, value)
+        self.system._dp_raw_setattr('_dp_model_state_hash', model_state_hash)
@@ -13,6 +13,10 @@ Is the same in both cases
 from . import common, metaclass
 
 
+# leaf values of these types are stored in checkpoints as they are
+PLAIN_TYPES = (bool, int, float, str, bytes, type(None))
+
+
 class Leaf(common.PurpleComponent, metaclass = metaclass.PurpleLeafMetaClass):
     _dp_initial_value = common.UnDefined
 
@@ -80,6 +84,27 @@ class Leaf(common.PurpleComponent, metaclass = metaclass.PurpleLeafMetaClass):
     def _dp_instance_update_leaf_changes(cls, owner, name, current, value):
         return cls._dp_instance_setattr_leaf_changes(owner, name, current, value)
 
+    @classmethod
+    def _dp_encode_defined_value(cls, value):
+        if type(value) in PLAIN_TYPES:
+            return value
+        elif type(value) is tuple:
+            return ('p', tuple(cls._dp_encode_value(v) for v in value))
+        elif hasattr(value, '__index__'):
+            # emulated integers, bitvectors: rebuilt by casting
+            return ('i', int(value))
+        raise TypeError(f'cannot encode leaf value of type {type(value)}')
+
+    @classmethod
+    def _dp_decode_defined_value(cls, owner, name, plain):
+        if not isinstance(plain, tuple):
+            return plain
+        tag,content = plain
+        if tag == 'p':
+            return tuple(cls._dp_decode_value(owner, name, p) for p in content)
+        assert tag == 'i', f'bad leaf value encoding {plain}'
+        return cls._dp_check_and_cast_including_undef(owner, name, content)
+
     @classmethod
     def subclass(cls, cls_name, vars_cls, *other_bases):
         return type(cls)(cls_name, (cls, *other_bases), vars(vars_cls).copy())
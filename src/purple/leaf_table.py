@@ -0,0 +1,67 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Compact integer identifiers for the leaf state elements of an elaborated system
+
+Identifiers are allocated in elaboration order when the system-top Model is created
+Each static component (Model or static Record) holding leaves gets a dict
+    _dp_leaf_ids = {leaf_name: leaf_id}
+so that finding the identifier of a leaf is a single dict lookup
+
+The hashes of the leaf names used for the model state hash are also pre-computed here
+'''
+
+
+class LeafTable:
+    def __init__(self, leaf_state):
+        self.components = []
+        self.names = []
+        self.name_hashes = []
+        self.ids_by_key = dict()
+        for component,leaf_name in leaf_state:
+            self.add(component, leaf_name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, component, leaf_name):
+        try:
+            leaf_ids = object.__getattribute__(component, '_dp_leaf_ids')
+        except AttributeError:
+            leaf_ids = dict()
+            object.__setattr__(component, '_dp_leaf_ids', leaf_ids)
+
+        leaf_id = leaf_ids.get(leaf_name, None)
+        if leaf_id is None:
+            leaf_id = len(self.names)
+            leaf_ids[leaf_name] = leaf_id
+            self.components.append(component)
+            self.names.append(leaf_name)
+            # see rule.py for the use of these
+            component_name = object.__getattribute__(component, 'name')
+            self.name_hashes.append((hash((component_name, leaf_name)), hash((leaf_name, component_name))))
+        return leaf_id
+
+    def leaf_id(self, component, leaf_name):
+        'identifier of a leaf, allocating one if the leaf was not seen during elaboration'
+        try:
+            return object.__getattribute__(component, '_dp_leaf_ids')[leaf_name]
+        except (AttributeError, KeyError):
+            return self.add(component, leaf_name)
+
+    def key(self, leaf_id):
+        'the (component_name, leaf_name) of a leaf'
+        return object.__getattribute__(self.components[leaf_id], 'name'), self.names[leaf_id]
+
+    def full_name(self, leaf_id):
+        component_name, leaf_name = self.key(leaf_id)
+        return '.'.join((*component_name, leaf_name))
+
+    def find(self, component_name, leaf_name):
+        'identifier of a leaf from its (component_name, leaf_name), or None'
+        if len(self.ids_by_key) != len(self.names):
+            self.ids_by_key = {self.key(i):i for i in range(len(self.names))}
+        return self.ids_by_key.get((tuple(component_name), leaf_name), None)
@@ -0,0 +1,165 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Destinations for rule printout and simulator messages, see SimulatorBase.log_to()
+
+By default printout from rules (self.print() in a rule) is printed as each rule is committed
+A sink replaces this for one system
+
+    TextSink        the same text, written to a file in blocks of lines
+    JsonLinesSink   one JSON object per line, for post-processing:
+                        rule, rule_id, component, method, params, time_ps or step, args
+    NullSink        nothing; simulators then skip printout altogether
+
+Rules keep the arguments of self.print() unformatted; they are only turned into text (or
+JSON values) by a sink that writes them, at the time the rule is committed (a printed
+component can change later)
+
+Buffered sinks are flushed at the end of each simulator run(), and by flush() and close()
+'''
+
+import enum
+import json
+import sys
+
+
+class LogSink:
+    'base class; a sink is attached to one simulator (or testbench) at a time'
+    # simulators do not produce printout at all for a sink that discards it
+    discards = False
+
+    def __init__(self):
+        self.simulator = None
+
+    def attach(self, simulator):
+        self.simulator = simulator
+
+    def position(self):
+        'dict giving the simulated time or step of the printout'
+        simulator = self.simulator
+        time_ps = getattr(simulator, 'time_ps', None)
+        if time_ps is not None:
+            return dict(time_ps = time_ps)
+        step = getattr(simulator, 'num_invocations', None)
+        if step is not None:
+            return dict(step = step)
+        return dict()
+
+    def rule_printout(self, invocation, headers):
+        'printout of a committed rule, a list of (args, kwargs) of self.print()'
+        assert False, 'abstract base method called; sink does not handle rule printout'
+
+    def message(self, *args):
+        'simulator message such as deadlock'
+        assert False, 'abstract base method called; sink does not handle messages'
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class NullSink(LogSink):
+    discards = True
+
+    def rule_printout(self, invocation, headers):
+        pass
+
+    def message(self, *args):
+        pass
+
+
+class FileSink(LogSink):
+    'writes lines to a file name or text file object, buffer_size lines at a time'
+    def __init__(self, file = None, buffer_size = 1000):
+        super().__init__()
+        if file is None:
+            file = sys.stdout
+        if hasattr(file, 'write'):
+            self.file = file
+            self.owns_file = False
+        else:
+            self.file = open(file, 'w')
+            self.owns_file = True
+        self.buffer_size = buffer_size
+        self.lines = []
+
+    def write_line(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.file.write(''.join(self.lines))
+            self.lines = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.owns_file:
+            self.file.close()
+
+
+class TextSink(FileSink):
+    'same text as print() would produce'
+    def rule_printout(self, invocation, headers):
+        for args, kwargs in invocation.printout:
+            if 'file' in kwargs:
+                # explicitly directed elsewhere by the rule
+                print(*args, **kwargs)
+                continue
+            if headers:
+                args = (invocation.rule, '::', *args)
+            sep = kwargs.get('sep', None)
+            end = kwargs.get('end', None)
+            self.write_line(
+                (' ' if sep is None else sep).join(map(str, args)) + ('\n' if end is None else end)
+            )
+
+    def message(self, *args):
+        self.write_line(' '.join(map(str, args)) + '\n')
+
+
+def plain_value(v):
+    'JSON-compatible form of a printed value'
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, enum.Enum):
+        return v.name
+    return str(v)
+
+
+def rule_id(rule):
+    '''identifier of a rule which is the same in every run: component path, method and
+    parameter values in JSON form, eg top.talk(n=2)
+    '''
+    params = ','.join(f'{n}={json.dumps(plain_value(v))}' for n,v in rule.params.items())
+    return f'{".".join(rule.component.name)}.{rule.method_name}({params})'
+
+
+class JsonLinesSink(FileSink):
+    'one JSON object per line of printout'
+    def rule_printout(self, invocation, headers):
+        if not invocation.printout:
+            return
+        r = invocation.rule
+        common_fields = dict(
+            rule = str(r),
+            rule_id = rule_id(r),
+            component = '.'.join(r.component.name),
+            method = r.method_name,
+            params = {n:plain_value(v) for n,v in r.params.items()},
+            **self.position(),
+        )
+        for args, kwargs in invocation.printout:
+            entry = dict(common_fields, args = [plain_value(a) for a in args])
+            self.write_line(json.dumps(entry) + '\n')
+
+    def message(self, *args):
+        entry = dict(message = ' '.join(map(str, args)), **self.position())
+        self.write_line(json.dumps(entry) + '\n')
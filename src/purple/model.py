@@ -11,7 +11,7 @@ todo
 '''
 
 import inspect
-from . import common, rule, metaclass, clock
+from . import common, rule, metaclass, clock, leaf_table
 
 
 class Model(common.PurpleComponent, metaclass = metaclass.PurpleHierarchicalMetaClass):
@@ -20,7 +20,8 @@ class Model(common.PurpleComponent, metaclass = metaclass.PurpleHierarchicalMeta
             self._dp_raw_setattr('_dp_rules', [])
             self._dp_raw_setattr('_dp_current_invocation', None)
             leaf_state = self._dp_elaborate(name, self, None, tuple(), self._dp_initial_value)
-            # leaf state is usually (component-object, leaf-name), but not for (static) union
+            # leaf state is a tuple of (component-object, leaf-name) in elaboration order
+            self._dp_raw_setattr('_dp_leaf_table', leaf_table.LeafTable(leaf_state))
             # initial value of state-hash is a functinal don't-care
             self._dp_raw_setattr('_dp_model_state_hash', 0)
 
@@ -88,7 +89,7 @@ class Model(common.PurpleComponent, metaclass = metaclass.PurpleHierarchicalMeta
         rv = []
         instance = cls if self is None else self
         for rule_name in cls._dp_rule_names:
-            rv.extend(rule.construct_all(instance, rule_name))
+            rv.append(rule.construct_all(instance, rule_name))
         return rv
 
     def _dp_elaborate_substate(self, initial_value_dict):
@@ -154,7 +155,7 @@ class Model(common.PurpleComponent, metaclass = metaclass.PurpleHierarchicalMeta
                         cls._dp_rule_names.add(rule_name)
 
         if cls._dp_rule_names:
-            # make rules and discard (test on declaration)
+            # make parameterised rules and discard (test on declaration)
             cls._dp_construct_rules()
 
     @classmethod
@@ -195,18 +196,21 @@ class Model(common.PurpleComponent, metaclass = metaclass.PurpleHierarchicalMeta
 
     def find_rule(self, component = None, method_name = '', params = dict()):
         'generator which filters all rules in the system'
-        for the_rule in self._dp_rules:
-            if not (component is None or component is the_rule.component):
+        for parameterised_rule in self._dp_rules:
+            if not (component is None or component is parameterised_rule.component):
                 continue
-            if method_name not in ('', the_rule.method_name):
+            if method_name not in ('', parameterised_rule.method_name):
                 continue
-            if any(n not in the_rule.params or the_rule.params[n] != v for n,v in params.items()):
-                continue
-            yield the_rule
+            yield from parameterised_rule.find(params)
+
+    def rule_sequence(self):
+        'all rules in the system as an indexable sequence, in find_rule() order, Rules made on demand'
+        return common.ChainSequence(self._dp_rules)
 
     def find_clock(self, component = None, name = ''):
         'generator which filters all clocks in the system'
-        if component in (None, self):
+        # identity, as models with equal state compare equal
+        if component is None or component is self:
             for clock_name,clock in self._dp_clocks.items():
                 if name in ('', clock_name) and not clock.driven_by_another_clock:
                     yield clock
@@ -43,6 +43,7 @@ def Port(payload_type):
 def make_port_class(payload_type, base_class):
     class BasicPort(base_class):
         _dp_port_payload_type = payload_type
+        _dp_checks_reads = True
 
         @classmethod
         def _dp_instance_checkattr(cls, self, name = []):
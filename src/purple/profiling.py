@@ -0,0 +1,286 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Opt-in profiling of rule invocations
+
+    profiler = profiling.Profiler()
+    with profiler:
+        simulator.run(...)
+    profiler.show(top = 10)
+    profiler.save_json('profile.json')
+
+While a Profiler is enabled, methods of Rule, Invocation, LeanInvocation, LeafStateChange,
+Clock and StimulusIOTestbenchBase are replaced by counting wrappers; the originals are put
+back when it is disabled, so there is no cost at all when not profiling
+Only one Profiler can be enabled at a time
+
+Per rule (one parameter set of one method of one component) it counts
+    invocations, guard failures, exceptions and wall time
+    state reads (Model/Record attribute reads of state elements)
+    leaf writes and model state hash updates
+Reads, writes and hash updates outside any rule (eg commits after a clock edge) are counted
+in the totals only
+Clock edges are counted and timed per clock, and checksearch calls in total
+Rules invoked in forked worker processes (num_guard_workers, num_edge_workers) are not
+counted, only their commits in the parent
+
+Reports group the rules by method and by component, and list the top rules by time and by
+guard-miss ratio
+'''
+
+import json
+import time
+
+from . import clock, common, rule, verif
+
+ProfilerInUse = common.PurpleException.subclass('ProfilerInUse')
+
+
+class Counts:
+    __slots__ = (
+        'invocations', 'guarded', 'exceptions', 'seconds', 'state_reads', 'leaf_writes', 'hash_updates',
+    )
+
+    def __init__(self):
+        for n in self.__slots__:
+            setattr(self, n, 0)
+
+    def add(self, other):
+        for n in self.__slots__:
+            setattr(self, n, getattr(self, n) + getattr(other, n))
+
+    def as_dict(self):
+        d = {n:getattr(self, n) for n in self.__slots__}
+        d['guard_miss_ratio'] = self.guarded / self.invocations if self.invocations else 0.0
+        return d
+
+
+class Profiler:
+    active = None
+
+    def __init__(self):
+        self.rules = dict() # key:(Rule, Counts)
+        self.totals = Counts()
+        self.current = self.totals
+        self.clocks = dict() # id(clock):[clock, events, committed, seconds]
+        self.checksearch = dict(calls = 0, rules_tested = 0, seconds = 0.0)
+        self.saved = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def enable(self):
+        ProfilerInUse.insist(Profiler.active is None, 'another Profiler is enabled')
+        Profiler.active = self
+        self.patch(rule.Rule, 'invoke', self.wrap_invoke)
+        self.patch(rule.LeanInvocation, 'try_rule', self.wrap_try_rule)
+        self.patch(rule.Invocation, 'leaf_state_change', self.wrap_counter('leaf_writes'))
+        self.patch(rule.LeanInvocation, 'leaf_state_change', self.wrap_counter('leaf_writes'))
+        self.patch(rule.LeafStateChange, 'update_model_state_hash', self.wrap_counter('hash_updates'))
+        self.patch(rule.LeanInvocation, 'update_hash', self.wrap_counter('hash_updates'))
+        self.patch(rule.Invocation, 'record_read', self.wrap_record_read)
+        self.patch(clock.Clock, 'event', self.wrap_clock_event)
+        self.patch(verif.StimulusIOTestbenchBase, 'checksearch', self.wrap_checksearch)
+        self.saved.append((common, 'state_read_hook', common.state_read_hook))
+        common.state_read_hook = self.read_hook
+
+    def disable(self):
+        for owner,name,original in reversed(self.saved):
+            setattr(owner, name, original)
+        self.saved = []
+        Profiler.active = None
+
+    def patch(self, owner, name, make_wrapper):
+        original = getattr(owner, name)
+        self.saved.append((owner, name, original))
+        setattr(owner, name, make_wrapper(original))
+
+    def read_hook(self, component, attr_name):
+        current = self.current
+        current.state_reads += 1
+        if current is not self.totals:
+            self.totals.state_reads += 1
+
+    def counts_for(self, r):
+        if r.parameterised_rule is None:
+            key = id(r)
+        else:
+            key = id(r.parameterised_rule), r.param_index
+        entry = self.rules.get(key, None)
+        if entry is None:
+            entry = self.rules[key] = r, Counts()
+        return entry[1]
+
+    def enter_rule(self, r):
+        outer = self.current
+        self.current = self.counts_for(r)
+        self.current.invocations += 1
+        self.totals.invocations += 1
+        return outer, time.perf_counter()
+
+    def leave_rule(self, outer, start, guarded, exception):
+        seconds = time.perf_counter() - start
+        counts = self.current
+        counts.seconds += seconds
+        counts.guarded += guarded
+        counts.exceptions += exception
+        if outer is self.totals:
+            self.totals.seconds += seconds
+        self.totals.guarded += guarded
+        self.totals.exceptions += exception
+        self.current = outer
+
+    def wrap_invoke(self, original):
+        profiler = self
+        def invoke(self, *args, **kwargs):
+            outer, start = profiler.enter_rule(self)
+            guarded = exception = False
+            try:
+                invocation = original(self, *args, **kwargs)
+                guarded = invocation.guarded
+                exception = invocation.exc_type is not None
+                return invocation
+            except BaseException:
+                exception = True
+                raise
+            finally:
+                profiler.leave_rule(outer, start, guarded, exception)
+        return invoke
+
+    def wrap_try_rule(self, original):
+        profiler = self
+        def try_rule(self, r):
+            outer, start = profiler.enter_rule(r)
+            guarded = exception = False
+            try:
+                succeeded = original(self, r)
+                guarded = not succeeded
+                return succeeded
+            except BaseException:
+                exception = True
+                raise
+            finally:
+                profiler.leave_rule(outer, start, guarded, exception)
+        return try_rule
+
+    def wrap_counter(self, counter_name):
+        def make_wrapper(original):
+            profiler = self
+            def counted(self, *args):
+                current = profiler.current
+                setattr(current, counter_name, getattr(current, counter_name) + 1)
+                if current is not profiler.totals:
+                    totals = profiler.totals
+                    setattr(totals, counter_name, getattr(totals, counter_name) + 1)
+                return original(self, *args)
+            return counted
+        return make_wrapper
+
+    def wrap_record_read(self, original):
+        # reads are tracked by the invocation, which replaces state_read_hook
+        profiler = self
+        def record_read(self, component, attr_name):
+            profiler.read_hook(component, attr_name)
+            original(self, component, attr_name)
+        return record_read
+
+    def wrap_clock_event(self, original):
+        profiler = self
+        def event(self, *args, **kwargs):
+            start = time.perf_counter()
+            successful = original(self, *args, **kwargs)
+            entry = profiler.clocks.setdefault(id(self), [self, 0, 0, 0.0])
+            entry[1] += 1
+            entry[2] += len(successful)
+            entry[3] += time.perf_counter() - start
+            return successful
+        return event
+
+    def wrap_checksearch(self, original):
+        profiler = self
+        def checksearch(self, checker_state, *args, **kwargs):
+            before = 0 if checker_state is None else checker_state.num_invocations
+            start = time.perf_counter()
+            try:
+                checker_state = original(self, checker_state, *args, **kwargs)
+                profiler.checksearch['rules_tested'] += checker_state.num_invocations - before
+                return checker_state
+            finally:
+                profiler.checksearch['calls'] += 1
+                profiler.checksearch['seconds'] += time.perf_counter() - start
+        return checksearch
+
+    def report(self, top = 10):
+        'profile as a dict of plain python values, suitable for JSON; top limits the rule lists'
+        rules = []
+        methods = dict()
+        components = dict()
+        for r,counts in self.rules.values():
+            component_name = '.'.join(r.component.name)
+            rules.append(dict(rule = str(r), **counts.as_dict()))
+            methods.setdefault(f'{component_name}.{r.method_name}', Counts()).add(counts)
+            components.setdefault(component_name, Counts()).add(counts)
+
+        def by_time(named_counts, key_name):
+            entries = [{key_name:n, **c.as_dict()} for n,c in named_counts.items()]
+            return sorted(entries, key = lambda e: -e['seconds'])
+
+        rules_by_time = sorted(rules, key = lambda e: -e['seconds'])
+        rules_by_guard_miss = sorted(rules, key = lambda e: (-e['guard_miss_ratio'], -e['invocations']))
+        clocks = [
+            dict(
+                clock = ', '.join(str(p) for p in c.parameterised_rules),
+                events = events, committed = committed, seconds = seconds,
+            )
+            for c,events,committed,seconds in self.clocks.values()
+        ]
+        return dict(
+            totals = self.totals.as_dict(),
+            num_rules = len(rules),
+            rules_by_time = rules_by_time[:top],
+            rules_by_guard_miss = rules_by_guard_miss[:top],
+            methods = by_time(methods, 'method')[:top],
+            components = by_time(components, 'component')[:top],
+            clocks = clocks,
+            checksearch = dict(self.checksearch),
+        )
+
+    def save_json(self, file, top = None):
+        'file may be a path or an open text file; all rules are saved unless top is given'
+        report = self.report(top = top)
+        if hasattr(file, 'write'):
+            json.dump(report, file, indent = 1)
+        else:
+            with open(file, 'w') as f:
+                json.dump(report, f, indent = 1)
+
+    def show(self, top = 10):
+        report = self.report(top = top)
+        totals = report['totals']
+        print('** profile **')
+        print('  rules invoked:', totals['invocations'], ' different rules:', report['num_rules'])
+        print('  guard failures:', totals['guarded'], ' exceptions:', totals['exceptions'])
+        print('  state reads:', totals['state_reads'], ' leaf writes:', totals['leaf_writes'],
+            ' hash updates:', totals['hash_updates'])
+        print(f'  time in rules: {totals["seconds"]:.3f} s')
+        for c in report['clocks']:
+            print(f'  clock {c["clock"]}: {c["events"]} edges, {c["committed"]} rules committed, {c["seconds"]:.3f} s')
+        if report['checksearch']['calls']:
+            cs = report['checksearch']
+            print(f'  checksearch: {cs["calls"]} calls, {cs["rules_tested"]} rules tested, {cs["seconds"]:.3f} s')
+        print('  top rules by time:')
+        for e in report['rules_by_time']:
+            print(f'    {e["seconds"]:9.4f} s {e["invocations"]:9} invocations   {e["rule"]}')
+        print('  top rules by guard-miss ratio:')
+        for e in report['rules_by_guard_miss']:
+            print(f'    {e["guard_miss_ratio"]:9.3f} {e["invocations"]:9} invocations   {e["rule"]}')
+        print('  top methods by time:')
+        for e in report['methods']:
+            print(f'    {e["seconds"]:9.4f} s {e["invocations"]:9} invocations   {e["method"]}')
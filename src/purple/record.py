@@ -142,20 +142,30 @@ class Record(common.PurpleComponent, metaclass = metaclass.PurpleHierarchicalMet
     def _dp_all_possible_values(cls):
         '''generator function producing all possible values for the Record
         '''
-        for dict_value in cls._dp_all_possible_values_recursive(list(cls._dp_state_types)):
-            yield cls(**dict_value)
+        yield from cls._dp_indexable_possible_values()
 
     @classmethod
-    def _dp_all_possible_values_recursive(cls, state_names):
-        if not state_names:
-            yield dict()
-        else:
-            first,others = state_names[0], state_names[1:]
-            first_state_cls = cls._dp_state_types[first]
-            for first_value in first_state_cls._dp_all_possible_values():
-                first_dict = {first:first_value}
-                for others_dict in cls._dp_all_possible_values_recursive(others):
-                    yield dict(**first_dict, **others_dict)
+    def _dp_indexable_possible_values(cls):
+        '''all possible values for the Record, each one created when indexed
+
+        cartesian product of the state element values, first element most significant
+        '''
+        state_names = tuple(cls._dp_state_types)
+        return common.ProductSequence(
+            (t._dp_indexable_possible_values() for t in cls._dp_state_types.values()),
+            lambda values: cls(**dict(zip(state_names, values))),
+        )
+
+    @classmethod
+    def _dp_encode_defined_value(cls, value):
+        # transient or frozen record value, eg in a Tuple
+        return ('r', tuple(t._dp_encode_value(value._dp_raw_getattr(n)) for n,t in cls._dp_state_types.items()))
+
+    @classmethod
+    def _dp_decode_defined_value(cls, owner, name, plain):
+        # a transient record, to be frozen or cast by the caller
+        values = zip(cls._dp_state_types.items(), plain[1])
+        return cls(**{n:t._dp_decode_value(None, n, p) for (n,t),p in values})
 
     @classmethod
     def _dp_add_clocks_from_base(cls, base):
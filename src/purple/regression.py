@@ -0,0 +1,188 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Multi-seed regression runner
+
+    results = regress(system_factory, AtomicRuleSimulator, range(500), run_args = (10000,))
+    results.show()
+
+Seeds are run by a pool of forked worker processes
+Each worker elaborates the system once and runs many seeds, putting the system back into its
+initial state (see snapshot.py) and creating a new simulator for each seed
+The system factory, simulator class and arguments are inherited by the workers through fork
+so they do not need to be picklable; only seeds and results are sent between processes
+
+A seed fails if the simulation raises an exception, or if the optional check(simulator)
+returns False
+The optional coverage(simulator) is called at the end of each seed; its results are kept
+per seed and merged if they have a merge() method
+Alternatively collect_coverage = dict(...) gathers state coverage (see coverage.py) from every
+seed, merged into RegressionResult.coverage
+'''
+
+import contextlib
+import io
+import multiprocessing
+import os
+import traceback
+
+from . import snapshot
+
+
+class SeedResult:
+    def __init__(self, seed):
+        self.seed = seed
+        self.passed = False
+        self.error = None
+        self.deadlocked = False
+        self.num_invocations = None
+        self.time_ps = None
+        self.coverage = None
+        self.output = None
+
+    def __str__(self):
+        status = 'PASS' if self.passed else 'FAIL'
+        deadlock = ' deadlocked' if self.deadlocked else ''
+        progress = self.time_ps if self.num_invocations is None else self.num_invocations
+        return f'seed {self.seed} {status}{deadlock} ({progress})'
+
+
+class RegressionResult:
+    def __init__(self, seed_results):
+        self.seed_results = seed_results
+        self.passed = [r for r in seed_results if r.passed]
+        self.failed = [r for r in seed_results if not r.passed]
+        self.deadlocked = [r for r in seed_results if r.deadlocked]
+        self.num_invocations = sum(r.num_invocations or 0 for r in seed_results)
+        self.coverage = self.merge_coverage([r.coverage for r in seed_results if r.coverage is not None])
+
+    @staticmethod
+    def merge_coverage(coverage_list):
+        if not coverage_list:
+            return None
+        if not hasattr(coverage_list[0], 'merge'):
+            return coverage_list
+        merged = coverage_list[0].copy() if hasattr(coverage_list[0], 'copy') else coverage_list[0]
+        for c in coverage_list[1:]:
+            merged.merge(c)
+        return merged
+
+    def show(self, max_failures = 10):
+        print('** regression **')
+        print('  seeds run:', len(self.seed_results))
+        print('  passed:', len(self.passed))
+        print('  failed:', len(self.failed))
+        print('  deadlocked:', len(self.deadlocked))
+        print('  total invocations:', self.num_invocations)
+        for r in self.failed[:max_failures]:
+            print('   ', r)
+            if r.error:
+                print('       ', r.error.strip().splitlines()[-1])
+
+
+# job description, set before forking so that workers inherit it
+_job = None
+_worker_state = None
+
+
+def _start_worker():
+    global _worker_state
+    system = _job['system_factory']()
+    _worker_state = (system, snapshot.SystemSnapshot(system))
+
+
+def _run_seeds(seeds):
+    system, initial_state = _worker_state
+    return [_run_one_seed(system, initial_state, seed) for seed in seeds]
+
+
+def _run_one_seed(system, initial_state, seed):
+    job = _job
+    result = SeedResult(seed)
+    initial_state.restore()
+    output = io.StringIO()
+    redirect = contextlib.redirect_stdout(output) if job['capture_output'] else contextlib.nullcontext()
+    sim = None
+    with redirect:
+        try:
+            sim = job['simulator_cls'](system, *job['simulator_args'], random_seed = seed, **job['simulator_kwargs'])
+            if job['collect_coverage'] is not None:
+                sim.collect_coverage(**job['collect_coverage'])
+            sim.run(*job['run_args'], **job['run_kwargs'])
+            result.passed = job['check'] is None or bool(job['check'](sim))
+            if job['coverage'] is not None:
+                result.coverage = job['coverage'](sim)
+            elif job['collect_coverage'] is not None:
+                result.coverage = sim.coverage
+        except Exception:
+            result.error = traceback.format_exc()
+        finally:
+            if hasattr(sim, 'close'):
+                sim.close()
+
+    result.deadlocked = getattr(sim, 'deadlocked', False)
+    result.num_invocations = getattr(sim, 'num_invocations', None)
+    result.time_ps = getattr(sim, 'time_ps', None)
+    if job['capture_output'] and not result.passed:
+        result.output = output.getvalue()
+    return result
+
+
+def regress(system_factory, simulator_cls, seeds,
+    simulator_args = (),
+    simulator_kwargs = {},
+    run_args = (),
+    run_kwargs = {},
+    check = None,
+    coverage = None,
+    collect_coverage = None,
+    num_workers = None,
+    chunk_size = None,
+    capture_output = True,
+):
+    '''run a simulation for every seed and return a RegressionResult, seeds in the order given
+
+    simulator created by simulator_cls(system, *simulator_args, random_seed = seed, **simulator_kwargs)
+    then run by simulator.run(*run_args, **run_kwargs)
+    collect_coverage is a dict of keyword arguments for simulator.collect_coverage()
+    num_workers defaults to the number of CPUs; 0 runs all seeds in this process
+    printout is captured, and kept for failing seeds only, unless capture_output is False
+    '''
+    global _job, _worker_state
+    seeds = list(seeds)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = min(num_workers, len(seeds))
+    if chunk_size is None:
+        # several chunks per worker so that slow seeds do not leave workers idle at the end
+        chunk_size = max(1, len(seeds) // (4 * max(num_workers, 1)))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+
+    _job = dict(
+        system_factory = system_factory,
+        simulator_cls = simulator_cls,
+        simulator_args = simulator_args,
+        simulator_kwargs = simulator_kwargs,
+        run_args = run_args,
+        run_kwargs = run_kwargs,
+        check = check,
+        coverage = coverage,
+        collect_coverage = collect_coverage,
+        capture_output = capture_output,
+    )
+    try:
+        if num_workers == 0:
+            _start_worker()
+            chunk_results = [_run_seeds(chunk) for chunk in chunks]
+        else:
+            context = multiprocessing.get_context('fork')
+            with context.Pool(num_workers, initializer = _start_worker) as pool:
+                chunk_results = pool.map(_run_seeds, chunks, chunksize = 1)
+    finally:
+        _job = None
+        _worker_state = None
+
+    return RegressionResult([r for chunk in chunk_results for r in chunk])
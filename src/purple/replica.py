@@ -0,0 +1,79 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Forked worker processes holding replicas of an elaborated system
+
+Purple leaf values and the classes they belong to are generated during declaration and
+elaboration, so they cannot in general be pickled and sent to another process
+Instead, worker processes are forked (so start with a copy of the parent's memory) and
+are kept in step with the parent by replaying the same rules, which are deterministic
+functions of system state
+
+Only available where the fork start method is (Linux, macOS)
+'''
+
+import multiprocessing
+import multiprocessing.connection
+
+
+class ReplicaWorkers:
+    '''a set of forked worker processes, each running worker_main(connection, *args)
+
+    messages are sent and received through multiprocessing Pipe connections
+    a message of None asks the worker to finish
+    '''
+    def __init__(self, num_workers, worker_main, *args):
+        context = multiprocessing.get_context('fork')
+        self.connections = []
+        self.processes = []
+        for _ in range(num_workers):
+            parent_end, worker_end = context.Pipe()
+            process = context.Process(target = worker_main, args = (worker_end, *args), daemon = True)
+            process.start()
+            worker_end.close()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+
+    def __len__(self):
+        return len(self.connections)
+
+    def send(self, worker_index, message):
+        self.connections[worker_index].send(message)
+
+    def recv(self, worker_index):
+        return self.connections[worker_index].recv()
+
+    def ready(self, timeout = None):
+        'indices of the workers with a message waiting, waiting for at least one'
+        ready = multiprocessing.connection.wait(self.connections, timeout)
+        return [i for i,c in enumerate(self.connections) if c in ready]
+
+    def close(self):
+        for connection,process in zip(self.connections, self.processes):
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout = 5)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self.connections = []
+        self.processes = []
+
+
+def split_range(start, stop, num_parts):
+    'contiguous (start, stop) sub-ranges of roughly equal size, in order'
+    n = stop - start
+    bounds = [start + (n * i) // num_parts for i in range(num_parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def replay(all_rules, rule_indices):
+    'invoke already-committed rules, to keep a replica in step'
+    for rule_index in rule_indices:
+        result = all_rules[rule_index].invoke(check = True, print_headers = False, show_print = False)
+        assert not result.guarded, 'replica diverged from parent system'
@@ -14,20 +14,23 @@ from . import common
 
 
 class Rule:
-    def __init__(self, component, method, params):
+    def __init__(self, component, method, params, parameterised_rule = None, param_index = None):
         self.component = component
         self.method_name = method.__name__
         self.top_component = getattr(component, '_dp_top_component', None)
         self.method = method
         self.params = params
+        # position in the sequence of rules made from the same method
+        self.parameterised_rule = parameterised_rule
+        self.param_index = param_index
 
     def __str__(self):
         cmp_name = '.'.join(self.component.name)
         params = ', '.join(f'{n}={v}' for n,v in self.params.items())
         return f'{cmp_name}.{self.method_name}({params})'
 
-    def invoke(self, check = True, print_headers = True, show_print = True):
-        with Invocation(self) as invocation:
+    def invoke(self, check = True, print_headers = True, show_print = True, track_reads = False, buffered = False):
+        with Invocation(self, track_reads, buffered) as invocation:
             self.method(**self.params)
         if check and invocation.exc_type is not None:
             raise invocation.exc_value
@@ -37,12 +40,12 @@ class Rule:
 
 
 class LeafStateChange:
-    def __init__(self, component, leaf_name, value_before, value_after):
-        self.component = component
-        self.top_component = component._dp_top_component
-        self.leaf_name = leaf_name
-        self.full_name_hash_a = hash((component.name, leaf_name))
-        self.full_name_hash_b = hash((leaf_name, component.name))
+    def __init__(self, leaf_table, leaf_id, value_before, value_after):
+        self.leaf_id = leaf_id
+        self.component = leaf_table.components[leaf_id]
+        self.top_component = self.component._dp_top_component
+        self.leaf_name = leaf_table.names[leaf_id]
+        self.full_name_hash_a, self.full_name_hash_b = leaf_table.name_hashes[leaf_id]
 
         self.value_before = value_before
         self.value_after = value_after
@@ -93,21 +96,38 @@ class LeafStateChange:
 
 class Invocation:
     '''Stores data about a Rule invocation: success/failure and the system state before and after
+
+    leaves are identified by integer leaf-ids allocated at elaboration (see leaf_table.py)
+    the leaves written are always known, as the keys of state_changes
+    the leaves read are only recorded if track_reads is set; this includes reads made before
+    a guard failed, and reads of leaves that the rule then writes
+
+    if buffered, writes are visible to the rule but the model state hash is not updated and
+    values are not checked; the rule is reverted by revert_state() and then either dropped or
+    committed by apply_state(), updating the hash once per leaf (see Clock.event)
     '''
-    def __init__(self, rule):
+    def __init__(self, rule, track_reads = False, buffered = False):
         self.rule = rule
         self.top_component = rule.top_component
+        self.leaf_table = self.top_component._dp_leaf_table
         self.exc_type = None
         self.exc_value = None
         self.guarded = False
-        self.state_changes = dict() # (component_name,leaf_name):LeafStateChange
+        self.state_changes = dict() # leaf_id:LeafStateChange
         self.printout = []
+        self.read_ids = set() if track_reads else None
+        self.buffered = buffered
 
     def __enter__(self):
         self.top_component._dp_raw_setattr('_dp_current_invocation', self)
+        if self.read_ids is not None:
+            self.outer_read_hook = common.state_read_hook
+            common.state_read_hook = self.record_read
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        if self.read_ids is not None:
+            common.state_read_hook = self.outer_read_hook
         if exc_type:
             # FIXME
             # cannot revert state if the exception was caused by an unhashable leaf
@@ -121,11 +141,35 @@ class Invocation:
         self.top_component._dp_raw_setattr('_dp_current_invocation', None)
         return True
 
+    @property
+    def write_ids(self):
+        return self.state_changes.keys()
+
+    @property
+    def writes(self):
+        'set of (component_name, leaf_name) written'
+        return {self.leaf_table.key(i) for i in self.state_changes}
+
+    @property
+    def reads(self):
+        'set of (component_name, leaf_name) read, or None if reads were not tracked'
+        if self.read_ids is None:
+            return None
+        return {self.leaf_table.key(i) for i in self.read_ids}
+
+    def record_read(self, component, attr_name):
+        # called for every state read while this invocation is tracking reads
+        # ignore anything that is not a leaf of this system
+        if getattr(component, '_dp_top_component', None) is self.top_component:
+            leaf_id = getattr(component, '_dp_leaf_ids', {}).get(attr_name, None)
+            if leaf_id is not None:
+                self.read_ids.add(leaf_id)
+
     def current_leaf_value(self, component, leaf_attr_name):
         # this method is not required if changes are always immediately visible in-rule
         # which is the case today
-        update_key = component.name, leaf_attr_name
-        latest_update = self.state_changes.get(update_key, None)
+        leaf_id = self.leaf_table.leaf_id(component, leaf_attr_name)
+        latest_update = self.state_changes.get(leaf_id, None)
         if latest_update is None:
             return getattr(component, leaf_attr_name)
         else:
@@ -134,30 +178,61 @@ class Invocation:
             return latest_update.value_after
 
     def leaf_state_change(self, component, leaf_attr_name, leaf_new_value):
-        update_key = component.name, leaf_attr_name
-        repeated_update = self.state_changes.get(update_key, None)
+        leaf_id = self.leaf_table.leaf_id(component, leaf_attr_name)
+        repeated_update = self.state_changes.get(leaf_id, None)
         if repeated_update is None:
             original_value = component._dp_raw_getattr(leaf_attr_name)
             check_value = original_value
         else:
             original_value = repeated_update.value_before
             check_value = repeated_update.value_after
-        change = LeafStateChange(component, leaf_attr_name, original_value, leaf_new_value)
-        self.state_changes[update_key] = change
-        change.apply(check_value)
+        change = LeafStateChange(self.leaf_table, leaf_id, original_value, leaf_new_value)
+        self.state_changes[leaf_id] = change
+        if self.buffered:
+            component._dp_raw_setattr(leaf_attr_name, leaf_new_value)
+        else:
+            change.apply(check_value)
 
     def revert_state(self):
-        for change in self.state_changes.values():
-            change.revert()
+        if self.buffered:
+            for change in self.state_changes.values():
+                change.component._dp_raw_setattr(change.leaf_name, change.value_before)
+        else:
+            for change in self.state_changes.values():
+                change.revert()
 
     def apply_state(self):
+        if self.buffered:
+            # commit, after which this is an ordinary invocation
+            for change in self.state_changes.values():
+                change.update_model_state_hash(change.value_before, change.value_after)
+                change.component._dp_raw_setattr(change.leaf_name, change.value_after)
+            self.buffered = False
+        else:
+            for change in self.state_changes.values():
+                change.apply()
+
+    def mark(self):
+        'restore point for rollback(), see LocalGuards_ContextManager'
+        return self.state_changes.copy(), self.printout.copy()
+
+    def rollback(self, mark):
+        self.revert_state()
+        self.state_changes, self.printout = mark
         for change in self.state_changes.values():
-            change.apply()
+            if self.buffered:
+                change.component._dp_raw_setattr(change.leaf_name, change.value_after)
+            else:
+                change.apply()
 
     def print(self, args, kwargs):
         self.printout.append((args, kwargs))
 
     def produce_printout(self, headers, file = None):
+        sink = None if file else getattr(self.top_component, '_dp_log_sink', None)
+        if sink is not None:
+            sink.rule_printout(self, headers)
+            return
         for args, kwargs in self.printout:
             if file and 'file' not in kwargs:
                 kwargs['file'] = file
@@ -166,22 +241,169 @@ class Invocation:
             print(*args, **kwargs)
 
 
+class LeanInvocation:
+    '''reusable stand-in for Invocation, for simulation without printout or invocation records
+
+    one object serves every rule tried by a simulator
+    writes go straight to the system and are logged in a list which is reused, so trying a
+    rule allocates nothing beyond what the rule body itself does
+    nothing is checked or hashed until a rule is committed, when the model state hash is
+    updated once per leaf written (as for a buffered Invocation), unless the leaf ends up
+    holding the same object as before
+    printout is discarded
+
+    used by AtomicRuleSimulator.run() when show_print is off, see invoke_one_rule_lean()
+    '''
+    def __init__(self, top_component):
+        self.top_component = top_component
+        self.leaf_table = top_component._dp_leaf_table
+        self.log = [] # (component, leaf_name, value before) for each write
+
+    def try_rule(self, rule):
+        'invoke a rule, leaving its writes in place; False if it was guarded'
+        # object.__setattr__ here and below is _dp_raw_setattr without its attribute lookup
+        top = self.top_component
+        object.__setattr__(top, '_dp_current_invocation', self)
+        try:
+            rule.method(**rule.params)
+        except Exception as e:
+            self.revert()
+            if type(e) is common.GuardFailed:
+                return False
+            raise
+        finally:
+            object.__setattr__(top, '_dp_current_invocation', None)
+        return True
+
+    def revert(self):
+        'undo the writes of the rule last tried'
+        log = self.log
+        for component,leaf_name,value_before in reversed(log):
+            object.__setattr__(component, leaf_name, value_before)
+        log.clear()
+
+    def take(self):
+        'undo the writes of the rule last tried, returning them for commit(writes)'
+        writes = [(c, n, before, object.__getattribute__(c, n)) for c,n,before in self.log]
+        self.revert()
+        return writes
+
+    def commit(self, writes = None):
+        'keep the writes of the rule last tried, or re-apply taken writes, and update the hash'
+        log = self.log
+        if writes is not None:
+            for component,leaf_name,value_before,value_after in writes:
+                log.append((component, leaf_name, value_before))
+                object.__setattr__(component, leaf_name, value_after)
+        if len(log) == 1:
+            component,leaf_name,value_before = log[0]
+            self.update_hash(component, leaf_name, value_before)
+        elif log:
+            committed = set()
+            for component,leaf_name,value_before in log:
+                key = id(component), leaf_name
+                if key not in committed:
+                    committed.add(key)
+                    self.update_hash(component, leaf_name, value_before)
+        log.clear()
+
+    def update_hash(self, component, leaf_name, value_before):
+        # as LeafStateChange.update_model_state_hash() but without making one
+        value_after = object.__getattribute__(component, leaf_name)
+        if value_after is value_before:
+            return
+        table = self.leaf_table
+        leaf_id = table.leaf_id(component, leaf_name)
+        hash_a, hash_b = table.name_hashes[leaf_id]
+        try:
+            before = getattr(value_before, '_dp_hash_function', hash)(value_before)
+            after = getattr(value_after, '_dp_hash_function', hash)(value_after)
+        except TypeError:
+            # report it as LeafStateChange does
+            LeafStateChange(table, leaf_id, value_before, value_after).update_model_state_hash(value_before, value_after)
+            raise
+        top = self.top_component
+        msh = top._dp_model_state_hash - (hash_a ^ hash_b * before) + (hash_a ^ hash_b * after)
+        object.__setattr__(top, '_dp_model_state_hash', msh)
+
+    def leaf_state_change(self, component, leaf_attr_name, leaf_new_value):
+        self.log.append((component, leaf_attr_name, object.__getattribute__(component, leaf_attr_name)))
+        object.__setattr__(component, leaf_attr_name, leaf_new_value)
+
+    def current_leaf_value(self, component, leaf_attr_name):
+        return getattr(component, leaf_attr_name)
+
+    def mark(self):
+        return len(self.log)
+
+    def rollback(self, mark):
+        log = self.log
+        while len(log) > mark:
+            component,leaf_name,value_before = log.pop()
+            object.__setattr__(component, leaf_name, value_before)
+
+    def print(self, args, kwargs):
+        pass
+
+
+class ParameterisedRule(common.ProductSequence):
+    '''all the Rules from one method of one component, one Rule per parameter set
+
+    Rule objects are only created when indexed, iterated or sampled, so memory and
+    elaboration time do not depend on the size of the parameter space
+    order is the same as nested iteration over the parameters, first parameter most significant
+    '''
+    def __init__(self, component, method):
+        annots = getattr(method, '__annotations__', {})
+        a_list = [a for a in annots.items() if a[0] != 'return']
+        self.component = component
+        self.method = method
+        self.method_name = method.__name__
+        self.param_names = tuple(n for n,t in a_list)
+        super().__init__(t._dp_indexable_possible_values() for n,t in a_list)
+        # a rule without parameters is always the same object
+        self.only_rule = None if a_list else Rule(component, method, dict(), self, 0)
+
+    def __str__(self):
+        cmp_name = '.'.join(self.component.name)
+        return f'{cmp_name}.{self.method_name}({", ".join(self.param_names)})'
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        return self.make_rule(index, self.values_at(index))
+
+    def __iter__(self):
+        for index,values in enumerate(self.iter_values(self.sequences)):
+            yield self.make_rule(index, values)
+
+    def make_rule(self, index, values):
+        if self.only_rule is not None:
+            return self.only_rule
+        return Rule(self.component, self.method, dict(zip(self.param_names, values)), self, index)
+
+    def sample(self, rand_gen):
+        'a Rule with a parameter set chosen at random'
+        return self[rand_gen.randrange(self.size)]
+
+    def find(self, params):
+        'generator of the Rules matching a dict of parameter values, only enumerating unmatched parameters'
+        if any(n not in self.param_names for n in params):
+            return
+        positions = [
+            [i for i,v in enumerate(domain) if v == params[n]] if n in params else range(size)
+            for n,domain,size in zip(self.param_names, self.sequences, self.sizes)
+        ]
+        for position in self.iter_values(positions):
+            index = 0
+            for i,size in zip(position, self.sizes):
+                index = index * size + i
+            yield self.make_rule(index, tuple(d[i] for d,i in zip(self.sequences, position)))
+
+
 def construct_all(instance, method_name):
-    ''' make a list of Rule objects from a method name, one per parameter set
+    ''' make a ParameterisedRule from a method name, representing one Rule per parameter set
 
     instance may be a class (for declaration-time testing) or an object being elaborated
     '''
-    the_method = getattr(instance, method_name)
-    annots = getattr(the_method, '__annotations__', {})
-    a_list = [a for a in annots.items() if a[0] != 'return']
-    return [Rule(instance, the_method, pd) for pd in construct_all_recursive(a_list)]
-
-def construct_all_recursive(param_items):
-    if not param_items:
-        yield dict()
-    else:
-        (first_pname, first_ptype),others = param_items[0], param_items[1:]
-        for first_value in first_ptype._dp_all_possible_values():
-            first_dict = {first_pname:first_value}
-            for others_dict in construct_all_recursive(others):
-                yield dict(**first_dict, **others_dict)
+    return ParameterisedRule(instance, getattr(instance, method_name))
@@ -0,0 +1,164 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Idle-cycle skipping for the clocked simulator, see ClockedSimulator(skip_idle = True)
+
+A rule which is guarded on a clock edge sleeps until one of the leaves it read (before its
+guard failed) is written by a committed rule, in any clock domain
+A sleeping rule is not invoked when selected; it would be guarded again as rules are
+deterministic functions of system state
+
+A clock all of whose rules are asleep is parked: taken out of the event queue until one of
+its rules is woken, when it is given its next edge after the waking one
+Skipped edges are still counted in Clock.num_events, and parked clocks are brought up to
+date at the end of each run, so cycle counts are the same as without skipping
+
+Other changes to what guards read wake all rules before the next edge is evaluated:
+    writes to system leaves other than by clock events, eg by a testbench between runs or
+    between steps of ClockedSimulator.run_one_step(), found by the model state hash
+    differing from the one after the last edge
+    anything else a guard reads which is not system state, eg a StimulusQueue pushed from
+    outside, which must be notified by calling ClockedSimulator.wake_idle_rules()
+Undo and checkpoint restore wake all rules too, see reset()
+
+With every such change seen, skipping rules gives the same results as without, for the same seed
+Parked clocks do not select rules, so from then on the random choice of rule parameters in
+other domains differs from a run without skipping (but is equally valid)
+
+Reads are tracked for every rule invoked, which has a cost; this is worthwhile when most
+rules are guarded most of the time
+'''
+
+
+class IdleTracker:
+    def __init__(self, simulator):
+        self.simulator = simulator
+        clocks = [c for c,_ in simulator.clocks]
+        self.clock_positions = {id(c):i for i,c in enumerate(clocks)}
+        self.offsets = [
+            {id(p):offset for p,offset in zip(c.rules.sequences, c.rules.offsets)}
+            for c in clocks
+        ]
+        self.sleeping = dict() # (clock position, rule index):leaf ids read
+        self.waiters = dict() # leaf_id:set of sleeping keys
+        self.num_asleep = [0] * len(clocks)
+        self.parked = set() # clock positions
+        self.model_state_hash = None # after the last committed edge
+        self.wake_pending = False
+        self.num_skipped_rules = 0
+        self.num_parked_edges = 0
+
+    def evaluate(self, clock, selected_rules):
+        'invoke the selected rules that are not asleep, see Clock.event'
+        position = self.clock_positions[id(clock)]
+        offsets = self.offsets[position]
+        buffered = self.simulator.buffered_writes
+        successful = []
+        for r in selected_rules:
+            key = position, offsets[id(r.parameterised_rule)] + r.param_index
+            if key in self.sleeping:
+                self.num_skipped_rules += 1
+                continue
+            inv = r.invoke(check = True, print_headers = False, show_print = False, track_reads = True, buffered = buffered)
+            if inv.guarded:
+                self.sleep(key, inv.read_ids)
+            else:
+                inv.revert_state()
+                successful.append(inv)
+        return successful
+
+    def sleep(self, key, read_ids):
+        self.sleeping[key] = read_ids
+        for leaf_id in read_ids:
+            self.waiters.setdefault(leaf_id, set()).add(key)
+        self.num_asleep[key[0]] += 1
+
+    def wake(self, key, after):
+        read_ids = self.sleeping.pop(key, None)
+        if read_ids is None:
+            return
+        for leaf_id in read_ids:
+            keys = self.waiters.get(leaf_id, None)
+            if keys is not None:
+                keys.discard(key)
+        position = key[0]
+        self.num_asleep[position] -= 1
+        if position in self.parked:
+            self.parked.discard(position)
+            self.catch_up(position, after)
+            self.simulator.schedule_clock(position)
+
+    def committed(self, position, invocations):
+        '''after an edge of the clock at position, which is out of the event queue
+
+        wakes rules that read the leaves written, then puts the clock back in the queue
+        unless all its rules are asleep
+        '''
+        after = self.simulator.time_ps, position
+        for inv in invocations:
+            for leaf_id in inv.state_changes:
+                keys = self.waiters.pop(leaf_id, None)
+                if keys:
+                    for key in keys:
+                        self.wake(key, after)
+        if self.num_asleep[position] == len(self.simulator.clocks[position][0].rules):
+            self.parked.add(position)
+        else:
+            self.simulator.schedule_clock(position)
+        self.model_state_hash = self.simulator.system._dp_model_state_hash
+
+    def check_outside_changes(self, position):
+        '''wake all rules if system state was changed other than by committed rules, or
+        wake_idle_rules() was called, since the last edge
+
+        position is that of the clock whose edge at time_ps was the last, or len(clocks)
+        '''
+        changed = self.simulator.system._dp_model_state_hash != self.model_state_hash
+        if self.sleeping and (changed or self.wake_pending):
+            after = self.simulator.time_ps, position
+            for key in list(self.sleeping):
+                self.wake(key, after)
+            self.waiters = dict()
+        self.wake_pending = False
+        self.model_state_hash = self.simulator.system._dp_model_state_hash
+
+    def catch_up(self, position, after):
+        '''advance a parked clock to its first edge after (time_ps, position), counting the
+        edges skipped
+        '''
+        clock = self.simulator.clocks[position][0]
+        time_ps, after_position = after
+        if clock.next_event_time_ps > time_ps:
+            return
+        num_edges = (time_ps - clock.next_event_time_ps) // clock.period_ps + 1
+        if position > after_position and (time_ps - clock.next_event_time_ps) % clock.period_ps == 0:
+            # coincident edge comes after in the queue
+            num_edges -= 1
+        clock.next_event_time_ps += num_edges * clock.period_ps
+        clock.num_events += num_edges
+        self.num_parked_edges += num_edges
+
+    def finish(self, final_time_ps):
+        'bring parked clocks up to date at the end of a run'
+        never = final_time_ps, len(self.simulator.clocks)
+        for position in self.parked:
+            clock = self.simulator.clocks[position][0]
+            self.catch_up(position, never)
+            self.simulator.time_ps = max(self.simulator.time_ps, clock.next_event_time_ps - clock.period_ps)
+
+    def reset(self):
+        '''wake all rules, after clocks were changed other than by clock events (undo or
+        checkpoint restore), see check_outside_changes() for changes to state alone
+
+        parked clocks are advanced past the current time and must then be scheduled again
+        '''
+        self.finish(self.simulator.time_ps)
+        self.sleeping = dict()
+        self.waiters = dict()
+        self.num_asleep = [0] * len(self.num_asleep)
+        self.parked = set()
+        self.model_state_hash = None
+        self.wake_pending = False
@@ -9,20 +9,34 @@ simulator (base) classes
 - clocked
 
 FIXME:
-    - save/restore
     - auto switch to debug on exception, either post-mortem or whole rule
     - interact
         - choose next rule
         - view/modify state
         - go backwards (also for clocked)
     - code coverage
-    - state coverage
 '''
 
+import bisect
+import heapq
+import math
 import random
 
+from . import checkpoint, common, coverage, history, replica, rule, sensitivity, tracing
+
 
 class SimulatorBase:
+    # simulator attributes saved in a checkpoint, extend in subclass
+    checkpoint_attributes = ()
+
+    # undo/redo history, state coverage and trace of leaf changes, optional
+    history = None
+    coverage = None
+    trace = None
+
+    # destination of rule printout and messages, see log_to()
+    log_sink = None
+
     def __init__(self, system, random_seed):
         self.system = system
         self.seed = random.getrandbits(48) if random_seed is None else random_seed
@@ -31,27 +45,708 @@ class SimulatorBase:
     def interact(self):
         assert False, 'interactive simulator not yet implemented'
 
-    def save(self, destination):
-        assert False, 'saving simulator state not yet implemented'
+    def save(self, destination, compress = True):
+        '''write a binary checkpoint (see checkpoint.py) to a filename or binary file object
+
+        restore() it into a simulator of the same type with a system elaborated from the same
+        declarations, for example in a new process
+        '''
+        checkpoint.write(destination, checkpoint.to_bytes(checkpoint.encode(self), compress))
 
     def restore(self, source):
-        assert False, 'restoring simulator state not yet implemented'
+        'read a checkpoint written by save() from a filename or binary file object'
+        checkpoint.decode(self, checkpoint.from_bytes(checkpoint.read(source)))
+        if self.history is not None:
+            self.history.reset(self.history_position())
+        if self.trace is not None:
+            self.trace.snapshot(self.trace_time())
+
+    def checkpoint_state(self):
+        # redefine in subclass to save more; values must be marshal-able
+        return {n:getattr(self, n) for n in self.checkpoint_attributes}
+
+    def restore_checkpoint_state(self, saved):
+        # called after system state is restored
+        for n in self.checkpoint_attributes:
+            setattr(self, n, saved[n])
+
+    def keep_history(self, **kwargs):
+        '''record committed steps from now on, for step_back() and step_forward()
+
+        see history.py for the keyword arguments bounding memory use
+        '''
+        self.history = history.StepHistory(self.system, self.history_position(), **kwargs)
+        return self.history
+
+    def collect_coverage(self, **kwargs):
+        '''record state coverage from now on, in self.coverage
+
+        see coverage.py for the keyword arguments
+        '''
+        self.coverage = coverage.StateCoverage(self.system, **kwargs)
+        return self.coverage
+
+    def record_trace(self, destination, **kwargs):
+        '''record every leaf change from now on in a trace file, read by tracing.TraceReader
+
+        see tracing.py for the keyword arguments; stop_trace() finishes the file
+        '''
+        self.trace = tracing.TraceRecorder(self.system, destination, self.trace_time(), **kwargs)
+        return self.trace
+
+    def stop_trace(self):
+        self.trace.close()
+        self.trace = None
+
+    def log_to(self, sink):
+        '''send rule printout and simulator messages to a sink (see logsink.py) from now on
+
+        None returns to printing
+        '''
+        if self.log_sink is not None:
+            self.log_sink.flush()
+        self.log_sink = sink
+        if sink is not None:
+            sink.attach(self)
+        self.system._dp_raw_setattr('_dp_log_sink', sink)
+        return sink
+
+    def log_message(self, *args):
+        if self.log_sink is None:
+            print(*args)
+        else:
+            self.log_sink.message(*args)
+
+    def printing(self, show_print):
+        'show_print, unless the printout would be discarded'
+        return show_print and not (self.log_sink is not None and self.log_sink.discards)
+
+    def flush_log(self):
+        if self.log_sink is not None:
+            self.log_sink.flush()
+
+    def record_step(self, invocations):
+        # called after each committed step
+        if self.history is not None:
+            self.history.record(invocations, self.history_position())
+        if self.coverage is not None:
+            self.coverage.record(invocations)
+        if self.trace is not None:
+            self.trace.record(invocations, self.trace_time())
+
+    def step_back(self, num_steps = 1):
+        'undo up to num_steps steps, return the number actually undone'
+        assert self.history is not None, 'keep_history() not called'
+        return -self.move_in_history(self.history.back_target(num_steps))
+
+    def step_forward(self, num_steps = 1):
+        'redo up to num_steps undone steps, return the number actually redone'
+        assert self.history is not None, 'keep_history() not called'
+        return self.move_in_history(self.history.forward_target(num_steps))
+
+    def move_in_history(self, step):
+        assert self.system._dp_current_invocation is None, 'cannot move in history inside a rule'
+        num_steps = step - self.history.current_step
+        self.set_history_position(self.history.go_to(step))
+        if self.trace is not None:
+            self.trace.snapshot(self.trace_time())
+        return num_steps
+
+    def history_position(self):
+        # redefine in subclass; simulator progress after a step, eg invocation count
+        return None
+
+    def set_history_position(self, position):
+        # redefine in subclass; called after system state has been changed by history
+        pass
+
+    def trace_time(self):
+        # redefine in subclass; time of the trace records for the current step
+        return 0
+
+
+class EnabledRuleSet:
+    '''maintains the set of rules whose guards currently pass
+
+    every rule is evaluated once (invoked and reverted) recording the state it read
+    after a rule invocation is committed, the only rules re-evaluated are the committed
+    one and those whose last evaluation read something that the committed one wrote
+
+    assumes rules depend only on system state, which is the same assumption that the
+    exhaustive search in AtomicRuleSimulator makes
+    the model state hash it was last brought up to date with is kept, so that a change to
+    system state made other than by committing rules (eg by a testbench) can be found
+    '''
+    def __init__(self, all_rules, system):
+        self.all_rules = all_rules
+        self.system = system
+        self.rule_reads = [() for _ in range(len(all_rules))]
+        self.readers = dict() # leaf_id:set of rule indices
+        self.enabled = [] # rule indices, in no particular order
+        self.enabled_position = dict() # rule index:position in self.enabled
+        self.num_evaluations = 0
+        for rule_index in range(len(all_rules)):
+            self.evaluate(rule_index)
+        self.model_state_hash = system._dp_model_state_hash
+
+    def __len__(self):
+        return len(self.enabled)
+
+    def evaluate(self, rule_index):
+        result = self.all_rules[rule_index].invoke(
+            check = True,
+            print_headers = False,
+            show_print = False,
+            track_reads = True,
+        )
+        if not result.guarded:
+            result.revert_state()
+        self.num_evaluations += 1
+
+        for leaf_id in self.rule_reads[rule_index]:
+            self.readers[leaf_id].discard(rule_index)
+        for leaf_id in result.read_ids:
+            self.readers.setdefault(leaf_id, set()).add(rule_index)
+        self.rule_reads[rule_index] = result.read_ids
+
+        position = self.enabled_position.get(rule_index, None)
+        if result.guarded and position is not None:
+            # swap with the last enabled rule, to remove in constant time
+            last = self.enabled.pop()
+            if last != rule_index:
+                self.enabled[position] = last
+                self.enabled_position[last] = position
+            del self.enabled_position[rule_index]
+        elif not result.guarded and position is None:
+            self.enabled_position[rule_index] = len(self.enabled)
+            self.enabled.append(rule_index)
+
+    def choose(self, rand_gen):
+        return rand_gen.choice(self.enabled)
+
+    def reorder(self, enabled):
+        'put the enabled rules in a given order, which affects choose()'
+        assert sorted(enabled) == sorted(self.enabled), 'enabled rules differ'
+        self.enabled = list(enabled)
+        self.enabled_position = {r:position for position,r in enumerate(self.enabled)}
+
+    def update(self, committed_index, invocation):
+        'invocation has been committed; re-evaluate any rule that may have changed enabled-ness'
+        stale = {committed_index}
+        for leaf_id in invocation.write_ids:
+            stale.update(self.readers.get(leaf_id, ()))
+        for rule_index in sorted(stale):
+            self.evaluate(rule_index)
+        self.model_state_hash = self.system._dp_model_state_hash
+
+
+class ParamWeights:
+    '''weights of the Rules of one parameterised rule, as a default plus sparse overrides
+
+    overrides are kept in a Fenwick tree indexed by slot, in the order they were first set,
+    and Rules without an override are located by counting the overrides below them
+    so setting a weight and sampling are O(log k) in the number of overrides,
+    independent of the size of the parameter space
+    '''
+    def __init__(self, size, default):
+        self.size = size
+        self.default = default
+        self.slot_of = dict() # param index:slot
+        self.param_indices = [] # param index of each slot
+        self.weights = [] # weight of each slot
+        self.sorted_indices = [] # param indices with an override, ascending
+        self.tree = [0.0]
+        self.override_total = 0.0
+
+    def total(self):
+        return self.default * (self.size - len(self.weights)) + self.override_total
+
+    def weight(self, param_index):
+        slot = self.slot_of.get(param_index, None)
+        return self.default if slot is None else self.weights[slot]
+
+    def num_weighted(self):
+        num_default = self.size - len(self.weights) if self.default > 0 else 0
+        return num_default + sum(w > 0 for w in self.weights)
+
+    def prefix(self, n):
+        'sum of the weights of the first n slots'
+        total = 0.0
+        while n:
+            total += self.tree[n]
+            n -= n & -n
+        return total
+
+    def set(self, param_index, weight):
+        slot = self.slot_of.get(param_index, None)
+        if slot is None:
+            slot = self.slot_of[param_index] = len(self.weights)
+            self.param_indices.append(param_index)
+            self.weights.append(0.0)
+            bisect.insort(self.sorted_indices, param_index)
+            n = len(self.tree)
+            self.tree.append(self.prefix(n - 1) - self.prefix(n - (n & -n)))
+        delta = weight - self.weights[slot]
+        self.weights[slot] = weight
+        self.override_total += delta
+        i = slot + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def rebuild(self):
+        'recompute the tree; removes rounding error from repeated changes'
+        n = len(self.weights)
+        self.tree = [0.0] + self.weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self.tree[parent] += self.tree[i]
+        self.override_total = sum(self.weights)
+
+    def nth_default(self, n):
+        'param index of the nth Rule (from 0) without an override'
+        # number of overrides below the result is the largest j with sorted[j-1] - (j-1) <= n
+        lo, hi = 0, len(self.sorted_indices)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.sorted_indices[mid] - mid <= n:
+                lo = mid + 1
+            else:
+                hi = mid
+        return n + lo
+
+    def choose(self, rand_gen):
+        'param index chosen according to weight; total() must be positive'
+        remaining = rand_gen.random() * self.total()
+        num_default = self.size - len(self.weights)
+        default_total = self.default * num_default
+        if remaining < default_total:
+            return self.nth_default(min(int(remaining / self.default), num_default - 1))
+        remaining -= default_total
+        position = 0
+        step = 1 << (len(self.weights).bit_length() - 1)
+        while step:
+            i = position + step
+            if i < len(self.tree) and self.tree[i] <= remaining:
+                position = i
+                remaining -= self.tree[i]
+            step >>= 1
+        if position == len(self.weights) or self.weights[position] <= 0:
+            # rounding error in the tree, at the top end
+            position = max(i for i,w in enumerate(self.weights) if w > 0)
+        return self.param_indices[position]
+
+
+class WeightedRulePool:
+    '''random rule selection with weights that can be changed during simulation
+
+    one entry per parameterised rule, sampled from a Fenwick tree (binary indexed tree)
+    so that both selection and a change of weight are O(log n) in the number of entries
+    the parameter set is then chosen uniformly, or by weight if weights were set for
+    particular parameter sets
+
+    weights are per Rule (per parameter set) so with all weights 1 this is uniform selection
+    the weight of a Rule is its own weight multiplied by the weight of its component and
+    every component above it in the hierarchy
+    priorities can be expressed as weights differing by orders of magnitude
+    '''
+    def __init__(self, parameterised_rules):
+        self.parameterised_rules = tuple(parameterised_rules)
+        self.rule_weights = [1.0 for _ in self.parameterised_rules]
+        self.param_weights = dict() # entry index:ParamWeights, if set per parameter set
+        self.component_weights = dict() # component name:weight, default 1
+        self.entries_under = dict() # component name:list of entry indices, for rules below it
+        for i,p in enumerate(self.parameterised_rules):
+            name = p.component.name
+            for depth in range(1, len(name) + 1):
+                self.entries_under.setdefault(name[:depth], []).append(i)
+        self.rebuild()
+
+    def __len__(self):
+        return sum(common.sequence_size(p) for p in self.parameterised_rules)
+
+    def rebuild(self):
+        'recompute all weights and the tree; also removes rounding error from repeated changes'
+        n = len(self.parameterised_rules)
+        self.weights = [self.entry_weight(i) for i in range(n)]
+        self.tree = [0.0] + self.weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self.tree[parent] += self.tree[i]
+        self.total = sum(self.weights)
+        for weights in self.param_weights.values():
+            weights.rebuild()
+
+    def entry_weight(self, entry_index):
+        weights = self.param_weights.get(entry_index, None)
+        if weights is None:
+            size = common.sequence_size(self.parameterised_rules[entry_index])
+            weight = self.rule_weights[entry_index] * size
+        else:
+            weight = weights.total()
+        return weight * self.component_scale(entry_index)
+
+    def component_scale(self, entry_index):
+        'product of the weights of the components above the rules of an entry'
+        scale = 1
+        name = self.parameterised_rules[entry_index].component.name
+        for depth in range(1, len(name) + 1):
+            scale *= self.component_weights.get(name[:depth], 1)
+        return scale
+
+    def update_entry(self, entry_index):
+        weight = self.entry_weight(entry_index)
+        delta = weight - self.weights[entry_index]
+        self.weights[entry_index] = weight
+        self.total += delta
+        i = entry_index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def set_rule_weight(self, weight, component = None, method_name = '', params = dict()):
+        'set the weight of each matching Rule, filtered as for find_rule()'
+        assert weight >= 0, 'rule weights must not be negative'
+        for i,p in enumerate(self.parameterised_rules):
+            if component is not None and component is not p.component:
+                continue
+            if method_name not in ('', p.method_name):
+                continue
+            if not params:
+                self.rule_weights[i] = weight
+                self.param_weights.pop(i, None)
+                self.update_entry(i)
+                continue
+            weights = self.param_weights.get(i, None)
+            for r in p.find(params):
+                if weights is None:
+                    weights = self.param_weights[i] = ParamWeights(common.sequence_size(p), self.rule_weights[i])
+                weights.set(r.param_index, weight)
+            if weights is not None:
+                self.update_entry(i)
+
+    def set_component_weight(self, component, weight):
+        'scale the weights of all rules of a component and its sub-components'
+        assert weight >= 0, 'component weights must not be negative'
+        self.component_weights[component.name] = weight
+        for i in self.entries_under.get(component.name, ()):
+            self.update_entry(i)
+
+    def choose_entry(self, rand_gen):
+        'index of a parameterised rule chosen according to weight, or None if all weights are 0'
+        if self.total <= 0:
+            return None
+        remaining = rand_gen.random() * self.total
+        position = 0
+        step = 1 << (len(self.weights).bit_length() - 1)
+        while step:
+            i = position + step
+            if i < len(self.tree) and self.tree[i] <= remaining:
+                position = i
+                remaining -= self.tree[i]
+            step >>= 1
+        if position == len(self.weights) or self.weights[position] <= 0:
+            # rounding error in the tree, at the top end
+            position = max(i for i,w in enumerate(self.weights) if w > 0)
+        return position
+
+    def rule_weight(self, entry_index, param_index):
+        'user-defined weight of a Rule of a parameterised rule'
+        weights = self.param_weights.get(entry_index, None)
+        weight = self.rule_weights[entry_index] if weights is None else weights.weight(param_index)
+        return weight * self.component_scale(entry_index)
+
+    def num_weighted_rules(self, entry_index):
+        'number of Rules of a parameterised rule with a non-zero user-defined weight'
+        weights = self.param_weights.get(entry_index, None)
+        if self.component_scale(entry_index) <= 0:
+            return 0
+        if weights is None:
+            size = common.sequence_size(self.parameterised_rules[entry_index])
+            return size if self.rule_weights[entry_index] > 0 else 0
+        return weights.num_weighted()
+
+    def weighted_rules(self):
+        'generator of (weight, Rule) for every Rule with a non-zero user-defined weight'
+        for i,p in enumerate(self.parameterised_rules):
+            for rule in p:
+                weight = self.rule_weight(i, rule.param_index)
+                if weight > 0:
+                    yield weight, rule
+
+    def choose(self, rand_gen):
+        'a Rule chosen according to weight, or None if all weights are 0'
+        entry_index = self.choose_entry(rand_gen)
+        if entry_index is None:
+            return None
+        p = self.parameterised_rules[entry_index]
+        weights = self.param_weights.get(entry_index, None)
+        if weights is None:
+            return p.sample(rand_gen)
+        return p[weights.choose(rand_gen)]
+
+
+class AdaptiveRulePool(WeightedRulePool):
+    '''weighted rule selection which learns how often each rule is enabled
+
+    every parameterised rule has an estimate of the fraction of its invocations that are
+    not guarded, updated after each guess (exponential moving average) and replaced by
+    the exact fraction after an exhaustive search
+    selection weight is the user weight times this estimate, but never less than the
+    user weight times exploration_floor, so rarely-enabled rules are still tried
+
+    the fraction of guesses that succeed is also learnt, to decide how many guesses to
+    make before an exhaustive search
+    '''
+    def __init__(self, parameterised_rules, exploration_floor = 0.05, learning_rate = 0.1):
+        assert 0 < exploration_floor <= 1, 'exploration floor must be in (0, 1]'
+        self.exploration_floor = exploration_floor
+        self.learning_rate = learning_rate
+        self.enabled_rates = [1.0 for _ in parameterised_rules]
+        self.guess_success_rate = 1.0
+        self.entry_indices = {(id(p.component), p.method_name):i for i,p in enumerate(parameterised_rules)}
+        super().__init__(parameterised_rules)
+
+    def entry_weight(self, entry_index):
+        rate = max(self.enabled_rates[entry_index], self.exploration_floor)
+        return rate * super().entry_weight(entry_index)
+
+    def entry_of(self, rule):
+        return self.entry_indices[(id(rule.component), rule.method_name)]
+
+    def record(self, rule, guarded):
+        'outcome of a guess'
+        outcome = 0.0 if guarded else 1.0
+        i = self.entry_of(rule)
+        self.enabled_rates[i] += self.learning_rate * (outcome - self.enabled_rates[i])
+        self.update_entry(i)
+        self.guess_success_rate += self.learning_rate * (outcome - self.guess_success_rate)
+
+    def record_exhaustive(self, num_tried, num_enabled):
+        'outcome of an exhaustive search, as dicts of entry index:number of Rules tried/enabled'
+        for i,n in num_tried.items():
+            self.enabled_rates[i] = num_enabled.get(i, 0) / n
+            self.update_entry(i)
+
+    def guess_limit(self, max_guesses):
+        '''number of guesses giving a 99% chance of finding an enabled rule, at the current
+        success rate, so that an exhaustive search is started early when few rules are enabled
+        '''
+        p = self.guess_success_rate
+        if not 0 < p < 1:
+            return 1
+        return max(1, min(max_guesses, math.ceil(math.log(0.01) / math.log1p(-p))))
+
+
+class ParallelGuardEvaluator:
+    '''evaluates every rule from the current state in forked replicas of the system
+
+    each worker process tests a contiguous range of rule indices, invoking and reverting,
+    and returns the indices of the rules that are not guarded
+    replicas are forked on first use, so they include any setup after the simulator was made
+    they are kept in step by replaying the rules committed in the parent, sent as indices
+    into all_rules with the next request (or when max_pending is reached); if the system
+    state was changed any other way (undo, checkpoint restore, a testbench invoking rules
+    between runs) the model state hash differs and all leaves are sent instead
+
+    assumes rules depend only on system state, as for the exhaustive search itself
+    '''
+    def __init__(self, system, all_rules, num_workers, max_pending = 1000):
+        self.system = system
+        self.all_rules = all_rules
+        self.num_workers = num_workers
+        self.offsets = {id(p):offset for p,offset in zip(all_rules.sequences, all_rules.offsets)}
+        self.max_pending = max_pending
+        self.pending = []
+        self.ranges = replica.split_range(0, len(all_rules), num_workers)
+        self.workers = None
+        self.synced_hash = None # state of the replicas once pending rules are replayed
+        self.full_sync = False
+
+    def check_sync(self):
+        'called before rules are committed, to find system state changed other than by committing them'
+        if self.workers is not None and self.system._dp_model_state_hash != self.synced_hash:
+            self.state_replaced()
+
+    def state_replaced(self):
+        'send all leaves with the next request, instead of the rules committed since the last'
+        self.full_sync = True
+        self.pending = []
+
+    def committed(self, rule):
+        if self.workers is None or self.full_sync:
+            return
+        self.pending.append(self.offsets[id(rule.parameterised_rule)] + rule.param_index)
+        if len(self.pending) >= self.max_pending:
+            for w in range(len(self.workers)):
+                self.workers.send(w, (None, self.pending, None, None))
+            self.pending = []
+
+    def sent_committed(self):
+        'the rules committed so far have been passed to committed()'
+        self.synced_hash = self.system._dp_model_state_hash
+
+    def enabled_indices(self):
+        'indices into all_rules of the rules that are not guarded, in order'
+        if self.workers is None:
+            self.workers = replica.ReplicaWorkers(self.num_workers, self.worker_main, self.system, self.all_rules)
+            self.full_sync = False
+            self.pending = []
+        sync = tuple(enumerate(checkpoint.encode_leaves(self.system))) if self.full_sync else None
+        for w,(start,stop) in enumerate(self.ranges):
+            self.workers.send(w, (sync, self.pending, start, stop))
+        self.pending = []
+        self.full_sync = False
+
+        enabled = []
+        errors = []
+        for w in range(len(self.workers)):
+            reply = self.workers.recv(w)
+            if isinstance(reply, tuple):
+                errors.append(reply)
+            else:
+                enabled.extend(reply)
+        if errors:
+            # the replicas may be part way through a rule
+            self.state_replaced()
+            rule_index, description = errors[0]
+            if rule_index is not None:
+                # same state here, so this raises the same exception with a useful traceback
+                self.all_rules[rule_index].invoke(check = True, print_headers = False, show_print = False)
+            raise AssertionError(f'rule evaluation failed in replica: {description}')
+        return enabled
+
+    def close(self):
+        if self.workers is not None:
+            self.workers.close()
+            self.workers = None
+
+    @staticmethod
+    def worker_main(connection, system, all_rules):
+        replay_error = None
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            sync, replay_indices, start, stop = message
+            try:
+                if sync is not None:
+                    checkpoint.decode_changes(system, sync)
+                    replay_error = None
+                replica.replay(all_rules, replay_indices)
+            except Exception as e:
+                replay_error = replay_error or repr(e)
+            if start is None:
+                continue
+            if replay_error is not None:
+                connection.send((None, replay_error))
+                continue
+
+            enabled = []
+            try:
+                for rule_index in range(start, stop):
+                    result = all_rules[rule_index].invoke(check = True, print_headers = False, show_print = False)
+                    if not result.guarded:
+                        result.revert_state()
+                        enabled.append(rule_index)
+            except Exception as e:
+                connection.send((rule_index, repr(e)))
+            else:
+                connection.send(enabled)
 
 
 class AtomicRuleSimulator(SimulatorBase):
-    def __init__(self, system, random_seed = None):
+    checkpoint_attributes = ('num_invocations', 'num_rule_evaluations', 'deadlocked')
+
+    def __init__(self, system,
+        random_seed = None,
+        enabled_set = False,
+        weighted = False,
+        adaptive = False,
+        exploration_floor = 0.05,
+        num_guard_workers = 0,
+        lean_run = False,
+    ):
         super().__init__(system, random_seed)
         self.num_invocations = 0
-        self.all_rules = tuple(self.system.find_rule())
+        self.num_rule_evaluations = 0
+        self.all_rules = self.system.rule_sequence()
         self.rule_pool = self.make_rule_pool()
         self.deadlocked = False
 
+        # optional scheduler mode which maintains a set of enabled rules instead of guessing
+        self.enabled_set = EnabledRuleSet(self.all_rules, self.system) if enabled_set else None
+
+        # optional weighted selection, weights set through self.weighted_pool at any time
+        # adaptive selection is weighted selection biased towards rules that are often enabled
+        if adaptive:
+            self.weighted_pool = AdaptiveRulePool(self.system._dp_rules, exploration_floor)
+        elif weighted:
+            self.weighted_pool = WeightedRulePool(self.system._dp_rules)
+        else:
+            self.weighted_pool = None
+        self.adaptive = adaptive
+
+        # optional forked worker processes for the exhaustive search, which is also the deadlock check
+        if num_guard_workers:
+            self.parallel_guards = ParallelGuardEvaluator(self.system, self.all_rules, num_guard_workers)
+        else:
+            self.parallel_guards = None
+
+        # opt-in: rules are tried without Invocation objects when printing is off, which skips
+        # the per-write value checks and hashing (an unhashable leaf is found only at commit),
+        # see lean_run_possible()
+        self.lean_invocation = rule.LeanInvocation(self.system) if lean_run else None
+
+    def close(self):
+        'stop any worker processes'
+        if self.parallel_guards is not None:
+            self.parallel_guards.close()
+            self.parallel_guards = None
+
+    def checkpoint_state(self):
+        saved = super().checkpoint_state()
+        if self.enabled_set is not None:
+            saved['enabled_rules'] = tuple(self.enabled_set.enabled)
+        return saved
+
+    def restore_checkpoint_state(self, saved):
+        super().restore_checkpoint_state(saved)
+        self.system_state_replaced()
+        if self.enabled_set is not None:
+            self.enabled_set.reorder(saved['enabled_rules'])
+
+    def history_position(self):
+        return self.num_invocations
+
+    def trace_time(self):
+        return self.num_invocations
+
+    def set_history_position(self, position):
+        self.num_invocations = position
+        self.deadlocked = False
+        self.system_state_replaced()
+
+    def system_state_replaced(self):
+        # system state has been set other than by committing rules
+        if self.enabled_set is not None:
+            self.enabled_set = EnabledRuleSet(self.all_rules, self.system)
+        if self.parallel_guards is not None:
+            # replicas hold the old state
+            self.parallel_guards.state_replaced()
+
     def make_rule_pool(self):
         # redefine in subclass eg to group rules into priorities
+        # or use the built-in weighted selection instead (weighted = True)
         return self.all_rules
 
     def choose_rule(self):
-        # redefine in subclass to do something other than uniform rule selection
+        # redefine in subclass to do something other than uniform or weighted rule selection
+        # None means no rule can be chosen
+        if self.weighted_pool is not None:
+            return self.weighted_pool.choose(self.rand_gen)
         return self.rand_gen.choice(self.rule_pool)
 
     def default_num_guards_before_exhaustive(self):
@@ -67,53 +762,418 @@ class AtomicRuleSimulator(SimulatorBase):
         if num_guards_before_exhaustive is None:
             num_guards_before_exhaustive = self.default_num_guards_before_exhaustive()
         num_guards_before_exhaustive = max(num_guards_before_exhaustive, 1)
+        show_print = self.printing(show_print)
+        if self.parallel_guards is not None:
+            self.parallel_guards.check_sync()
+
+        if not show_print and self.lean_run_possible():
+            while self.num_invocations < final_num_invocations:
+                self.invoke_one_rule_lean(num_guards_before_exhaustive)
+                if self.deadlocked:
+                    break
+        else:
+            while self.num_invocations < final_num_invocations:
+                self.invoke_one_rule(show_print, print_headers, num_guards_before_exhaustive)
+                if self.deadlocked:
+                    break
+        if self.parallel_guards is not None:
+            self.parallel_guards.sent_committed()
+        self.flush_log()
 
-        while self.num_invocations < final_num_invocations:
-            self.invoke_one_rule(show_print, print_headers, num_guards_before_exhaustive)
-            if self.deadlocked:
+    def lean_run_possible(self):
+        '''the lean path gives the same results, unless something needs the Invocation objects
+
+        (undo history, coverage, a trace, the enabled set, or a subclass redefining
+        invoke_one_rule, invoke_exhaustive or invoke_one_enabled_rule, which it would bypass)
+        '''
+        cls = type(self)
+        return (
+            self.lean_invocation is not None
+            and self.history is None
+            and self.coverage is None
+            and self.trace is None
+            and self.enabled_set is None
+            and cls.invoke_one_rule is AtomicRuleSimulator.invoke_one_rule
+            and cls.invoke_exhaustive is AtomicRuleSimulator.invoke_exhaustive
+            and cls.invoke_one_enabled_rule is AtomicRuleSimulator.invoke_one_enabled_rule
+        )
+
+    def invoke_one_rule_lean(self, num_guards_before_exhaustive):
+        'same as invoke_one_rule() with printing off, using a LeanInvocation'
+        lean = self.lean_invocation
+        if self.adaptive:
+            num_guards_before_exhaustive = self.weighted_pool.guess_limit(num_guards_before_exhaustive)
+
+        # try to find a rule that can run
+        rule = None
+        for _ in range(num_guards_before_exhaustive):
+            rule = self.choose_rule()
+            if rule is None:
                 break
+            enabled = lean.try_rule(rule)
+            self.num_rule_evaluations += 1
+            if self.adaptive:
+                self.weighted_pool.record(rule, not enabled)
+            if enabled:
+                lean.commit()
+                break
+        else:
+            rule = None
+
+        # failed guesswork; search exhaustively and select one at random
+        if rule is None:
+            if self.parallel_guards is not None:
+                result = self.invoke_exhaustive_parallel(False, False)
+                rule = None if result is None else result.rule
+            else:
+                rule = self.invoke_exhaustive_lean()
+
+        if rule is None:
+            self.log_message('System Deadlock')
+            self.deadlocked = True
+        elif self.parallel_guards is not None:
+            self.parallel_guards.committed(rule)
+
+        self.num_invocations += 1
+
+    def invoke_exhaustive_lean(self):
+        'same as invoke_exhaustive() with printing off, returning the rule committed'
+        lean = self.lean_invocation
+        invokable = []
+        weights = []
+        num_tried = dict()
+        num_enabled = dict()
+        for weight,rule in self.exhaustive_candidates():
+            enabled = lean.try_rule(rule)
+            self.num_rule_evaluations += 1
+            if self.adaptive:
+                i = self.weighted_pool.entry_of(rule)
+                num_tried[i] = num_tried.get(i, 0) + 1
+                num_enabled[i] = num_enabled.get(i, 0) + enabled
+            if enabled:
+                invokable.append((rule, lean.take()))
+                weights.append(weight)
+        if self.adaptive:
+            self.weighted_pool.record_exhaustive(num_tried, num_enabled)
+
+        if not invokable:
+            return None
+        if self.weighted_pool is None:
+            rule, writes = self.rand_gen.choice(invokable)
+        else:
+            rule, writes = self.rand_gen.choices(invokable, weights)[0]
+        lean.commit(writes)
+        return rule
 
     def invoke_one_rule(self, show_print, print_headers, num_guards_before_exhaustive):
+        if self.enabled_set is not None:
+            return self.invoke_one_enabled_rule(show_print, print_headers)
+
+        if self.adaptive:
+            num_guards_before_exhaustive = self.weighted_pool.guess_limit(num_guards_before_exhaustive)
+
         # try to find a rule that can run
+        result = None
         for _ in range(num_guards_before_exhaustive):
-            result = self.choose_rule().invoke(
+            rule = self.choose_rule()
+            if rule is None:
+                break
+            result = rule.invoke(
                 check = True,
                 print_headers = print_headers,
                 show_print = show_print,
             )
+            self.num_rule_evaluations += 1
+            if self.adaptive:
+                self.weighted_pool.record(rule, result.guarded)
             if not result.guarded:
                 break
 
         # failed guesswork; search exhaustively and select one at random
-        if result.guarded:
-            invokable = []
+        if result is None or result.guarded:
+            result = self.invoke_exhaustive(show_print, print_headers)
+
+        if result is None:
+            self.log_message('System Deadlock')
+            self.deadlocked = True
+        elif self.parallel_guards is not None:
+            self.parallel_guards.committed(result.rule)
+
+        self.num_invocations += 1
+        if result is not None:
+            self.record_step((result,))
+
+    def invoke_exhaustive(self, show_print, print_headers):
+        'invoke one of the rules that are not guarded, or return None if there are none'
+        if self.parallel_guards is not None:
+            return self.invoke_exhaustive_parallel(show_print, print_headers)
+
+        invokable = []
+        weights = []
+        num_tried = dict()
+        num_enabled = dict()
+        for weight,rule in self.exhaustive_candidates():
+            result = rule.invoke(
+                check = True,
+                print_headers = False,
+                show_print = False,
+            )
+            self.num_rule_evaluations += 1
+            if self.adaptive:
+                i = self.weighted_pool.entry_of(rule)
+                num_tried[i] = num_tried.get(i, 0) + 1
+                num_enabled[i] = num_enabled.get(i, 0) + (not result.guarded)
+            if not result.guarded:
+                invokable.append(result)
+                weights.append(weight)
+                result.revert_state()
+        if self.adaptive:
+            self.weighted_pool.record_exhaustive(num_tried, num_enabled)
+
+        if not invokable:
+            return None
+        if self.weighted_pool is None:
+            result = self.rand_gen.choice(invokable)
+        else:
+            result = self.rand_gen.choices(invokable, weights)[0]
+        result.apply_state()
+        if show_print:
+            result.produce_printout(print_headers)
+        return result
+
+    def invoke_exhaustive_parallel(self, show_print, print_headers):
+        # same selection as invoke_exhaustive(), but only the chosen rule is invoked here
+        enabled = self.parallel_guards.enabled_indices()
+        self.num_rule_evaluations += len(self.all_rules)
+
+        if self.weighted_pool is None:
+            invokable = enabled
+            weights = None
+        else:
+            pool = self.weighted_pool
+            located = [self.all_rules.locate(rule_index) for rule_index in enabled]
+            weighted = [(rule_index, pool.rule_weight(*l)) for rule_index,l in zip(enabled, located)]
+            invokable = [rule_index for rule_index,w in weighted if w > 0]
+            weights = [w for rule_index,w in weighted if w > 0]
+            if self.adaptive:
+                num_tried = dict()
+                for i in range(len(pool.parameterised_rules)):
+                    n = pool.num_weighted_rules(i)
+                    if n:
+                        num_tried[i] = n
+                num_enabled = dict()
+                for (i,_),(_,w) in zip(located, weighted):
+                    if w > 0:
+                        num_enabled[i] = num_enabled.get(i, 0) + 1
+                pool.record_exhaustive(num_tried, num_enabled)
+
+        if not invokable:
+            return None
+        if weights is None:
+            rule_index = self.rand_gen.choice(invokable)
+        else:
+            rule_index = self.rand_gen.choices(invokable, weights)[0]
+        result = self.all_rules[rule_index].invoke(
+            check = True,
+            print_headers = print_headers,
+            show_print = show_print,
+        )
+        assert not result.guarded, 'rule enabled in replica is guarded'
+        return result
+
+    def exhaustive_candidates(self):
+        'generator of (weight, rule) for all rules that can be chosen'
+        if self.weighted_pool is None:
             for rule in self.all_rules:
-                result = rule.invoke(
-                    check = True,
-                    print_headers = False,
-                    show_print = False,
-                )
-                if not result.guarded:
-                    invokable.append(result)
-                    result.revert_state()
-
-            if invokable:
-                result = self.rand_gen.choice(invokable)
-                result.apply_state()
-                if show_print:
-                    result.produce_printout(print_headers)
+                yield 1, rule
+        else:
+            yield from self.weighted_pool.weighted_rules()
+
+    def invoke_one_enabled_rule(self, show_print, print_headers):
+        # rule pool and guess count are not used; selection is uniform among enabled rules
+        enabled_set = self.enabled_set
+        if enabled_set.model_state_hash != self.system._dp_model_state_hash:
+            # system state changed other than by committed rules, eg by a testbench
+            enabled_set = self.enabled_set = EnabledRuleSet(self.all_rules, self.system)
+        while enabled_set:
+            rule_index = enabled_set.choose(self.rand_gen)
+            result = self.all_rules[rule_index].invoke(
+                check = True,
+                print_headers = print_headers,
+                show_print = show_print,
+            )
+            if result.guarded:
+                # rule depends on something other than tracked system state
+                enabled_set.evaluate(rule_index)
             else:
-                print('System Deadlock')
-                self.deadlocked = True
+                enabled_set.update(rule_index, result)
+                break
+        else:
+            self.log_message('System Deadlock')
+            self.deadlocked = True
+            result = None
 
         self.num_invocations += 1
+        if result is not None:
+            self.record_step((result,))
+
+
+class ParallelEdgeEvaluator:
+    '''evaluates the rules selected for a clock edge in forked replicas of the system
+
+    the selected rules are split into contiguous ranges, one per worker process
+    each worker invokes its rules from the pre-edge state, reverting after each one, and returns
+    the leaves written (checkpoint encodings, see checkpoint.py) and the printout as text
+    the parent builds invocations from these, which Clock.event commits in the usual order,
+    so results (and the model state hash) are the same as evaluating the rules in the parent
+
+    replicas are kept in step by sending the changes committed on the previous edge with the
+    next request; if the system state was changed any other way (undo, checkpoint restore, a
+    testbench writing leaves) the model state hash differs and all leaves are sent instead
+
+    threads are not used, even where python has no GIL, because a rule writes directly to the
+    system state as it runs
+    '''
+    def __init__(self, simulator, num_workers):
+        self.simulator = simulator
+        self.num_workers = num_workers
+        self.clock_positions = {id(c):i for i,(c,_) in enumerate(simulator.clocks)}
+        table = simulator.system._dp_leaf_table
+        self.state_types = [type(c)._dp_state_types[n] for c,n in zip(table.components, table.names)]
+        self.workers = None
+        self.synced_hash = None
+        self.pending = ()
+
+    def start(self):
+        # forked on first use, so the replicas include any setup after the simulator was made
+        self.workers = replica.ReplicaWorkers(self.num_workers, self.worker_main, self.simulator, self.state_types)
+        self.synced_hash = self.simulator.system._dp_model_state_hash
+        self.pending = ()
+
+    def evaluate(self, clock, selected_rules):
+        'the uncommitted invocations of the selected rules that are not guarded, in order'
+        if self.workers is None:
+            self.start()
+        system = self.simulator.system
+        if system._dp_model_state_hash == self.synced_hash:
+            sync = self.pending
+        else:
+            sync = tuple(enumerate(checkpoint.encode_leaves(system)))
+
+        offsets = {id(p):offset for p,offset in zip(clock.rules.sequences, clock.rules.offsets)}
+        rule_indices = [offsets[id(r.parameterised_rule)] + r.param_index for r in selected_rules]
+        clock_position = self.clock_positions[id(clock)]
+        ranges = replica.split_range(0, len(selected_rules), len(self.workers))
+        for w,(start,stop) in enumerate(ranges):
+            self.workers.send(w, (sync, clock_position, rule_indices[start:stop]))
+
+        results = []
+        errors = []
+        for w,(start,_) in enumerate(ranges):
+            reply = self.workers.recv(w)
+            if isinstance(reply, tuple):
+                position, description = reply
+                errors.append((None if position is None else start + position, description))
+            else:
+                results.extend(reply)
+        if errors:
+            # force a full sync next time, the replicas may be part way through a rule
+            self.synced_hash = None
+            position, description = errors[0]
+            if position is not None:
+                # same state here, so this raises the same exception with a useful traceback
+                selected_rules[position].invoke(check = True, print_headers = False, show_print = False)
+            raise AssertionError(f'rule evaluation failed in replica: {description}')
+
+        table = system._dp_leaf_table
+        successful = []
+        pending = []
+        expected_hash = system._dp_model_state_hash
+        for r,result in zip(selected_rules, results):
+            if result is None:
+                continue
+            changes, printout = result
+            inv = rule.Invocation(r)
+            for leaf_id,plain in changes:
+                component = table.components[leaf_id]
+                leaf_name = table.names[leaf_id]
+                before = object.__getattribute__(component, leaf_name)
+                after = self.state_types[leaf_id]._dp_decode_value(component, leaf_name, plain)
+                change = inv.state_changes[leaf_id] = rule.LeafStateChange(table, leaf_id, before, after)
+                expected_hash += change.hash_a_leaf(after) - change.hash_a_leaf(before)
+            inv.printout = printout
+            successful.append(inv)
+            pending.extend(changes)
+
+        # state of the replicas once these are committed
+        self.synced_hash = expected_hash
+        self.pending = tuple(pending)
+        return successful
+
+    def close(self):
+        if self.workers is not None:
+            self.workers.close()
+            self.workers = None
+
+    @staticmethod
+    def worker_main(connection, simulator, state_types):
+        system = simulator.system
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            sync, clock_position, rule_indices = message
+            try:
+                checkpoint.decode_changes(system, sync)
+            except Exception as e:
+                connection.send((None, repr(e)))
+                continue
+
+            clock = simulator.clocks[clock_position][0]
+            results = []
+            try:
+                for position,rule_index in enumerate(rule_indices):
+                    inv = clock.rules[rule_index].invoke(
+                        check = True, print_headers = False, show_print = False, buffered = True,
+                    )
+                    if inv.guarded:
+                        results.append(None)
+                        continue
+                    inv.revert_state()
+                    changes = tuple(
+                        (leaf_id, state_types[leaf_id]._dp_encode_value(change.value_after))
+                        for leaf_id,change in inv.state_changes.items()
+                    )
+                    # printed objects may not be picklable, print() would convert them to str anyway
+                    printout = [
+                        (tuple(str(a) for a in args), {k:v for k,v in kwargs.items() if k in ('sep', 'end')})
+                        for args,kwargs in inv.printout
+                    ]
+                    results.append((changes, printout))
+            except Exception as e:
+                connection.send((position, repr(e)))
+            else:
+                connection.send(results)
 
 
 class ClockedSimulator(SimulatorBase):
-    def __init__(self, system, *clock_inputs, random_seed = None):
+    checkpoint_attributes = ('time_ps',)
+
+    # idle-cycle skipping, optional
+    idle = None
+
+    def __init__(self, system, *clock_inputs,
+        random_seed = None,
+        buffered_writes = False,
+        num_edge_workers = 0,
+        skip_idle = False,
+    ):
         super().__init__(system, random_seed)
         self.time_ps = 0
 
+        # rules write to a per-edge buffer committed once, see Clock.event
+        self.buffered_writes = buffered_writes
+
         # clock_inputs is a tuple of dicts:
         #   frequency_GHz or period_ps
         #   phase_ps (optional)
@@ -148,6 +1208,48 @@ class ClockedSimulator(SimulatorBase):
                 clock.set_period_ps(period_ps, phase_ps)
                 if self.fastest_clock is None or period_ps < self.fastest_clock.period_ps:
                     self.fastest_clock = clock
+        self.schedule_clocks()
+
+        # optional forked worker processes evaluating the rules of each clock edge
+        # or optional skipping of rules and clocks that cannot fire, see sensitivity.py
+        assert not (num_edge_workers and skip_idle), 'idle skipping is not available with edge workers'
+        self.edge_evaluator = None
+        self.evaluate_edge = None
+        if num_edge_workers:
+            self.edge_evaluator = ParallelEdgeEvaluator(self, num_edge_workers)
+            self.evaluate_edge = self.edge_evaluator.evaluate
+        elif skip_idle:
+            self.idle = sensitivity.IdleTracker(self)
+            self.evaluate_edge = self.idle.evaluate
+
+    def close(self):
+        'stop any worker processes'
+        if self.edge_evaluator is not None:
+            self.edge_evaluator.close()
+
+    def schedule_clocks(self):
+        '''make the event queue: a heap of (next_event_time_ps, position in self.clocks)
+
+        position breaks ties, so coincident edges are taken in the order clocks were given
+        must be called if clock event times are changed other than by clock events
+        '''
+        parked = () if self.idle is None else self.idle.parked
+        self.event_queue = [(c.next_event_time_ps, i) for i,(c,_) in enumerate(self.clocks) if i not in parked]
+        heapq.heapify(self.event_queue)
+
+    def schedule_clock(self, position):
+        'put a clock which is not in the event queue back in it'
+        heapq.heappush(self.event_queue, (self.clocks[position][0].next_event_time_ps, position))
+
+    def next_clock_position(self):
+        'position in self.clocks of the clock with the earliest event, None if all are parked'
+        while self.event_queue:
+            time_ps, i = self.event_queue[0]
+            if time_ps == self.clocks[i][0].next_event_time_ps:
+                return i
+            # event time changed outside the simulator
+            self.schedule_clocks()
+        return None
 
     def sim_end_time(self, duration_ps = None, cycles = None, cycles_of_fastest_clock = None):
         if duration_ps is None:
@@ -159,17 +1261,64 @@ class ClockedSimulator(SimulatorBase):
 
     def select_rules(self, clock, clock_name):
         'prior to clock event, select maximum one rule for each method'
-        return [self.rand_gen.choice(rules) for rules in clock.rules_by_method.values()]
+        return [rules.sample(self.rand_gen) for rules in clock.rules_by_method.values()]
+
+    def wake_idle_rules(self):
+        '''with skip_idle, wake all sleeping rules at the next clock edge
+
+        call after changing anything other than system state that guards read, eg pushing
+        to a StimulusQueue; changes to system state are found without this
+        '''
+        if self.idle is not None:
+            self.idle.wake_pending = True
 
     def run_one_step(self, final_time_ps, show_print, print_headers):
+        # a subclass which replaces this generator (rather than wrapping it) does not record
+        # steps for history, coverage and tracing, nor use edge workers or idle skipping,
+        # unless it calls record_step() and passes evaluate_edge to Clock.event() itself
+        i = len(self.clocks)
         while True:
-            clock, clock_name = min(self.clocks)
+            if self.idle is not None:
+                self.idle.check_outside_changes(i)
+            i = self.next_clock_position()
+            if i is None:
+                break
+            clock, clock_name = self.clocks[i]
             if clock.next_event_time_ps > final_time_ps:
                 break
             self.time_ps = clock.next_event_time_ps
             selected_rules = self.select_rules(clock, clock_name)
-            clock.event(selected_rules, show_print, print_headers)
+            invocations = clock.event(selected_rules, show_print, print_headers, self.buffered_writes, self.evaluate_edge)
+            self.record_step(invocations)
+            if self.idle is None:
+                heapq.heapreplace(self.event_queue, (clock.next_event_time_ps, i))
+            else:
+                heapq.heappop(self.event_queue)
+                self.idle.committed(i, invocations)
             yield
+        if self.idle is not None:
+            self.idle.finish(final_time_ps)
+
+    def history_position(self):
+        return self.time_ps, tuple((c.next_event_time_ps, c.num_events) for c,_ in self.clocks)
+
+    def trace_time(self):
+        return self.time_ps
+
+    def set_history_position(self, position):
+        self.time_ps, clock_states = position
+        for (clock,_),(next_event_time_ps, num_events) in zip(self.clocks, clock_states):
+            clock.next_event_time_ps = next_event_time_ps
+            clock.num_events = num_events
+        if self.idle is not None:
+            self.idle.reset()
+        self.schedule_clocks()
+
+    def restore_checkpoint_state(self, saved):
+        super().restore_checkpoint_state(saved)
+        if self.idle is not None:
+            self.idle.reset()
+        self.schedule_clocks()
 
     def run(self,
         duration_ps = None,
@@ -179,5 +1328,6 @@ class ClockedSimulator(SimulatorBase):
         print_headers = True,
     ):
         final_time_ps = self.sim_end_time(duration_ps, cycles, cycles_of_fastest_clock)
-        for step in self.run_one_step(final_time_ps, show_print, print_headers):
+        for step in self.run_one_step(final_time_ps, self.printing(show_print), print_headers):
             pass
+        self.flush_log()
@@ -0,0 +1,36 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+In-memory snapshot of the state of an elaborated system, for reset and reuse
+
+Leaf values are never modified in place (a rule sets a new value) so a snapshot just keeps
+references to them, in leaf-id order (see leaf_table.py)
+The model state hash is saved rather than recomputed
+Clock event times and counts are saved, as simulators modify them
+
+Stimulus queue storage is shared with the implementation model and is not part of a snapshot
+'''
+
+
+class SystemSnapshot:
+    def __init__(self, system):
+        self.system = system
+        table = system._dp_leaf_table
+        self.leaf_values = [object.__getattribute__(c, n) for c,n in zip(table.components, table.names)]
+        self.model_state_hash = system._dp_model_state_hash
+        self.clocks = [(clock, dict(vars(clock))) for clock in system.find_clock()]
+
+    def restore(self):
+        'put the system back into the saved state, outside of any rule invocation'
+        system = self.system
+        assert system._dp_current_invocation is None, 'cannot restore a snapshot inside a rule'
+        table = system._dp_leaf_table
+        for component,leaf_name,value in zip(table.components, table.names, self.leaf_values):
+            component._dp_raw_setattr(leaf_name, value)
+        system._dp_raw_setattr('_dp_model_state_hash', self.model_state_hash)
+        for clock,clock_state in self.clocks:
+            vars(clock).clear()
+            vars(clock).update(clock_state)
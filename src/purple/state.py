@@ -57,6 +57,14 @@ def Enumeration(*args, **kwargs):
         def _dp_all_possible_values(cls):
             return cls.enum_class
 
+        @classmethod
+        def _dp_encode_defined_value(cls, value):
+            return ('e', value.name)
+
+        @classmethod
+        def _dp_decode_defined_value(cls, owner, name, plain):
+            return cls.enum_class[plain[1]]
+
         @classmethod
         def _dp_on_instantiation(cls, owner_class, name_in_owner):
             # put the actual Python enum class into any class where the enum is instantiated
@@ -0,0 +1,151 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Memory-bounded store of model state hashes, for the failing states of a checksearch
+(see StimulusIOCheckerState)
+
+The default store is a python set, which is exact and unbounded
+CompactStateStore keeps state hashes, folded to 64 bits, in an open-addressed array('Q')
+with linear probing, taking at most max_bytes
+    when the table is full, an entry is evicted by the clock algorithm (an approximation
+    of least-recently-used): entries found or added are marked, and the clock hand clears
+    marks until it finds an unmarked entry
+    optionally a share of the memory is a Bloom filter which remembers evicted entries
+
+Forgetting a failing state only costs search time: the state is searched again
+A Bloom filter can wrongly report a state as failing, with probability rising as it fills,
+which like a hash collision could make checksearch miss a rule sequence; the chance is
+small with a large enough filter, but it is not zero, so the Bloom tier is off by default
+'''
+
+import array
+
+from . import coverage
+
+# bytes per table slot: 64-bit key and a clock mark
+SLOT_BYTES = 9
+
+
+class CompactStateStore:
+    def __init__(self, max_bytes = 64 << 20, bloom_fraction = 0.0, bloom_hashes = 4):
+        assert 0.0 <= bloom_fraction < 1.0
+        table_bytes = int(max_bytes * (1.0 - bloom_fraction))
+        num_slots = 1 << max(4, (table_bytes // SLOT_BYTES).bit_length() - 1)
+        self.keys = array.array('Q', bytes(8 * num_slots))
+        self.marks = bytearray(num_slots)
+        self.mask = num_slots - 1
+        # linear probing slows down when the table is nearly full
+        self.max_entries = num_slots * 3 // 4
+        self.num_entries = 0
+        self.hand = 0
+        self.num_evicted = 0
+
+        bloom_bits = int(max_bytes * bloom_fraction) * 8
+        if bloom_bits >= 64:
+            bloom_bits = 1 << (bloom_bits.bit_length() - 1)
+            self.bloom = bytearray(bloom_bits // 8)
+        else:
+            self.bloom = None
+        self.bloom_mask = bloom_bits - 1
+        self.bloom_hashes = bloom_hashes
+
+    def __len__(self):
+        return self.num_entries
+
+    @property
+    def memory_bytes(self):
+        return len(self.keys) * 8 + len(self.marks) + (0 if self.bloom is None else len(self.bloom))
+
+    @staticmethod
+    def key(state_hash):
+        # zero marks an empty slot
+        return coverage.mix_64(state_hash) or 1
+
+    def slot(self, k):
+        'index of the slot holding k, or of the empty slot where it would go'
+        keys = self.keys
+        mask = self.mask
+        i = k & mask
+        while True:
+            found = keys[i]
+            if found == k or found == 0:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, state_hash):
+        k = self.key(state_hash)
+        i = self.slot(k)
+        if self.keys[i]:
+            self.marks[i] = 1
+            return True
+        return self.bloom is not None and self.bloom_contains(k)
+
+    def add(self, state_hash):
+        k = self.key(state_hash)
+        i = self.slot(k)
+        if not self.keys[i]:
+            if self.num_entries >= self.max_entries:
+                self.evict()
+                i = self.slot(k)
+            self.keys[i] = k
+            self.num_entries += 1
+        self.marks[i] = 1
+
+    def evict(self):
+        keys = self.keys
+        marks = self.marks
+        mask = self.mask
+        hand = self.hand
+        while True:
+            i = hand
+            hand = (hand + 1) & mask
+            if not keys[i]:
+                continue
+            if marks[i]:
+                marks[i] = 0
+                continue
+            break
+        self.hand = hand
+        if self.bloom is not None:
+            self.bloom_add(keys[i])
+        self.delete(i)
+        self.num_evicted += 1
+
+    def delete(self, i):
+        'empty slot i, moving back later entries of the probe sequence so they can be found'
+        keys = self.keys
+        marks = self.marks
+        mask = self.mask
+        keys[i] = 0
+        marks[i] = 0
+        j = i
+        while True:
+            j = (j + 1) & mask
+            k = keys[j]
+            if not k:
+                break
+            home = k & mask
+            if ((j - home) & mask) >= ((j - i) & mask):
+                keys[i] = k
+                marks[i] = marks[j]
+                keys[j] = 0
+                marks[j] = 0
+                i = j
+        self.num_entries -= 1
+
+    def bloom_positions(self, k):
+        h1 = k & 0xffffffff
+        h2 = (k >> 32) | 1
+        return (((h1 + n * h2) & self.bloom_mask) for n in range(self.bloom_hashes))
+
+    def bloom_add(self, k):
+        bloom = self.bloom
+        for p in self.bloom_positions(k):
+            bloom[p >> 3] |= 1 << (p & 7)
+
+    def bloom_contains(self, k):
+        bloom = self.bloom
+        return all(bloom[p >> 3] & (1 << (p & 7)) for p in self.bloom_positions(k))
@@ -0,0 +1,249 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple implementation
+======================
+
+Trace of every leaf change in a simulation, see SimulatorBase.record_trace()
+
+The trace file is append-only
+    header
+    chunks of up to chunk_size records (leaf id, time, value), stored by column
+        leaf ids and times as arrays, values as their checkpoint encodings (see checkpoint.py)
+        each chunk serialised with marshal and compressed with zlib
+    index, written on close
+        full names of the leaves, by leaf id
+        for each chunk its file position, first and last time and the leaf ids it contains
+
+Time is time_ps for the clocked simulator and the number of steps for the atomic-rule one
+The first records are the values of all leaves when recording started
+After each committed step, the leaves written are recorded if their values changed
+After undo/redo or checkpoint restore, leaves which differ from the last recorded values, or
+were last recorded after the restored time, are recorded at the restored time; a time can then
+appear again later in the file
+
+TraceReader only decompresses chunks which contain the leaves asked for, in the time range
+asked for, so queries on a large trace do not read all of it
+value_at() gives the last recorded value at or before a time, so after undo it follows the
+timeline that was recorded last; changes() lists every recording in file order
+'''
+
+import array
+import collections
+import marshal
+import sys
+import zlib
+
+from . import checkpoint, common
+
+MAGIC = b'PURPLETR'
+MAGIC_END = b'PURPLEIX'
+VERSION = 1
+
+TraceFormatError = common.PurpleException.subclass('TraceFormatError')
+TraceLeafNotFound = common.PurpleException.subclass('TraceLeafNotFound')
+
+
+class TraceRecorder:
+    def __init__(self, system, destination, time, chunk_size = 4096, compress_level = 6):
+        self.system = system
+        self.table = system._dp_leaf_table
+        self.chunk_size = chunk_size
+        self.compress_level = compress_level
+        self.file = open(destination, 'wb')
+        self.file.write(MAGIC + bytes((VERSION, sys.byteorder == 'little')))
+        self.chunks = [] # (file position, size, first time, last time, leaf ids)
+        self.num_records = 0
+        self.new_chunk()
+
+        # last recorded encoding of each leaf, and the time it was recorded
+        self.current = list(checkpoint.encode_leaves(system))
+        self.last_times = [time] * len(self.current)
+        for leaf_id,plain in enumerate(self.current):
+            self.append(leaf_id, time, plain)
+
+    def new_chunk(self):
+        self.leaf_ids = array.array('I')
+        self.times = array.array('q')
+        self.values = []
+
+    def append(self, leaf_id, time, plain):
+        self.last_times[leaf_id] = time
+        self.leaf_ids.append(leaf_id)
+        self.times.append(time)
+        self.values.append(plain)
+        self.num_records += 1
+        if len(self.values) >= self.chunk_size:
+            self.write_chunk()
+
+    def encoded_leaf(self, leaf_id):
+        component = self.table.components[leaf_id]
+        leaf_name = self.table.names[leaf_id]
+        value = object.__getattribute__(component, leaf_name)
+        return checkpoint.leaf_state_type(component, leaf_name)._dp_encode_value(value)
+
+    def record(self, invocations, time):
+        'after a committed step, record the leaves it wrote'
+        current = self.current
+        for inv in invocations:
+            for leaf_id in inv.state_changes:
+                if leaf_id >= len(current):
+                    # allocated after elaboration, see LeafTable.leaf_id()
+                    self.last_times.extend([time] * (leaf_id + 1 - len(current)))
+                    current.extend([common.UniqueObject] * (leaf_id + 1 - len(current)))
+                plain = self.encoded_leaf(leaf_id)
+                if plain != current[leaf_id]:
+                    current[leaf_id] = plain
+                    self.append(leaf_id, time, plain)
+
+    def snapshot(self, time):
+        '''record all leaves which changed other than by committed steps
+
+        also those recorded later than time in the abandoned timeline, which value_at()
+        would otherwise find
+        '''
+        current = self.current
+        last_times = self.last_times
+        for leaf_id,plain in enumerate(checkpoint.encode_leaves(self.system)):
+            if leaf_id >= len(current):
+                current.append(common.UniqueObject)
+                last_times.append(time)
+            if plain != current[leaf_id] or last_times[leaf_id] > time:
+                current[leaf_id] = plain
+                self.append(leaf_id, time, plain)
+
+    def write_chunk(self):
+        if not self.values:
+            return
+        data = marshal.dumps((self.leaf_ids.tobytes(), self.times.tobytes(), self.values))
+        data = zlib.compress(data, self.compress_level)
+        position = self.file.tell()
+        self.file.write(data)
+        self.chunks.append((
+            position, len(data), min(self.times), max(self.times), tuple(sorted(set(self.leaf_ids))),
+        ))
+        self.new_chunk()
+
+    def close(self):
+        'write any unfinished chunk and the index; the trace can then be read'
+        self.write_chunk()
+        names = tuple(self.table.full_name(i) for i in range(len(self.table)))
+        index = zlib.compress(marshal.dumps((names, tuple(self.chunks))), self.compress_level)
+        position = self.file.tell()
+        self.file.write(index)
+        self.file.write(position.to_bytes(8, 'little') + MAGIC_END)
+        self.file.close()
+
+
+class TraceReader:
+    '''queries on a trace file written by TraceRecorder
+
+    leaves are named by their full hierarchical name, eg 'top.rob.head'
+    values are checkpoint encodings (plain python values), unless a system elaborated from
+    the same declarations is given, when they are decoded into leaf values
+    '''
+    def __init__(self, source, system = None, cache_size = 16):
+        self.file = open(source, 'rb')
+        header = self.file.read(len(MAGIC) + 2)
+        TraceFormatError.insist(header[:len(MAGIC)] == MAGIC, 'not a purple trace file')
+        version, little_endian = header[len(MAGIC):]
+        TraceFormatError.insist(version == VERSION, f'trace version {version} not supported')
+        self.byteorder = 'little' if little_endian else 'big'
+
+        self.file.seek(-8 - len(MAGIC_END), 2)
+        tail = self.file.read()
+        TraceFormatError.insist(tail[8:] == MAGIC_END, 'trace file has no index, was it closed?')
+        self.file.seek(int.from_bytes(tail[:8], 'little'))
+        names, chunks = marshal.loads(zlib.decompress(self.file.read()[:-8 - len(MAGIC_END)]))
+        self.names = names
+        self.ids_by_name = {n:i for i,n in enumerate(names)}
+        self.chunks = [(p, s, t0, t1, frozenset(ids)) for p,s,t0,t1,ids in chunks]
+
+        self.system = system
+        self.cache = collections.OrderedDict()
+        self.cache_size = cache_size
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def first_time(self):
+        return min(t0 for _,_,t0,_,_ in self.chunks)
+
+    @property
+    def last_time(self):
+        return max(t1 for _,_,_,t1,_ in self.chunks)
+
+    def leaf_ids(self, name):
+        'ids of the leaf with this full name, or of all leaves in the component or record with this name'
+        leaf_id = self.ids_by_name.get(name, None)
+        if leaf_id is not None:
+            return (leaf_id,)
+        prefix = name + '.'
+        ids = tuple(i for i,n in enumerate(self.names) if n.startswith(prefix))
+        TraceLeafNotFound.insist(ids, f'no leaf named {name} in trace')
+        return ids
+
+    def chunk(self, index):
+        'columns (leaf ids, times, values) of a chunk, decompressed at most once while cached'
+        columns = self.cache.get(index, None)
+        if columns is not None:
+            self.cache.move_to_end(index)
+            return columns
+        position, size = self.chunks[index][:2]
+        self.file.seek(position)
+        leaf_ids, times, values = marshal.loads(zlib.decompress(self.file.read(size)))
+        columns = array.array('I'), array.array('q'), values
+        columns[0].frombytes(leaf_ids)
+        columns[1].frombytes(times)
+        if self.byteorder != sys.byteorder:
+            columns[0].byteswap()
+            columns[1].byteswap()
+        self.cache[index] = columns
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last = False)
+        return columns
+
+    def decode(self, leaf_id, plain):
+        if self.system is None:
+            return plain
+        table = self.system._dp_leaf_table
+        component = table.components[leaf_id]
+        leaf_name = table.names[leaf_id]
+        return checkpoint.leaf_state_type(component, leaf_name)._dp_decode_value(component, leaf_name, plain)
+
+    def value_at(self, name, time):
+        'value of a leaf at a time: the last recorded at or before it'
+        leaf_id, = self.leaf_ids(name)
+        for index in range(len(self.chunks) - 1, -1, -1):
+            _, _, first_time, _, ids = self.chunks[index]
+            if first_time > time or leaf_id not in ids:
+                continue
+            leaf_ids, times, values = self.chunk(index)
+            for i in range(len(values) - 1, -1, -1):
+                if leaf_ids[i] == leaf_id and times[i] <= time:
+                    return self.decode(leaf_id, values[i])
+        raise TraceLeafNotFound(f'{name} not recorded at or before time {time}')
+
+    def changes(self, name, first_time = None, last_time = None):
+        '''list of (time, leaf name, value) for a leaf, or all leaves of a component or record,
+        between two times inclusive, in recorded order
+        '''
+        wanted = set(self.leaf_ids(name))
+        first_time = -sys.maxsize if first_time is None else first_time
+        last_time = sys.maxsize if last_time is None else last_time
+        found = []
+        for index,(_, _, t0, t1, ids) in enumerate(self.chunks):
+            if t1 < first_time or t0 > last_time or wanted.isdisjoint(ids):
+                continue
+            leaf_ids, times, values = self.chunk(index)
+            for leaf_id,time,plain in zip(leaf_ids, times, values):
+                if leaf_id in wanted and first_time <= time <= last_time:
+                    found.append((time, self.names[leaf_id], self.decode(leaf_id, plain)))
+        return found
@@ -99,5 +99,14 @@ def Tuple(entry_cls):
 
             return TupleObject(owner, name, fixed_value)
 
+        @classmethod
+        def _dp_encode_defined_value(cls, value):
+            return ('t', tuple(cls.param_entry_cls._dp_encode_value(v) for v in value))
+
+        @classmethod
+        def _dp_decode_defined_value(cls, owner, name, plain):
+            entries = [cls.param_entry_cls._dp_decode_value(None, '', p) for p in plain[1]]
+            return cls._dp_check_and_cast_including_undef(owner, name, entries)
+
     cls_name = f'Tuple_{entry_cls.__name__}'
     return leaf.Leaf.subclass(cls_name, TupleLeafState)
@@ -15,7 +15,7 @@ Union classes will test True for equality if they have the same option set,
 but may have different priority (order) among option classes
 '''
 
-from . import common, metaclass
+from . import common, metaclass, model
 
 
 class UnionInitialValue:
@@ -40,8 +40,41 @@ class Union(common.PurpleComponent, metaclass = metaclass.UnionMetaClass):
         # but will call -dp-transient-init for each one to place it into the record
         # and the Union -dp-transient-init might return a different object, eg if there are
         # 2 leaves that can cast the same value to different outcomes
-        for option_cls in cls._dp_union_ordered_options:
-            yield from option_cls._dp_all_possible_values()
+        yield from cls._dp_indexable_possible_values()
+
+    @classmethod
+    def _dp_indexable_possible_values(cls):
+        return common.ChainSequence(
+            option_cls._dp_indexable_possible_values() for option_cls in cls._dp_union_ordered_options
+        )
+
+    @classmethod
+    def _dp_encode_defined_value(cls, value):
+        '''('o', option index, option encoding) where the option encoding is ('c',) for the
+        static record instance that a Union attribute of a Model or static Record points to
+        '''
+        for i,option_cls in enumerate(cls._dp_union_ordered_options):
+            if isinstance(option_cls, metaclass.PurpleLeafMetaClass):
+                # first leaf option that reproduces the value exactly
+                try:
+                    plain = option_cls._dp_encode_value(value)
+                    decoded = option_cls._dp_decode_value(None, '', plain)
+                except Exception:
+                    continue
+                if type(decoded) is type(value) and decoded == value:
+                    return ('o', i, plain)
+            elif isinstance(value, option_cls):
+                if isinstance(value, model.Model):
+                    return ('o', i, ('c',))
+                return ('o', i, option_cls._dp_encode_value(value))
+        raise TypeError(f'cannot encode union value of type {type(value)}')
+
+    @classmethod
+    def _dp_decode_defined_value(cls, owner, name, plain):
+        _,i,option_plain = plain
+        if option_plain == ('c',):
+            return object.__getattribute__(owner, '_dp_union_instances')[name][i]
+        return cls._dp_union_ordered_options[i]._dp_decode_value(owner, name, option_plain)
 
     @classmethod
     def _dp_transient_init(cls, default, changes, owner, name):
@@ -218,8 +251,7 @@ class Union(common.PurpleComponent, metaclass = metaclass.UnionMetaClass):
         instantiating_component._dp_union_instances[name] = instance_list
         all_leaf_state = ()
 
-        is_a_leaf = ((instantiating_component, name))
-        contains_a_leaf = False
+        is_a_leaf = (instantiating_component, name)
         for opt in cls._dp_union_ordered_options:
             # initialise no more then one option class to UnSelected
             if opt is selected and initial_value is not common.UnSelected:
@@ -230,7 +262,6 @@ class Union(common.PurpleComponent, metaclass = metaclass.UnionMetaClass):
             new_instance = instantiating_component._dp_raw_getattr(name)
             if leaf_state and any(s == is_a_leaf for s in leaf_state):
                 assert len(leaf_state) == 1
-                contains_a_leaf = True
                 instance_list.append(common.UniqueObject)
             else:
                 all_leaf_state += leaf_state
@@ -240,9 +271,9 @@ class Union(common.PurpleComponent, metaclass = metaclass.UnionMetaClass):
 
         instantiating_component._dp_raw_setattr(name, start_instance)
 
-        if contains_a_leaf:
-            all_leaf_state += is_a_leaf
-        return all_leaf_state
+        # the owner attribute is a leaf even if all options are records, because
+        # it changes to point to the static record of the selected option
+        return all_leaf_state + (is_a_leaf,)
 
     @classmethod
     def _dp_instance_setattr_leaf_changes(cls, owner, name, current, value):
@@ -25,11 +25,12 @@ Notes:
     check-search is paused and resumed as the implementation-sim advances
 '''
 
-from . import common, port, parameterise, model, leaf
+from . import common, port, parameterise, model, leaf, replica
 import enum
 
 
 StimulusQueueNeedsMoreData = common.PurpleException.subclass('StimulusQueueNeedsMoreData')
+StimulusWindowTooSmall = common.PurpleException.subclass('StimulusWindowTooSmall')
 
 @parameterise.Generic
 def StimulusQueue(entry_cls):
@@ -48,6 +49,10 @@ def StimulusQueue(entry_cls):
         will raise a StimulusQueueNeedsMoreData exception if it can't behave as if its store is complete
         after this exception, it should normally be possible to add push more stimulus to the queue
         (eg by running some more of a clocked simulation) and then continue
+
+    entries before a position can be reclaimed, when no search can go back before it (see
+    StimulusIOCheckerState history_window); read pointers still count from the first entry
+    pushed, and reading a reclaimed entry raises StimulusWindowTooSmall
     '''
     frozen_entry_cls = entry_cls._dp_make_frozen_class()
 
@@ -66,6 +71,25 @@ def StimulusQueue(entry_cls):
                 self.store_is_complete = False
                 self.max_read_pointer = 0
                 self.store = list()
+                self.num_reclaimed = 0
+                self.last_time_ps = None
+
+            def __len__(self):
+                'number of entries pushed, including those reclaimed'
+                return self.num_reclaimed + len(self.store)
+
+            def entry(self, index):
+                StimulusWindowTooSmall.insist(
+                    index >= self.num_reclaimed,
+                    f'stimulus entry {index} of {".".join((*self.owner.name, self.name))} has been reclaimed',
+                )
+                return self.store[index - self.num_reclaimed]
+
+            def reclaim(self, index):
+                'forget the entries before index'
+                if index > self.num_reclaimed:
+                    del self.store[:index - self.num_reclaimed]
+                    self.num_reclaimed = index
 
         def __init__(self, read_pointer, shared_state):
             self.read_pointer = read_pointer
@@ -81,10 +105,10 @@ def StimulusQueue(entry_cls):
         def __str__(self):
             ss = self.shared_state
             name = '.'.join((*ss.owner.name, ss.name))
-            return f'{name}/queue({self.read_pointer}, {len(ss.store)})'
+            return f'{name}/queue({self.read_pointer}, {len(ss)})'
 
         def __len__(self):
-            return len(self.shared_state.store) - self.read_pointer
+            return len(self.shared_state) - self.read_pointer
 
         def push(self, value, time_ps, store_is_complete = False):
             ss = self.shared_state
@@ -96,8 +120,9 @@ def StimulusQueue(entry_cls):
                 v_frozen = value.freeze() if self.freeze_new_entries else value
 
             # require in-order stimulus capture
-            assert (not ss.store) or time_ps >= ss.store[-1][1]
+            assert ss.last_time_ps is None or time_ps >= ss.last_time_ps
             ss.store.append((v_frozen, time_ps))
+            ss.last_time_ps = time_ps
             ss.store_is_complete = store_is_complete
 
         def completed(self):
@@ -108,12 +133,12 @@ def StimulusQueue(entry_cls):
 
         def peek(self):
             ss = self.shared_state
-            have_data = self.read_pointer < len(ss.store)
+            have_data = self.read_pointer < len(ss)
             if ss.store_is_complete:
                 common.GuardFailed.insist(have_data)
             else:
                 StimulusQueueNeedsMoreData.insist(have_data)
-            return ss.store[self.read_pointer]
+            return ss.entry(self.read_pointer)
 
         def pop(self):
             rv = self.peek()
@@ -141,6 +166,16 @@ def StimulusQueue(entry_cls):
             else:
                 assert False
 
+        @classmethod
+        def _dp_encode_defined_value(cls, value):
+            # the store is shared with the implementation model and is not encoded
+            return ('q', value.read_pointer)
+
+        @classmethod
+        def _dp_decode_defined_value(cls, owner, name, plain):
+            current = object.__getattribute__(owner, name)
+            return cls.attr_class(plain[1], current.shared_state)
+
     cls_name = f'StimulusQueue_{entry_cls.__name__}'
     return leaf.Leaf.subclass(cls_name, StimulusQueue_base)
 
@@ -202,24 +237,130 @@ class StimulusIOCheckerState:
         self.state = self.StateEnum.Failed
         return self
 
-    def __init__(self, spec_testbench):
+    def __init__(self, spec_testbench,
+        failing_state_hashes = None,
+        sleep_sets = False,
+        quiet = False,
+        history_window = None,
+    ):
+        '''failing_state_hashes may be a memory-bounded store, see statestore.py
+
+        the default is a set, which is exact but grows without limit
+        sleep_sets enables partial-order reduction, see StimulusIOTestbenchBase.checksearch()
+        quiet rules print nothing while searching; their printout is kept and only the rule
+        history is printed when the search passes, or the deepest history reached when it
+        fails (see produce_printout())
+        history_window is the number of rules of the rule history kept for backtracking, see
+        commit_history(); None keeps them all
+        '''
         self.spec_testbench = spec_testbench
         self.rule_history = []
         self.index_history = [0]
         self.num_invocations = 0
-        self.failing_state_hashes = set()
+        self.failing_state_hashes = set() if failing_state_hashes is None else failing_state_hashes
+        self.num_hash_lookups = 0
         self.num_hash_matches = 0
-        self.all_rules = tuple(spec_testbench.find_rule())
+        self.all_rules = spec_testbench.rule_sequence()
         self.state = self.StateEnum.New
 
+        # for each level of index_history, the sleeping rules {rule_index:(read_ids, write_ids)}
+        self.sleep_sets = sleep_sets
+        self.sleep_history = [dict()]
+        self.num_sleep_skips = 0
+
+        # when quiet, the longest rule history reached, sharing its first num_deepest_shared
+        # rules with the current one
+        self.quiet = quiet
+        self.deepest_history = []
+        self.num_deepest_shared = 0
+
+        self.history_window = history_window
+        self.num_committed = 0
+
+    def extend_deepest(self):
+        'after a rule is added to the rule history'
+        rule_history = self.rule_history
+        if len(rule_history) > len(self.deepest_history):
+            del self.deepest_history[self.num_deepest_shared:]
+            self.deepest_history.extend(rule_history[self.num_deepest_shared:])
+            self.num_deepest_shared = len(rule_history)
+
+    def shorten_deepest(self):
+        'after a rule is removed from the rule history'
+        self.num_deepest_shared = min(self.num_deepest_shared, len(self.rule_history))
+
+    def commit_history(self):
+        '''keep at most history_window rules of the rule history, and reclaim stimulus
+
+        older rules are committed: the search can no longer backtrack through them, so the
+        stimulus entries they consumed are reclaimed (see StimulusQueue); committed rules are
+        printed if quiet, as they are part of any rule sequence found
+        if the search then fails, it may have needed to backtrack further, so it raises
+        StimulusWindowTooSmall rather than fail
+        '''
+        if self.history_window is None or len(self.rule_history) <= self.history_window:
+            return
+        num_to_commit = len(self.rule_history) - self.history_window
+        committed = self.rule_history[:num_to_commit]
+        retained = self.rule_history[num_to_commit:]
+        if self.quiet:
+            for invocation in committed:
+                invocation.produce_printout(headers = True)
+            if self.num_deepest_shared >= num_to_commit:
+                del self.deepest_history[:num_to_commit]
+                self.num_deepest_shared -= num_to_commit
+            else:
+                self.deepest_history = list(retained)
+                self.num_deepest_shared = len(retained)
+
+        del self.rule_history[:num_to_commit]
+        del self.index_history[:num_to_commit]
+        if self.sleep_sets:
+            del self.sleep_history[:num_to_commit]
+        self.num_committed += num_to_commit
+
+        # read pointers in the oldest state the search can go back to
+        testbench = self.spec_testbench
+        queues = {id(sq):sq.queue for sq in testbench.stimulus_inputs() + testbench.stimulus_outputs()}
+        read_pointers = {i:q.read_pointer for i,q in queues.items()}
+        for invocation in reversed(retained):
+            for change in invocation.state_changes.values():
+                i = id(change.component)
+                if i in queues and change.leaf_name == 'queue':
+                    read_pointers[i] = change.value_before.read_pointer
+        for i,queue in queues.items():
+            ss = queue.shared_state
+            # keep the last entry matched, for report_after_fail()
+            ss.reclaim(min(read_pointers[i], ss.max_read_pointer))
+
+    def produce_printout(self, deepest = False, headers = True):
+        '''print (or send to the testbench log sink) the printout of the rules in the rule history
+
+        or in the deepest rule history reached, which is only recorded when quiet
+        '''
+        for invocation in (self.deepest_history if deepest else self.rule_history):
+            invocation.produce_printout(headers)
+
     def show(self, title, time_ps, total_ps):
         print('**', title, '**')
         print('  time simulated (ns):', time_ps / 1000, 'out of', total_ps / 1000)
         print('  current number of unmatched outputs:', self.spec_testbench.num_unmatched_outputs())
         print('  number of atomic rules in current history:', len(self.rule_history))
+        if self.history_window is not None:
+            testbench = self.spec_testbench
+            num_kept = sum(len(sq.queue.shared_state.store) for sq in testbench.stimulus_inputs() + testbench.stimulus_outputs())
+            print('  number of atomic rules committed:', self.num_committed)
+            print('  number of stimulus entries kept:', num_kept)
         print('  number of atomic rules tested:', self.num_invocations)
         print('  number of failing states found:', len(self.failing_state_hashes))
         print('  number of hash matches:', self.num_hash_matches)
+        if self.sleep_sets:
+            print('  number of sleeping rules skipped:', self.num_sleep_skips)
+        if self.num_hash_lookups:
+            print(f'  failing-state hit ratio: {self.num_hash_matches / self.num_hash_lookups:.3f}')
+        store = self.failing_state_hashes
+        if hasattr(store, 'memory_bytes'):
+            print(f'  failing-state store: {store.memory_bytes / 2**20:.1f} MB, {store.num_evicted} evicted')
 
 
 class StimulusIOTestbenchBase(model.Model):
@@ -251,6 +392,16 @@ class StimulusIOTestbenchBase(model.Model):
         for sq in self.stimulus_inputs() + self.stimulus_outputs():
             sq.queue.completed()
 
+    def all_stimulus_complete(self):
+        return all(sq.queue.shared_state.store_is_complete for sq in self.stimulus_inputs() + self.stimulus_outputs())
+
+    def log_to(self, sink):
+        'send printout of rules tested by checksearch() to a sink (see logsink.py), None to print'
+        if sink is not None:
+            sink.attach(self)
+        self._dp_raw_setattr('_dp_log_sink', sink)
+        return sink
+
     def report_after_fail(self, num_packets_to_report):
         earliest_nomatch = None
 
@@ -259,10 +410,10 @@ class StimulusIOTestbenchBase(model.Model):
             print('   ', '.'.join(sq.name))
             ss = sq.queue.shared_state
             if ss.store:
-                last_match, last_match_t = ss.store[ss.max_read_pointer]
+                last_match, last_match_t = ss.entry(ss.max_read_pointer)
                 print('        last match', last_match_t, 'ps:', last_match)
-                if len(ss.store) > 1 + ss.max_read_pointer:
-                    first_nomatch, first_nomatch_t = ss.store[1 + ss.max_read_pointer]
+                if len(ss) > 1 + ss.max_read_pointer:
+                    first_nomatch, first_nomatch_t = ss.entry(1 + ss.max_read_pointer)
                     print('        first unmatchable     ', first_nomatch_t, 'ps:', first_nomatch)
                     if earliest_nomatch is None or earliest_nomatch > first_nomatch_t:
                         earliest_nomatch = first_nomatch_t
@@ -279,7 +430,7 @@ class StimulusIOTestbenchBase(model.Model):
             if ss.store:
                 vt = [
                     (v, t, 'UNUSED' if i > ss.max_read_pointer else '')
-                    for i,(v,t) in enumerate(ss.store)
+                    for i,(v,t) in enumerate(ss.store, ss.num_reclaimed)
                     if t <= earliest_nomatch
                 ]
                 for v,t,note in vt[-num_packets_to_report:]:
@@ -287,7 +438,7 @@ class StimulusIOTestbenchBase(model.Model):
             else:
                 print('        no stimulus')
 
-    def checksearch(self, checker_state, allow_zero_rules = False):
+    def checksearch(self, checker_state, allow_zero_rules = False, num_workers = 0):
         '''
         search for a sequence of rules by which the spec model can
         match the inputs and outputs of the implementation model
@@ -295,23 +446,56 @@ class StimulusIOTestbenchBase(model.Model):
         keep going till the DUT output queues are empty - all matched against spec outputs
         stop and request more stimulus as required
 
-        queue history is infinite; stimulus is never deleted
-        could in many cases be restricted eg to 100 samples per port with minimal risk of
-        needing to go back further to find a rule sequence that works
-        this would save memory but maybe not any faster
+        queue history is infinite by default; stimulus is never deleted
+        with a history_window in the checker state, the search only backtracks through that
+        many rules, and stimulus which can no longer be read is reclaimed (see commit_history())
 
         does not test any further if it finds a state whose hash matches a previously
             exhaustively tested state
             this is a bit risky, because hashes can in theory match for different states
+
+        with num_workers, the search is shared between forked worker processes, see
+        ParallelCheckSearch, once all stimulus has been captured (finalise_all_stimulus());
+        before then it is sequential, so that it can stop and wait for more stimulus
+
+        if the checker state has sleep_sets, see checksearch_sleep_sets()
+        if the checker state is quiet, the printout of the rule history is produced at the end,
+        or of the deepest rule history reached if the search fails
         '''
         if checker_state is None:
             checker_state = StimulusIOCheckerState(self)
+        checker_state.commit_history()
 
+        if checker_state.sleep_sets:
+            assert not num_workers, 'parallel checksearch does not use sleep sets'
+            checker_state = self.checksearch_sleep_sets(checker_state, allow_zero_rules)
+        elif num_workers and self.any_unmatched_outputs() and self.all_stimulus_complete():
+            checker_state = ParallelCheckSearch(self, checker_state, num_workers).run()
+        else:
+            checker_state = self.checksearch_depth_first(checker_state, allow_zero_rules)
+
+        if checker_state.quiet and not checker_state.waiting_for_input():
+            checker_state.produce_printout(deepest = checker_state.failed())
+        sink = getattr(self, '_dp_log_sink', None)
+        if sink is not None:
+            sink.flush()
+        StimulusWindowTooSmall.insist(
+            not (checker_state.failed() and checker_state.num_committed),
+            f'no rule sequence found after the {checker_state.num_committed} rules committed by'
+            f' history_window {checker_state.history_window}; a larger window may find one',
+        )
+        return checker_state
+
+    def checksearch_depth_first(self, checker_state, allow_zero_rules = False):
+        'the search of checksearch(), in one process without partial-order reduction'
         rule_history = checker_state.rule_history
         index_history = checker_state.index_history
         failing_state_hashes = checker_state.failing_state_hashes
         all_rules = checker_state.all_rules
         num_rules = len(all_rules)
+        quiet = checker_state.quiet
+        sink = getattr(self, '_dp_log_sink', None)
+        show_print = (sink is None or not sink.discards) and not quiet
 
         while self.any_unmatched_outputs():
             # find an unguarded rule without any assertions in it
@@ -319,7 +503,7 @@ class StimulusIOTestbenchBase(model.Model):
                 rule = all_rules[index_history[-1]]
 
                 # check is false so that needs-more-data is trapped
-                result = rule.invoke(check = False, print_headers = True, show_print = True)
+                result = rule.invoke(check = False, print_headers = True, show_print = show_print)
                 if result.exc_type is StimulusQueueNeedsMoreData:
                     return checker_state.wait_for_input()
 
@@ -336,14 +520,18 @@ class StimulusIOTestbenchBase(model.Model):
 
                 elif self._dp_model_state_hash in failing_state_hashes:
                     # we have been to this spec state before and we know it doesn't go anywhere useful
+                    checker_state.num_hash_lookups += 1
                     checker_state.num_hash_matches += 1
                     result.revert_state()
 
                 else:
                     # successful rule invocation resulting in a new model state
                     # keep the state, add the rule to the history and start testing from rule 0 again
+                    checker_state.num_hash_lookups += 1
                     rule_history.append(result)
                     index_history.append(0)
+                    if quiet:
+                        checker_state.extend_deepest()
                     break
 
             if index_history[-1] >= num_rules:
@@ -356,8 +544,368 @@ class StimulusIOTestbenchBase(model.Model):
                 index_history.pop(-1)
                 failing_state_hashes.add(self._dp_model_state_hash)
                 failed_rule.revert_state()
+                if quiet:
+                    checker_state.shorten_deepest()
+
+        if rule_history or allow_zero_rules:
+            return checker_state.succeed()
+        else:
+            return checker_state.fail()
+
+    def checksearch_sleep_sets(self, checker_state, allow_zero_rules = False):
+        '''checksearch() with partial-order reduction by sleep sets
+
+        two rules are independent in a state if neither writes a leaf the other reads or writes,
+        from the leaves they read and wrote when invoked (see Invocation.read_ids); independent
+        rules give the same state in either order, so only one order need be searched
+        once a rule has been searched from a state, it sleeps in the states reached by rules
+        independent of it, and is not tried there, until a dependent rule wakes it
+
+        a state is still failing when all the rules not sleeping in it fail: a sleeping rule
+        leads to a state which can also be reached from the failing state where it was searched
+        '''
+        rule_history = checker_state.rule_history
+        index_history = checker_state.index_history
+        sleep_history = checker_state.sleep_history
+        failing_state_hashes = checker_state.failing_state_hashes
+        all_rules = checker_state.all_rules
+        num_rules = len(all_rules)
+        quiet = checker_state.quiet
+        sink = getattr(self, '_dp_log_sink', None)
+        show_print = (sink is None or not sink.discards) and not quiet
+
+        while self.any_unmatched_outputs():
+            sleeping = sleep_history[-1]
+            while index_history[-1] < num_rules:
+                rule_index = index_history[-1]
+                index_history[-1] += 1
+                if rule_index in sleeping:
+                    checker_state.num_sleep_skips += 1
+                    continue
+
+                result = all_rules[rule_index].invoke(
+                    check = False, print_headers = True, show_print = show_print, track_reads = True,
+                )
+                if result.exc_type is StimulusQueueNeedsMoreData:
+                    index_history[-1] -= 1
+                    return checker_state.wait_for_input()
+
+                checker_state.num_invocations += 1
+
+                if result.guarded:
+                    continue
+                elif result.exc_type:
+                    raise result.exc_value
+
+                reads = result.read_ids
+                writes = frozenset(result.state_changes)
+                next_sleeping = {
+                    i:(other_reads, other_writes) for i,(other_reads, other_writes) in sleeping.items()
+                    if writes.isdisjoint(other_reads) and other_writes.isdisjoint(reads) and writes.isdisjoint(other_writes)
+                }
+                sleeping[rule_index] = (reads, writes)
+
+                checker_state.num_hash_lookups += 1
+                if self._dp_model_state_hash in failing_state_hashes:
+                    checker_state.num_hash_matches += 1
+                    result.revert_state()
+                else:
+                    rule_history.append(result)
+                    index_history.append(0)
+                    sleep_history.append(next_sleeping)
+                    if quiet:
+                        checker_state.extend_deepest()
+                    break
+
+            if index_history[-1] >= num_rules:
+                if len(rule_history) == 0:
+                    return checker_state.fail()
+
+                failed_rule = rule_history.pop(-1)
+                index_history.pop(-1)
+                sleep_history.pop(-1)
+                failing_state_hashes.add(self._dp_model_state_hash)
+                failed_rule.revert_state()
+                if quiet:
+                    checker_state.shorten_deepest()
 
         if rule_history or allow_zero_rules:
             return checker_state.succeed()
         else:
             return checker_state.fail()
+
+
+class ParallelCheckSearch:
+    '''checksearch() shared between forked replicas of the spec testbench, by work stealing
+
+    a work item is a subtree of the search: the rule indices from the start state to a spec
+    state, and the range of rule indices still to try from that state
+    each worker searches its item depth-first, as checksearch() does; when a worker runs out of
+    work, another is asked to give away the upper half of the untried rules at its shallowest
+    level, which is the largest subtree it holds
+
+    failing states are shared through the parent; forked workers inherit the parent's hash
+    seed, so model state hashes are the same in every process
+    a state whose rules were split between workers is not known by any one of them to fail,
+    so is not added to the failing states
+
+    when a worker finds a match, the others are stopped and the parent replays the matching
+    rules (with printout), keeping its own rule history; the match found may differ from the
+    one a sequential search would find
+    the deepest rule history reached is not recorded, so a quiet failing search prints nothing
+
+    the start state is the state before the checker state's rule history, whose untried
+    alternatives are searched as well, deepest first, as checksearch() would do on backtracking
+    '''
+    def __init__(self, spec_testbench, checker_state, num_workers, poll_interval = 16):
+        self.spec_testbench = spec_testbench
+        self.checker_state = checker_state
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.all_rules = checker_state.all_rules
+        self.failing_state_hashes = checker_state.failing_state_hashes
+
+        # worker search state: rule results and indices from the start state, and for each
+        # level of the current item the next rule index, the stop index and whether the whole
+        # range is still this worker's
+        self.history = []
+        self.path = []
+        self.indices = []
+        self.stops = []
+        self.whole = []
+        self.num_invocations = 0
+        self.num_hash_lookups = 0
+        self.num_hash_matches = 0
+        self.new_failing = []
+        self.connection = None
+        self.stopped = False
+
+    def initial_items(self):
+        'work items (prefix, first, stop, whole) for the current rule history, deepest last'
+        index_history = self.checker_state.index_history
+        chosen = [i - 1 for i in index_history[:-1]]
+        num_rules = len(self.all_rules)
+        return [
+            (tuple(chosen[:level]), first, num_rules, level == len(chosen) and first == 0)
+            for level,first in enumerate(index_history)
+            if first < num_rules
+        ]
+
+    def run(self):
+        checker_state = self.checker_state
+        # a worker cannot stop and wait for more stimulus
+        assert self.spec_testbench.all_stimulus_complete(), 'parallel checksearch needs all stimulus'
+
+        items = self.initial_items()
+        path = None
+        workers = replica.ReplicaWorkers(self.num_workers, self.worker_main, self)
+        try:
+            idle = list(range(len(workers)))
+            busy = set()
+            asked = set()
+            while path is None:
+                while idle and items:
+                    w = idle.pop()
+                    workers.send(w, ('work', items.pop()))
+                    busy.add(w)
+                if not busy:
+                    break
+                for w in sorted(busy - asked)[:max(0, len(idle) - len(asked))]:
+                    workers.send(w, ('steal', None))
+                    asked.add(w)
+
+                for w in workers.ready():
+                    kind, content, new_failing, counts = workers.recv(w)
+                    checker_state.num_invocations += counts[0]
+                    checker_state.num_hash_lookups += counts[1]
+                    checker_state.num_hash_matches += counts[2]
+                    if new_failing:
+                        for h in new_failing:
+                            self.failing_state_hashes.add(h)
+                        for other in range(len(workers)):
+                            if other != w:
+                                workers.send(other, ('failing', new_failing))
+                    if kind == 'error':
+                        raise AssertionError(f'rule evaluation failed in replica: {content}')
+                    elif kind == 'found':
+                        path = content
+                        break
+                    elif kind == 'idle':
+                        busy.discard(w)
+                        idle.append(w)
+                    elif kind == 'donate':
+                        asked.discard(w)
+                        if content is not None:
+                            items.append(content)
+        finally:
+            workers.close()
+
+        if path is None:
+            return checker_state.fail()
+        self.adopt(path)
+        return checker_state.succeed()
+
+    def adopt(self, path):
+        'make the parent spec state and checker state the end of a matching rule sequence'
+        checker_state = self.checker_state
+        rule_history = checker_state.rule_history
+        index_history = checker_state.index_history
+        sink = getattr(self.spec_testbench, '_dp_log_sink', None)
+        show_print = (sink is None or not sink.discards) and not checker_state.quiet
+
+        num_kept = 0
+        for i,rule_index in zip(index_history[:-1], path):
+            if i - 1 != rule_index:
+                break
+            num_kept += 1
+        while len(rule_history) > num_kept:
+            rule_history.pop(-1).revert_state()
+            index_history.pop(-1)
+        index_history.pop(-1)
+
+        for rule_index in path[num_kept:]:
+            result = self.all_rules[rule_index].invoke(check = False, print_headers = True, show_print = show_print)
+            assert not result.guarded and result.exc_type is None, 'parallel checksearch match does not replay'
+            rule_history.append(result)
+            index_history.append(rule_index + 1)
+        index_history.append(0)
+
+    @staticmethod
+    def worker_main(connection, search):
+        search.connection = connection
+        for result in reversed(search.checker_state.rule_history):
+            result.revert_state()
+        while not search.stopped:
+            message = connection.recv()
+            if message is None:
+                break
+            kind, content = message
+            if kind == 'work':
+                try:
+                    path = search.search(*content)
+                except Exception as e:
+                    search.send('error', f'{type(e).__name__}: {e}')
+                    break
+                if not search.stopped:
+                    search.send('idle' if path is None else 'found', path)
+            else:
+                search.handle(kind, content)
+
+    def send(self, kind, content):
+        counts = self.num_invocations, self.num_hash_lookups, self.num_hash_matches
+        self.connection.send((kind, content, self.new_failing, counts))
+        self.new_failing = []
+        self.num_invocations = 0
+        self.num_hash_lookups = 0
+        self.num_hash_matches = 0
+
+    def handle(self, kind, content):
+        if kind == 'failing':
+            for h in content:
+                self.failing_state_hashes.add(h)
+        elif kind == 'steal':
+            self.send('donate', self.donate())
+
+    def poll(self):
+        'share new failing states and answer messages from the parent'
+        if self.new_failing:
+            self.send('failing', None)
+        while self.connection.poll():
+            message = self.connection.recv()
+            if message is None:
+                self.stopped = True
+                return
+            self.handle(*message)
+
+    def donate(self):
+        'give away the upper half of the untried rules at the shallowest level which has any'
+        base = len(self.path) - len(self.indices) + 1
+        for level,(first,stop) in enumerate(zip(self.indices, self.stops)):
+            if first < stop:
+                middle = stop - (stop - first + 1) // 2
+                self.stops[level] = middle
+                self.whole[level] = False
+                return (tuple(self.path[:base + level]), middle, stop, False)
+        return None
+
+    def go_to(self, prefix):
+        'revert and replay rules so the spec state is the one reached by prefix'
+        num_kept = 0
+        for a,b in zip(self.path, prefix):
+            if a != b:
+                break
+            num_kept += 1
+        while len(self.path) > num_kept:
+            self.history.pop(-1).revert_state()
+            self.path.pop(-1)
+        for rule_index in prefix[num_kept:]:
+            result = self.all_rules[rule_index].invoke(check = False, print_headers = False, show_print = False)
+            assert not result.guarded and result.exc_type is None, 'replica diverged from parent system'
+            self.history.append(result)
+            self.path.append(rule_index)
+
+    def search(self, prefix, first, stop, whole):
+        '''depth-first search of a work item, as checksearch() does
+
+        returns the rule indices of a match, or None if there is none in the item
+        '''
+        self.go_to(prefix)
+        testbench = self.spec_testbench
+        all_rules = self.all_rules
+        num_rules = len(all_rules)
+        failing_state_hashes = self.failing_state_hashes
+        indices = self.indices = [first]
+        stops = self.stops = [stop]
+        whole = self.whole = [whole]
+        countdown = self.poll_interval
+
+        try:
+            while testbench.any_unmatched_outputs():
+                while indices[-1] < stops[-1]:
+                    countdown -= 1
+                    if countdown == 0:
+                        countdown = self.poll_interval
+                        self.poll()
+                        if self.stopped:
+                            return None
+                        if indices[-1] >= stops[-1]:
+                            break
+
+                    rule_index = indices[-1]
+                    result = all_rules[rule_index].invoke(check = False, print_headers = False, show_print = False)
+                    self.num_invocations += 1
+                    indices[-1] += 1
+
+                    if result.guarded:
+                        pass
+                    elif result.exc_type:
+                        raise result.exc_value
+                    elif testbench._dp_model_state_hash in failing_state_hashes:
+                        self.num_hash_lookups += 1
+                        self.num_hash_matches += 1
+                        result.revert_state()
+                    else:
+                        self.num_hash_lookups += 1
+                        self.history.append(result)
+                        self.path.append(rule_index)
+                        indices.append(0)
+                        stops.append(num_rules)
+                        whole.append(True)
+                        break
+
+                if indices[-1] >= stops[-1]:
+                    if whole[-1]:
+                        failing_state_hashes.add(testbench._dp_model_state_hash)
+                        self.new_failing.append(testbench._dp_model_state_hash)
+                    if len(indices) == 1:
+                        return None
+                    self.history.pop(-1).revert_state()
+                    self.path.pop(-1)
+                    indices.pop(-1)
+                    stops.pop(-1)
+                    whole.pop(-1)
+            return list(self.path)
+        finally:
+            self.indices = []
+            self.stops = []
+            self.whole = []
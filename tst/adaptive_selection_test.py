@@ -0,0 +1,77 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for adaptive rule selection in the Atomic-Rule simulator
+
+checks
+    far fewer rule evaluations per committed invocation when most rules are guarded
+    rarely-enabled rules still fire (exploration floor)
+    learnt enabled rates and guess limit
+    deadlock detection
+'''
+
+import cli
+from purple import Integer, Model, AtomicRuleSimulator
+
+
+class Top(Model):
+    ticks: Integer[...] = 0
+    last_rare: Integer[...] = 0
+    rare_count: Integer[...] = 0
+    limit: Integer[...] = 1000000
+
+    rules: [tick, rare, blocked]
+
+    def tick(self):
+        self.guard(self.ticks < self.limit)
+        self.ticks += 1
+
+    def rare(self):
+        self.guard(self.ticks % 20 == 0 and self.ticks > self.last_rare)
+        self.last_rare = self.ticks
+        self.rare_count += 1
+
+    def blocked(self, n: Integer[40]):
+        self.guard(self.ticks < 0)
+
+
+n = 1000 if cli.args.quick else 10000
+
+print('uniform selection')
+uniform = AtomicRuleSimulator(Top(), random_seed = 1)
+uniform.run(n, show_print = False)
+uniform_cost = uniform.num_rule_evaluations / uniform.num_invocations
+print('    evaluations per invocation', uniform_cost)
+
+print('adaptive selection')
+adaptive = AtomicRuleSimulator(Top(), random_seed = 1, adaptive = True)
+adaptive.run(n, show_print = False)
+adaptive_cost = adaptive.num_rule_evaluations / adaptive.num_invocations
+print('    evaluations per invocation', adaptive_cost)
+assert adaptive_cost < 0.5 * uniform_cost
+
+print('exploration')
+print('    rare rule fired', adaptive.system.rare_count, 'times')
+assert adaptive.system.rare_count > 0
+pool = adaptive.weighted_pool
+rates = {p.method_name:r for p,r in zip(pool.parameterised_rules, pool.enabled_rates)}
+print('    learnt rates', rates)
+assert rates['blocked'] < 0.2 and rates['tick'] > 0.8
+assert pool.weights[pool.entry_of(next(adaptive.system.find_rule(method_name = 'blocked')))] > 0
+
+print('guess limit')
+assert 1 <= pool.guess_limit(1000) < 1000
+assert pool.guess_limit(3) <= 3
+
+print('deadlock')
+class Small(Top):
+    limit: Integer[...] = 50
+
+system = Small()
+sim = AtomicRuleSimulator(system, random_seed = 2, adaptive = True)
+sim.run(10 * n, show_print = False)
+assert sim.deadlocked
+assert system.ticks == 50 and system.rare_count <= 2
@@ -0,0 +1,202 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for simulator checkpoint save and restore
+
+checks
+    restore into a newly elaborated system continues exactly as the saved simulation
+    all leaf types, including tuples, unions and undefined values
+    model state hash after restore
+    enabled rule set and guard worker processes follow a restore
+    clocked simulator time and clock state
+    file names and file objects, with and without compression
+    mismatched system is rejected
+'''
+
+import enum
+import io
+import os
+import tempfile
+
+import cli
+from purple import (
+    Integer, ModuloInteger, Enumeration, BitVector, Boolean, Tuple, UnDefined, Record, Model, Clock,
+    AtomicRuleSimulator, ClockedSimulator,
+)
+from purple.checkpoint import CheckpointMismatch
+
+
+class Colour(enum.Enum):
+    red = 1
+    green = 2
+    blue = 3
+
+
+class Small(Record):
+    x: Integer[10] = 1
+    flag: Boolean = False
+
+
+class Large(Record):
+    z: Integer[...] = 0
+
+
+class Mix(Model):
+    count: Integer[...] = 0
+    late: Integer[...] = UnDefined
+    wrap: ModuloInteger[7] = 3
+    colour: Enumeration[Colour] = Colour.green
+    bits: BitVector[8] = 5
+    smalls: Tuple[Small]
+    values: Tuple[Integer[10]]
+    choice: Small | Large = Small()
+    either: Integer[3] | Boolean = True
+
+    rules: [step, push, pop, pick, paint]
+
+    def step(self, n: Integer[1, 4]):
+        self.count += n
+        self.wrap += n
+        self.bits = (self.bits + n) % 256
+        self.late = self.count
+
+    def push(self, x: Integer[10]):
+        self.guard(len(self.smalls) < 3)
+        self.smalls.append(Small(x = x, flag = x > 4))
+        self.values.append(x)
+
+    def pop(self):
+        self.guard(self.smalls)
+        self.smalls.pop(0)
+        self.values.pop(0)
+
+    def pick(self, large: Boolean, x: Integer[10]):
+        self.choice = Large(z = self.count + x) if large else Small(x = x)
+        self.either = x % 3 if large else x > 5
+
+    def paint(self, colour: Enumeration[Colour]):
+        self.colour = colour
+
+
+def state(system):
+    return (
+        system.count, system.wrap, system.colour, system.bits, list(system.smalls), list(system.values),
+        system.choice, system.either, system._dp_model_state_hash,
+    )
+
+
+def late(system):
+    try:
+        return system.late
+    except Exception:
+        return UnDefined
+
+
+num_steps = 50 if cli.args.quick else 500
+
+print('continue from checkpoint')
+for compress in (True, False):
+    original = AtomicRuleSimulator(Mix(), random_seed = 11)
+    original.run(num_steps, show_print = False)
+    checkpoint = io.BytesIO()
+    original.save(checkpoint, compress = compress)
+    original.run(num_steps, show_print = False)
+
+    restored = AtomicRuleSimulator(Mix(), random_seed = 99)
+    checkpoint.seek(0)
+    restored.restore(checkpoint)
+    assert restored.seed == 11
+    restored.run(num_steps, show_print = False)
+    assert state(restored.system) == state(original.system)
+    assert late(restored.system) == late(original.system)
+    assert restored.num_invocations == original.num_invocations == 2 * num_steps
+
+print('undefined values restored')
+system = Mix()
+sim = AtomicRuleSimulator(system, random_seed = 12)
+initial = io.BytesIO()
+sim.save(initial)
+initial_state = state(system)
+sim.run(num_steps, show_print = False)
+assert late(system) is not UnDefined
+initial.seek(0)
+sim.restore(initial)
+assert late(system) is UnDefined
+assert state(system) == initial_state
+assert sim.num_invocations == 0
+
+print('enabled set rebuilt')
+original = AtomicRuleSimulator(Mix(), random_seed = 13, enabled_set = True)
+original.run(num_steps, show_print = False)
+checkpoint = io.BytesIO()
+original.save(checkpoint)
+original.run(num_steps, show_print = False)
+restored = AtomicRuleSimulator(Mix(), random_seed = 13, enabled_set = True)
+restored.restore(io.BytesIO(checkpoint.getvalue()))
+restored.run(num_steps, show_print = False)
+assert state(restored.system) == state(original.system)
+
+print('guard worker replicas restarted')
+original = AtomicRuleSimulator(Mix(), random_seed = 14)
+original.run(num_steps, show_print = False)
+checkpoint = io.BytesIO()
+original.save(checkpoint)
+original.run(num_steps, show_print = False, num_guards_before_exhaustive = 1)
+restored = AtomicRuleSimulator(Mix(), random_seed = 14, num_guard_workers = 2)
+restored.run(3, show_print = False)
+restored.restore(io.BytesIO(checkpoint.getvalue()))
+restored.run(num_steps, show_print = False, num_guards_before_exhaustive = 1)
+restored.close()
+assert state(restored.system) == state(original.system)
+
+
+class Ticker(Model):
+    ticks: Integer[...] = 0
+    fast: Clock[tick]
+    slow: Clock[tock]
+
+    def tick(self, n: Integer[3]):
+        self.ticks += n
+
+    def tock(self):
+        self.ticks *= 2
+
+
+def clocked_sim(seed):
+    return ClockedSimulator(
+        Ticker(), dict(name = 'fast', period_ps = 1000, phase_ps = 500), dict(name = 'slow', period_ps = 3000),
+        random_seed = seed,
+    )
+
+
+def clock_state(sim):
+    return sim.system.ticks, sim.time_ps, [(c.next_event_time_ps, c.num_events) for c,_ in sim.clocks]
+
+
+print('clocked, to file')
+with tempfile.TemporaryDirectory() as tmp_dir:
+    file_name = os.path.join(tmp_dir, 'ticker.ckpt')
+    original = clocked_sim(21)
+    original.run(cycles = 10, show_print = False)
+    original.save(file_name)
+    original.run(cycles = 10, show_print = False)
+
+    restored = clocked_sim(22)
+    restored.restore(file_name)
+    restored.run(cycles = 10, show_print = False)
+    assert clock_state(restored) == clock_state(original)
+
+print('mismatch')
+try:
+    AtomicRuleSimulator(Ticker()).restore(io.BytesIO(checkpoint.getvalue()))
+    assert False
+except CheckpointMismatch:
+    pass
+try:
+    AtomicRuleSimulator(Mix()).restore(io.BytesIO(b'not a checkpoint'))
+    assert False
+except CheckpointMismatch:
+    pass
@@ -0,0 +1,128 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for state coverage collection
+
+checks
+    exact count of visited states against a known reachable state space
+    rule commit counts and leaf value histograms
+    switch to estimated count beyond the exact limit, with reasonable accuracy
+    merge of exact and estimated coverage
+    merged coverage from a multi-process regression
+    clocked simulator
+'''
+
+import enum
+
+import cli
+from purple import Integer, Enumeration, Model, Clock, AtomicRuleSimulator, ClockedSimulator, regress
+from purple.coverage import HyperLogLog, mix_64
+
+
+class Mode(enum.Enum):
+    idle = 0
+    busy = 1
+
+
+class Pair(Model):
+    a: Integer[4] = 0
+    b: Integer[4] = 0
+    mode: Enumeration[Mode] = Mode.idle
+
+    rules: [set_a, set_b, toggle]
+
+    def set_a(self, v: Integer[4]):
+        self.a = v
+
+    def set_b(self, v: Integer[4]):
+        self.guard(self.mode == Mode.busy)
+        self.b = v
+
+    def toggle(self):
+        self.mode = Mode.idle if self.mode == Mode.busy else Mode.busy
+
+
+num_steps = 2000 if cli.args.quick else 20000
+
+print('exact')
+sim = AtomicRuleSimulator(Pair(), random_seed = 1)
+coverage = sim.collect_coverage()
+sim.run(num_steps, show_print = False)
+# 4 * 4 * 2 reachable states, all visited in this many steps
+assert coverage.exact and coverage.num_states == 32
+assert sum(coverage.rule_counts.values()) == num_steps
+assert coverage.rule_counts['top.toggle()'] > 0
+assert sorted(n for n in coverage.rule_counts if n.startswith('top.set_a')) == [f'top.set_a(v={v})' for v in range(4)]
+histogram = coverage.leaf_histogram('top.a')
+assert sorted(histogram) == [0, 1, 2, 3]
+assert sum(histogram.values()) == 1 + sum(c for n,c in coverage.rule_counts.items() if n.startswith('top.set_a'))
+assert set(coverage.leaf_histogram('top.mode')) == {('e', 'idle'), ('e', 'busy')}
+coverage.show()
+
+print('limited histograms')
+sim = AtomicRuleSimulator(Pair(), random_seed = 2)
+coverage = sim.collect_coverage(max_values_per_leaf = 2)
+sim.run(num_steps, show_print = False)
+assert len(coverage.leaf_histogram('top.b')) == 3 and ('other',) in coverage.leaf_histogram('top.b')
+
+print('estimate')
+num_values = 20000 if cli.args.quick else 200000
+hll = HyperLogLog(12)
+for i in range(num_values):
+    hll.add(mix_64(i * 7919))
+assert abs(hll.estimate() - num_values) < 0.05 * num_values, hll.estimate()
+
+sim = AtomicRuleSimulator(Pair(), random_seed = 3)
+coverage = sim.collect_coverage(exact_limit = 10, precision = 10)
+sim.run(num_steps, show_print = False)
+assert not coverage.exact
+assert 28 <= coverage.num_states <= 36
+
+print('merge')
+separate = []
+for seed in range(4):
+    sim = AtomicRuleSimulator(Pair(), random_seed = seed)
+    separate.append(sim.collect_coverage(histograms = False))
+    sim.run(5, show_print = False)
+merged = separate[0].copy()
+for c in separate[1:]:
+    merged.merge(c)
+assert merged.states == set().union(*(c.states for c in separate))
+assert sum(merged.rule_counts.values()) == 20
+assert sum(separate[0].rule_counts.values()) == 5
+
+estimated = separate[1].copy()
+estimated.switch_to_estimate()
+merged.merge(estimated)
+assert not merged.exact and abs(merged.num_states - len(set().union(*(c.states for c in separate)))) <= 1
+
+print('regression')
+results = regress(Pair, AtomicRuleSimulator, range(8), run_args = (10,), collect_coverage = dict(), num_workers = 4)
+assert results.coverage.exact and 1 < results.coverage.num_states <= 32
+assert sum(results.coverage.rule_counts.values()) == 80
+assert sum(results.coverage.leaf_histogram('top.mode').values()) == 8 + results.coverage.rule_counts['top.toggle()']
+serial = regress(Pair, AtomicRuleSimulator, range(8), run_args = (10,), collect_coverage = dict(), num_workers = 0)
+assert serial.coverage.states == results.coverage.states
+assert serial.coverage.histograms == results.coverage.histograms
+
+
+class Ticker(Model):
+    count: Integer[8] = 0
+    clk: Clock[tick, tock]
+
+    def tick(self, n: Integer[1, 3]):
+        self.count = (self.count + n) % 8
+
+    def tock(self):
+        pass
+
+
+print('clocked')
+sim = ClockedSimulator(Ticker(), dict(period_ps = 1000), random_seed = 4)
+coverage = sim.collect_coverage()
+sim.run(cycles = 100, show_print = False)
+assert coverage.num_states == 8
+assert coverage.rule_counts['top.tock()'] == 101
@@ -0,0 +1,110 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for evaluation of clock edge rules in forked worker processes
+
+checks
+    same states, model state hash and printout as evaluating in the simulator, buffered or not
+    replicas follow changes made outside clock events (undo, checkpoint restore)
+    rule raising an exception in a worker raises the same exception in the simulator
+'''
+
+import contextlib
+import io
+
+import cli
+from purple import Integer, Tuple, Model, Clock, ClockedSimulator
+
+
+class Lane(Model):
+    x: Integer[...] = 1
+    y: Integer[...] = 2
+    log: Tuple[Integer[...]]
+    clk: Clock[move_x, move_y, record, idle]
+
+    def move_x(self):
+        self.x = (self.y + 1) * 2 % 1009
+
+    def move_y(self, n: Integer[3]):
+        self.guard(n != 1 or self.x % 2)
+        self.y = (self.x + n) % 1013
+
+    def record(self):
+        self.guard(self.x % 3 != 0)
+        self.log.append(self.x)
+        if len(self.log) > 3:
+            self.log.pop(0)
+        self.print('logged', self.x, end = ';\n')
+
+    def idle(self):
+        pass
+
+
+class Pipe(Model):
+    a: Lane
+    b: Lane
+    c: Lane
+    clk: Clock[a.clk, b.clk, c.clk]
+
+
+def state(system):
+    lanes = system.a, system.b, system.c
+    return tuple((l.x, l.y, tuple(l.log)) for l in lanes), system._dp_model_state_hash
+
+
+def run(num_cycles, **kwargs):
+    sim = ClockedSimulator(Pipe(), dict(period_ps = 1000), random_seed = 5, **kwargs)
+    states = []
+    printout = io.StringIO()
+    with contextlib.redirect_stdout(printout):
+        for _ in sim.run_one_step(sim.sim_end_time(cycles = num_cycles), True, True):
+            states.append(state(sim.system))
+    sim.close()
+    return states, printout.getvalue()
+
+
+num_cycles = 30 if cli.args.quick else 500
+
+print('same as in the simulator')
+serial = run(num_cycles)
+for kwargs in (dict(num_edge_workers = 2), dict(num_edge_workers = 3, buffered_writes = True)):
+    assert run(num_cycles, **kwargs) == serial
+assert 'top.a.record() :: logged' in serial[1]
+
+print('resync')
+reference = ClockedSimulator(Pipe(), dict(period_ps = 1000), random_seed = 7)
+sim = ClockedSimulator(Pipe(), dict(period_ps = 1000), random_seed = 7, num_edge_workers = 2)
+for s in (reference, sim):
+    s.keep_history()
+    s.run(cycles = 10, show_print = False)
+    s.step_back(4)
+    s.run(cycles = 10, show_print = False)
+    saved = io.BytesIO()
+    s.save(saved)
+    s.run(cycles = 10, show_print = False)
+    saved.seek(0)
+    s.restore(saved)
+    s.run(cycles = 10, show_print = False)
+assert state(sim.system) == state(reference.system)
+sim.close()
+
+print('exception')
+class Exploding(Lane):
+    def move_y(self, n: Integer[3]):
+        assert self.y != 7 or n != 2, 'boom'
+        self.y = (self.x + n) % 13
+
+class Explodes(Model):
+    a: Exploding
+    clk: Clock[a.clk]
+
+sim = ClockedSimulator(Explodes(), dict(period_ps = 1000), random_seed = 1, num_edge_workers = 2)
+try:
+    sim.run(cycles = 1000, show_print = False)
+    assert False
+except AssertionError as e:
+    assert str(e) == 'boom'
+sim.close()
@@ -0,0 +1,136 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the enabled-rule-set mode of the Atomic-Rule simulator
+
+checks
+    maintained enabled set matches an exhaustive evaluation after every step
+    guards reading sub-component, record and tuple state
+    deadlock detection
+    fewer rule evaluations than exhaustive
+    state changed by a testbench between runs is seen
+'''
+
+import cli
+from purple import Integer, Boolean, Model, Record, Tuple, AtomicRuleSimulator
+from purple.rule import Rule
+
+
+class Credit(Record):
+    count: Integer[4] = 2
+    enabled: Boolean = True
+
+
+class Producer(Model):
+    credit: Credit
+    produced: Integer[...] = 0
+
+    rules: [produce, toggle]
+
+    def produce(self):
+        self.guard(self.credit.enabled and self.credit.count > 0)
+        self.credit.count -= 1
+        self.produced += 1
+
+    def toggle(self):
+        self.guard(self.produced % 3 == 0 and self.produced < 90)
+        self.credit.enabled = not self.credit.enabled
+
+
+class Pipe(Model):
+    producer: Producer
+    fifo: Tuple[Integer[...]]
+    consumed: Integer[...] = 0
+    limit: Integer[...] = 100
+
+    rules: [push, pop, return_credit]
+
+    def push(self):
+        self.guard(self.producer.produced > len(self.fifo) + self.consumed)
+        self.fifo.append(self.producer.produced)
+
+    def pop(self, slot: Integer[2]):
+        self.guard(self.fifo)
+        self.guard(self.consumed < self.limit)
+        self.fifo.pop(0)
+        self.consumed += 1
+
+    def return_credit(self):
+        self.guard(self.producer.credit.count < 2 and self.consumed > self.returned())
+        self.producer.credit.count += 1
+
+    def returned(self):
+        return self.producer.produced - (2 - self.producer.credit.count)
+
+
+def exhaustive_enabled(sim):
+    enabled = set()
+    for i,r in enumerate(sim.all_rules):
+        result = r.invoke(check = True, show_print = False)
+        if not result.guarded:
+            result.revert_state()
+            enabled.add(i)
+    return enabled
+
+
+system = Pipe()
+sim = AtomicRuleSimulator(system, random_seed = 1, enabled_set = True)
+
+print('enabled set matches exhaustive evaluation')
+num_steps = 100 if cli.args.quick else 1000
+for _ in range(num_steps):
+    assert set(sim.enabled_set.enabled) == exhaustive_enabled(sim)
+    sim.run(1, show_print = False)
+    if sim.deadlocked:
+        break
+
+print('steps', sim.num_invocations, 'evaluations', sim.enabled_set.num_evaluations)
+assert sim.enabled_set.num_evaluations < len(sim.all_rules) * sim.num_invocations
+
+print('deadlock detection')
+system = Pipe()
+sim = AtomicRuleSimulator(system, random_seed = 2, enabled_set = True)
+while not sim.deadlocked:
+    sim.run(100, show_print = False)
+    assert sim.num_invocations < 100000
+assert system.consumed == system.limit
+assert not exhaustive_enabled(sim)
+
+
+class Gate(Model):
+    is_open: Boolean = False
+    passed: Integer[...] = 0
+
+    rules: [pass_through]
+
+    def pass_through(self):
+        self.guard(self.is_open and self.passed < 5)
+        self.passed += 1
+
+    # not rules, invoked by the testbench
+    def open_gate(self):
+        self.is_open = True
+
+    def clear(self):
+        self.passed = 0
+
+
+def testbench_write(system, method):
+    assert not Rule(system, method, dict()).invoke(show_print = False).guarded
+
+
+print('testbench writes between runs')
+for enabled in (False, True):
+    system = Gate()
+    sim = AtomicRuleSimulator(system, random_seed = 3, enabled_set = enabled)
+    testbench_write(system, system.open_gate)
+    sim.run(5, show_print = False)
+    assert system.passed == 5 and not sim.deadlocked
+    testbench_write(system, system.clear)
+    sim.run(5, show_print = False)
+    assert system.passed == 5 and not sim.deadlocked
+    sim.run(1, show_print = False)
+    assert sim.deadlocked
@@ -0,0 +1,112 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the clocked simulator event queue
+
+checks
+    many clock domains with coincident edges give the same event order and results as
+    scanning all clocks for the earliest (the previous implementation)
+    event queue follows clock times changed by undo and by checkpoint restore
+'''
+
+import io
+
+import cli
+from purple import Integer, Model, Clock, ClockedSimulator
+
+
+class Domain(Model):
+    count: Integer[...] = 0
+    clk: Clock[tick]
+
+    def tick(self, n: Integer[3]):
+        self.count = (self.count * 3 + n) % 1000003
+
+
+class Soc(Model):
+    d0: Domain
+    d1: Domain
+    d2: Domain
+    d3: Domain
+    d4: Domain
+    d5: Domain
+    d6: Domain
+    d7: Domain
+
+
+domains = [f'd{i}' for i in range(8)]
+clock_inputs = [
+    dict(component_name = ('soc', d), period_ps = period, phase_ps = phase)
+    for d,period,phase in zip(domains, (1000, 1000, 500, 2000, 1500, 3000, 700, 1000), (0, 0, 0, 250, 500, 0, 100, 0))
+]
+
+
+class Recording(ClockedSimulator):
+    def select_rules(self, clock, clock_name):
+        self.events.append((self.time_ps, clock.rules[0].component.name[-1]))
+        return super().select_rules(clock, clock_name)
+
+
+class Scanning(Recording):
+    # earliest clock found by scanning, first in self.clocks on a tie
+    def run_one_step(self, final_time_ps, show_print, print_headers):
+        while True:
+            clock, clock_name = min(self.clocks)
+            if clock.next_event_time_ps > final_time_ps:
+                break
+            self.time_ps = clock.next_event_time_ps
+            selected_rules = self.select_rules(clock, clock_name)
+            self.record_step(clock.event(selected_rules, show_print, print_headers))
+            yield
+
+
+def make(sim_cls, seed = 1):
+    sim = sim_cls(Soc('soc'), *clock_inputs, random_seed = seed)
+    sim.events = []
+    return sim
+
+
+def counts(sim):
+    return [getattr(sim.system, d).count for d in domains]
+
+
+num_cycles = 50 if cli.args.quick else 2000
+
+print('same as scanning')
+queued = make(Recording)
+scanned = make(Scanning)
+queued.run(cycles = num_cycles, show_print = False)
+scanned.run(cycles = num_cycles, show_print = False)
+assert queued.events == scanned.events
+assert counts(queued) == counts(scanned)
+assert queued.time_ps == scanned.time_ps
+# coincident edges are in the order the clocks were given
+assert queued.events[:4] == [(0, 'd0'), (0, 'd1'), (0, 'd2'), (0, 'd5')]
+
+print('undo')
+sim = make(Recording)
+sim.keep_history()
+sim.run(cycles = 10, show_print = False)
+reference = list(sim.events)
+sim.step_back(1000)
+sim.events = []
+sim.run(cycles = 10, show_print = False)
+assert [e for e in sim.events] == [e for e in reference]
+
+print('restore')
+sim = make(Recording, 2)
+sim.run(cycles = 10, show_print = False)
+checkpoint = io.BytesIO()
+sim.save(checkpoint)
+sim.events = []
+sim.run(cycles = 10, show_print = False)
+later = list(sim.events)
+sim.run(cycles = 10, show_print = False)
+checkpoint.seek(0)
+sim.restore(checkpoint)
+sim.events = []
+sim.run(cycles = 10, show_print = False)
+assert sim.events == later
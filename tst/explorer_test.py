@@ -0,0 +1,158 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the exhaustive state space explorer
+
+checks
+    number of reachable states and transitions, for a known state space
+    deadlock detection with shortest witness trace, which replays to the deadlock state
+    invariant violation and exception in a rule, with witness traces
+    depth and state bounds
+    tuple and union leaves
+    multiple worker processes give the same result
+    system state unchanged afterwards, and can be set to an explored state
+'''
+
+import cli
+from purple import Integer, Boolean, Tuple, Record, Model, StateSpaceExplorer
+
+
+class Counters(Model):
+    a: Integer[4] = 0
+    b: Integer[4] = 0
+
+    rules: [inc_a, inc_b, reset]
+
+    def inc_a(self):
+        self.guard(self.a < 3)
+        self.a += 1
+
+    def inc_b(self, n: Integer[1, 3]):
+        self.guard(self.b + n < 4)
+        self.b += n
+
+    def reset(self):
+        self.guard(self.a == 3 and self.b == 3)
+        self.a = 0
+        self.b = 0
+
+
+def replay(system, trace):
+    for r in trace:
+        assert not r.invoke(show_print = False).guarded
+
+
+print('complete state space')
+system = Counters()
+result = StateSpaceExplorer(system).explore()
+result.show()
+assert result.complete and result.passed
+assert result.num_states == 16 and result.max_depth == 5
+# inc_a from 3 a values, inc_b (by 1 or 2) 5 ways, for each a, and one reset
+assert result.num_transitions == 3 * 4 + 4 * 5 + 1
+assert system.a == 0 and system.b == 0
+
+print('deadlock')
+class Stuck(Counters):
+    def reset(self):
+        self.guard(False)
+
+system = Stuck()
+result = StateSpaceExplorer(system).explore()
+assert result.num_states == 16 and result.num_deadlocks == 1 and not result.passed
+state_id, trace = result.deadlocks[0]
+assert len(trace) == 5 and [r.method_name for r in trace].count('inc_a') == 3
+replay(system, trace)
+assert system.a == 3 and system.b == 3
+
+print('invariant')
+def sum_below_5(top):
+    return top.a + top.b < 5
+
+system = Counters()
+result = StateSpaceExplorer(system, invariants = [sum_below_5]).explore()
+assert result.stopped and not result.complete
+(state_id, trace, name), = result.violations
+assert name == 'sum_below_5' and len(trace) == 4
+replay(system, trace)
+assert system.a + system.b == 5
+
+result = StateSpaceExplorer(Counters(), invariants = [sum_below_5], stop_on_failure = False).explore()
+assert result.num_states == 16 and len(result.violations) == 3
+
+print('exception')
+class Exploding(Counters):
+    def reset(self):
+        self.guard(self.a == 3 and self.b == 3)
+        assert False, 'boom'
+
+result = StateSpaceExplorer(Exploding()).explore()
+(state_id, trace, message), = result.errors
+assert message == 'AssertionError: boom' and trace[-1].method_name == 'reset' and len(trace) == 6
+
+print('bounds')
+result = StateSpaceExplorer(Counters(), max_depth = 2).explore()
+assert not result.complete and result.max_depth == 2 and result.num_depth_limited > 0
+assert result.num_states == 1 + 3 + 4
+result = StateSpaceExplorer(Counters(), max_states = 5).explore()
+assert result.reached_max_states and result.num_states == 5
+
+
+class Item(Record):
+    value: Integer[3]
+    last: Boolean = False
+
+
+class Queue(Model):
+    items: Tuple[Item]
+    head: Item | Integer[2] = 0
+    sent: Integer[4] = 0
+
+    rules: [send, move, clear]
+
+    def send(self):
+        self.guard(self.sent < 3)
+        self.items.append(Item(value = self.sent, last = self.sent == 2))
+        self.sent += 1
+
+    def move(self):
+        self.guard(self.items and not isinstance(self.head, Item))
+        self.head = self.items.pop(0)
+
+    def clear(self, n: Integer[2]):
+        self.guard(isinstance(self.head, Item))
+        self.head = n
+
+
+print('tuples and unions')
+system = Queue()
+explorer = StateSpaceExplorer(system)
+result = explorer.explore()
+assert result.complete and result.num_deadlocks == 2
+replay(system, result.deadlocks[0][1])
+assert system.sent == 3 and len(system.items) == 0 and system.head == 0
+explorer.set_state(result.deadlocks[1][0])
+assert system.sent == 3 and len(system.items) == 0 and system.head == 1
+# rule order within a model is not fixed, so find the state reached by send, move
+moved = next(i for i in range(result.num_states) if [r.method_name for r in explorer.trace(i)] == ['send', 'move'])
+explorer.set_state(moved)
+assert isinstance(system.head, Item)
+
+print('worker processes')
+for make in (Counters, Queue):
+    serial = StateSpaceExplorer(make(), stop_on_failure = False, invariants = [sum_below_5] if make is Counters else [])
+    parallel = StateSpaceExplorer(
+        make(), stop_on_failure = False, invariants = serial.invariants, num_workers = 3, batch_size = 2,
+    )
+    a = serial.explore()
+    b = parallel.explore()
+    assert (a.num_states, a.num_transitions, a.num_deadlocks) == (b.num_states, b.num_transitions, b.num_deadlocks)
+    assert [[str(r) for r in t] for _,t,_ in a.violations] == [[str(r) for r in t] for _,t,_ in b.violations]
+    assert [[str(r) for r in t] for _,t in a.deadlocks] == [[str(r) for r in t] for _,t in b.deadlocks]
+
+print('depth first')
+result = StateSpaceExplorer(Counters(), depth_first = True).explore()
+assert result.num_states == 16
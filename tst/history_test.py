@@ -0,0 +1,137 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for undo/redo history in simulators
+
+checks
+    step_back and step_forward reproduce the state (and model state hash) after each step
+    continuing simulation after step_back forgets the undone steps
+    memory bound: old steps folded, only periodic snapshots reachable
+    clocked simulator time and clock state
+    enabled rule set follows the history
+'''
+
+import cli
+from purple import Integer, Tuple, Model, Clock, AtomicRuleSimulator, ClockedSimulator
+
+
+class Stack(Model):
+    items: Tuple[Integer[10]]
+    total: Integer[...] = 0
+
+    rules: [push, pop]
+
+    def push(self, x: Integer[10]):
+        self.guard(len(self.items) < 5)
+        self.items.append(x)
+        self.total += x
+
+    def pop(self):
+        self.guard(self.items)
+        self.total -= self.items.pop()
+
+
+def state(system):
+    return tuple(system.items), system.total, system._dp_model_state_hash
+
+
+def run_recording(sim, num_steps):
+    states = [state(sim.system)]
+    for _ in range(num_steps):
+        sim.run(1, show_print = False)
+        states.append(state(sim.system))
+    return states
+
+
+num_steps = 100 if cli.args.quick else 1000
+
+print('back and forward')
+for enabled_set in (False, True):
+    sim = AtomicRuleSimulator(Stack(), random_seed = 1, enabled_set = enabled_set)
+    sim.keep_history()
+    states = run_recording(sim, num_steps)
+    assert sim.step_back(10) == 10
+    assert state(sim.system) == states[-11] and sim.num_invocations == num_steps - 10
+    assert sim.step_back() == 1
+    assert state(sim.system) == states[-12]
+    assert sim.step_forward(5) == 5
+    assert state(sim.system) == states[-7]
+    assert sim.step_forward(100) == 6
+    assert state(sim.system) == states[-1]
+    assert sim.step_back(num_steps + 10) == num_steps
+    assert state(sim.system) == states[0] and sim.num_invocations == 0
+    assert sim.step_forward(num_steps) == num_steps
+    assert state(sim.system) == states[-1]
+
+print('continue after step_back')
+sim.step_back(20)
+sim.run(5, show_print = False)
+assert sim.history.last_step == num_steps - 15
+assert sim.step_forward(1) == 0
+sim.step_back(5)
+assert state(sim.system) == states[-21]
+
+print('bounded')
+sim = AtomicRuleSimulator(Stack(), random_seed = 2)
+sim.keep_history(depth = 20, snapshot_interval = 10, max_snapshots = 3)
+states = run_recording(sim, num_steps)
+assert len(sim.history.steps) == 20 and len(sim.history.snapshots) == 3
+assert sim.step_back(15) == 15
+assert state(sim.system) == states[-16]
+# beyond the recent steps, to the nearest snapshot before
+# (snapshots at steps num_steps - 40, 30, 20)
+assert sim.step_back(10) == 15
+assert state(sim.system) == states[num_steps - 30]
+assert sim.step_back(1000) == 10
+assert state(sim.system) == states[num_steps - 40]
+# forward to the next snapshot, then exactly into the recent steps
+assert sim.step_forward(1) == 10
+assert state(sim.system) == states[num_steps - 30]
+assert sim.step_forward(15) == 15
+assert state(sim.system) == states[num_steps - 15]
+
+print('continue from a snapshot')
+sim.step_back(1000)
+sim.run(3, show_print = False)
+assert sim.history.base_step == num_steps - 40 and sim.history.last_step == num_steps - 37
+assert len(sim.history.snapshots) == 1
+
+print('memory bound on leaf changes')
+sim = AtomicRuleSimulator(Stack(), random_seed = 3)
+sim.keep_history(max_changes = 30)
+sim.run(num_steps, show_print = False)
+assert sim.history.num_changes <= 30 and len(sim.history.steps) >= 15
+
+
+class Counter(Model):
+    count: Integer[...] = 0
+    fast: Clock[tick]
+    slow: Clock[double]
+
+    def tick(self, n: Integer[3]):
+        self.count += n
+
+    def double(self):
+        self.count *= 2
+
+
+def clock_state(sim):
+    return sim.system.count, sim.time_ps, tuple((c.next_event_time_ps, c.num_events) for c,_ in sim.clocks)
+
+
+print('clocked')
+sim = ClockedSimulator(
+    Counter(), dict(name = 'fast', period_ps = 1000), dict(name = 'slow', period_ps = 3000, phase_ps = 500),
+)
+sim.keep_history()
+states = [clock_state(sim)]
+for _ in sim.run_one_step(sim.sim_end_time(cycles = 20), False, False):
+    states.append(clock_state(sim))
+assert sim.step_back(7) == 7
+assert clock_state(sim) == states[-8]
+sim.run(cycles = 5, show_print = False)
+sim.step_back(1000)
+assert clock_state(sim) == states[0]
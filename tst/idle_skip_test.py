@@ -0,0 +1,212 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for idle-cycle skipping in the clocked simulator
+
+checks
+    skipped rules give the same states and model state hash as invoking them, for a seed
+    parked clock domains are woken by writes from other domains
+    same final state, time and clock cycle counts with parked clocks
+    undo and checkpoint restore with sleeping rules and parked clocks
+    testbench writes to system state, between runs or between steps, wake a parked clock
+    wake_idle_rules() wakes a parked clock whose guard reads stimulus outside system state
+'''
+
+import io
+
+import cli
+from purple import Integer, Boolean, Model, Clock, ClockedSimulator
+
+
+class Worker(Model):
+    busy: Boolean = False
+    work: Integer[...] = 0
+    done: Integer[...] = 0
+    clk: Clock[start, step, finish]
+
+    def start(self, n: Integer[1, 4]):
+        self.guard(not self.busy)
+        self.busy = True
+        self.work = n
+
+    def step(self):
+        self.guard(self.busy and self.work > 0)
+        self.work -= 1
+
+    def finish(self, early: Boolean):
+        self.guard(self.busy and (self.work == 0 or early and self.work == 1))
+        self.busy = False
+        self.done += 1
+
+
+def worker_state(w):
+    return w.busy, w.work, w.done
+
+
+def run_worker(skip_idle, num_cycles):
+    sim = ClockedSimulator(Worker(), dict(period_ps = 1000), random_seed = 4, skip_idle = skip_idle)
+    states = []
+    for _ in sim.run_one_step(sim.sim_end_time(cycles = num_cycles), False, False):
+        states.append((worker_state(sim.system), sim.system._dp_model_state_hash))
+    return sim, states
+
+
+num_cycles = 100 if cli.args.quick else 2000
+
+print('skipped rules')
+_, invoked = run_worker(False, num_cycles)
+sim, skipped = run_worker(True, num_cycles)
+assert skipped == invoked
+assert sim.idle.num_skipped_rules > 0 and not sim.idle.parked
+
+
+class Soc(Model):
+    count: Integer[...] = 0
+    sent: Integer[...] = 0
+    valid: Boolean = False
+    received: Integer[...] = 0
+    delay: Integer[...] = 0
+    producer_clk: Clock[tick, send]
+    consumer_clk: Clock[take, wait]
+
+    def tick(self):
+        self.guard(self.count < 200)
+        self.count += 1
+
+    def send(self):
+        self.guard(self.count % 25 == 0 and not self.valid and self.sent < 6)
+        self.valid = True
+        self.sent += 1
+
+    def take(self):
+        self.guard(self.valid and self.delay == 0)
+        self.valid = False
+        self.received += 1
+        self.delay = 3
+
+    def wait(self):
+        self.guard(self.delay > 0)
+        self.delay -= 1
+
+
+clock_inputs = (
+    dict(name = 'producer_clk', period_ps = 700, phase_ps = 100),
+    dict(name = 'consumer_clk', period_ps = 1000),
+)
+
+
+def soc_state(sim):
+    s = sim.system
+    return (
+        (s.count, s.sent, s.valid, s.received, s.delay, s._dp_model_state_hash),
+        sim.time_ps,
+        tuple(clock.num_events for clock,_ in sim.clocks),
+        tuple(clock.next_event_time_ps for clock,_ in sim.clocks),
+    )
+
+
+def run_soc(skip_idle, chunks):
+    sim = ClockedSimulator(Soc(), *clock_inputs, random_seed = 1, skip_idle = skip_idle)
+    states = []
+    for cycles in chunks:
+        sim.run(cycles = cycles, show_print = False)
+        states.append(soc_state(sim))
+    return sim, states
+
+
+print('parked clocks')
+chunks = (10, 37, 100, 50, 200)
+_, invoked = run_soc(False, chunks)
+sim, parked = run_soc(True, chunks)
+assert parked == invoked
+assert invoked[-1][0][:4] == (200, 6, False, 6)
+assert sim.idle.num_parked_edges > 100 and sim.idle.parked
+
+print('undo and restore')
+reference = ClockedSimulator(Soc(), *clock_inputs, random_seed = 1)
+sim = ClockedSimulator(Soc(), *clock_inputs, random_seed = 1, skip_idle = True)
+for s in (reference, sim):
+    s.keep_history()
+    s.run(cycles = 60, show_print = False)
+    s.step_back(10**6)
+    s.run(cycles = 20, show_print = False)
+    saved = io.BytesIO()
+    s.save(saved)
+    s.run(cycles = 90, show_print = False)
+    saved.seek(0)
+    s.restore(saved)
+    s.run(cycles = 90, show_print = False)
+assert soc_state(sim) == soc_state(reference)
+
+
+inbox = [] # stimulus outside system state
+
+
+class Responder(Model):
+    request: Integer[...] = 0
+    served: Integer[...] = 0
+    mailed: Integer[...] = 0
+    ticks: Integer[...] = 0
+    drive_clk: Clock[tick]
+    clk: Clock[serve, collect]
+    rules: [raise_request] # invoked by the testbench, outside clock events
+
+    def raise_request(self):
+        self.request += 1
+
+    def tick(self):
+        self.ticks += 1
+
+    def serve(self):
+        self.guard(self.served < self.request)
+        self.served += 1
+
+    def collect(self):
+        self.guard(len(inbox) > self.mailed)
+        self.mailed += 1
+
+
+class DrivingSimulator(ClockedSimulator):
+    def raise_request(self):
+        rule = next(self.system.find_rule(method_name = 'raise_request'))
+        assert not rule.invoke(show_print = False).guarded
+
+    def run_one_step(self, final_time_ps, show_print, print_headers):
+        # also writes after some edges of the other clock
+        drive_clk = self.clocks[1][0]
+        for _ in super().run_one_step(final_time_ps, show_print, print_headers):
+            if self.time_ps % 1000 == 300 and drive_clk.num_events in (41, 42, 91):
+                self.raise_request()
+            yield
+
+
+def run_responder(skip_idle):
+    inbox.clear()
+    clocks = dict(name = 'clk', period_ps = 1000), dict(name = 'drive_clk', period_ps = 1000, phase_ps = 300)
+    sim = DrivingSimulator(Responder(), *clocks, random_seed = 2, skip_idle = skip_idle)
+    states = []
+    for step in range(6):
+        sim.run(cycles = 20, show_print = False)
+        parked = sim.idle is not None and bool(sim.idle.parked)
+        clock_states = tuple((clock.num_events, clock.next_event_time_ps) for clock,_ in sim.clocks)
+        states.append((sim.time_ps, clock_states, sim.system.request, sim.system.served, sim.system.mailed))
+        if step == 0:
+            sim.raise_request()
+            sim.raise_request()
+        elif step == 3:
+            inbox.append('mail')
+            sim.wake_idle_rules()
+        elif step == 4:
+            assert parked or not skip_idle
+    return sim, states
+
+
+print('testbench wakes parked clock')
+_, invoked = run_responder(False)
+sim, parked = run_responder(True)
+assert parked == invoked
+assert invoked[-1][-3:] == (5, 5, 1)
+assert sim.idle.num_parked_edges > 0
@@ -0,0 +1,147 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the lean path of AtomicRuleSimulator.run, taken when printing is off
+
+checks
+    same states, model state hash and counts as the path with Invocation objects
+        uniform, weighted and adaptive selection, including exhaustive search and deadlock
+    locally guarded code blocks
+    rule raising an exception leaves no changes and the exception is raised
+    lean path not taken when history is kept, nor by default
+    lean path not taken when a subclass redefines invoke_one_rule, invoke_exhaustive or invoke_one_enabled_rule
+'''
+
+import contextlib
+import io
+
+import cli
+from purple import Integer, Boolean, Tuple, Model, AtomicRuleSimulator
+
+
+class Stack(Model):
+    items: Tuple[Integer[8]]
+    total: Integer[...] = 0
+    flips: Integer[...] = 0
+    odd: Boolean = False
+    printing: Integer[...] = 0
+
+    rules: [push, pop, flip, both, shout]
+
+    def push(self, v: Integer[8]):
+        self.guard(len(self.items) < 5)
+        self.items.append(v)
+        self.total += v
+        self.guard(self.total < 200)
+
+    def pop(self):
+        self.guard(self.items)
+        self.total -= self.items.pop()
+        self.odd = self.total % 2 == 1
+
+    def flip(self, n: Integer[2]):
+        with self.guards_limited_to_code_block():
+            self.flips += 1
+            self.guard(n == 1)
+        with self.guards_limited_to_code_block():
+            self.flips += 10
+            self.guard(self.odd)
+
+    def both(self):
+        self.guard(self.flips > 1000)
+        self.flips = 0
+
+    def shout(self):
+        self.guard(self.total > 100)
+        self.print('loud', self.total)
+        self.printing += 1
+
+
+def state(sim):
+    system = sim.system
+    return (
+        tuple(system.items), system.total, system.flips, system.odd, system.printing,
+        system._dp_model_state_hash, sim.num_invocations, sim.num_rule_evaluations, sim.deadlocked,
+    )
+
+
+def run(lean_run, num_steps, **kwargs):
+    sim = AtomicRuleSimulator(Stack(), random_seed = 6, lean_run = lean_run, **kwargs)
+    states = []
+    for _ in range(num_steps // 10):
+        sim.run(10, show_print = False, num_guards_before_exhaustive = 2)
+        states.append(state(sim))
+    return states
+
+
+num_steps = 300 if cli.args.quick else 5000
+
+print('same as with invocations')
+for kwargs in (dict(), dict(weighted = True), dict(adaptive = True)):
+    assert run(True, num_steps, **kwargs) == run(False, num_steps, **kwargs)
+
+
+class Stuck(Model):
+    count: Integer[...] = 0
+    rules: [inc]
+
+    def inc(self, n: Integer[3]):
+        self.guard(self.count < 5 and n == 2)
+        self.count += 1
+
+
+print('deadlock')
+for lean_run in (True, False):
+    sim = AtomicRuleSimulator(Stuck(), random_seed = 1, lean_run = lean_run)
+    with contextlib.redirect_stdout(io.StringIO()) as printout:
+        sim.run(100, show_print = False)
+    assert sim.deadlocked and sim.num_invocations == 6 and sim.system.count == 5
+    assert 'System Deadlock' in printout.getvalue()
+
+
+class Exploding(Stack):
+    def pop(self):
+        self.guard(self.items)
+        self.total -= self.items.pop() - 1000
+        assert len(self.items) < 3, 'boom'
+        self.total -= 1000
+
+
+print('exception')
+failed = []
+for lean_run in (True, False):
+    sim = AtomicRuleSimulator(Exploding(), random_seed = 2, lean_run = lean_run)
+    try:
+        sim.run(1000, show_print = False)
+        assert False
+    except AssertionError as e:
+        assert str(e) == 'boom'
+    assert sim.system.total < 1000 and sim.system._dp_current_invocation is None
+    failed.append(state(sim))
+assert failed[0] == failed[1]
+
+print('history')
+assert not AtomicRuleSimulator(Stack(), random_seed = 3).lean_run_possible()
+sim = AtomicRuleSimulator(Stack(), random_seed = 3, lean_run = True)
+assert sim.lean_run_possible()
+sim.keep_history()
+assert not sim.lean_run_possible()
+sim.run(20, show_print = False)
+assert sim.step_back(20) == 20
+
+print('subclass')
+for method_name in ('invoke_one_rule', 'invoke_exhaustive', 'invoke_one_enabled_rule'):
+    calls = []
+    original = getattr(AtomicRuleSimulator, method_name)
+    def counted(self, *args, original = original, **kwargs):
+        calls.append(1)
+        return original(self, *args, **kwargs)
+    Counted = type('Counted', (AtomicRuleSimulator,), {method_name: counted})
+    sim = Counted(Stack(), random_seed = 4, lean_run = True)
+    assert not sim.lean_run_possible()
+    sim.run(50, show_print = False, num_guards_before_exhaustive = 1)
+    if method_name != 'invoke_one_enabled_rule':
+        assert calls
@@ -0,0 +1,131 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for log sinks replacing printed rule printout
+
+checks
+    text sink gives the same text as printing, with and without headers, in blocks of lines
+    JSON-lines sink gives one object per line of printout, with rule, rule id, params, step or time and args
+    null sink prints nothing and simulation results are unchanged
+    simulator messages (deadlock) go to the sink
+    clocked simulator
+    back to printing with log_to(None)
+'''
+
+import contextlib
+import io
+import json
+
+import cli
+from purple import Integer, Boolean, Model, Clock, AtomicRuleSimulator, ClockedSimulator
+from purple.logsink import TextSink, JsonLinesSink, NullSink
+
+
+class Talker(Model):
+    count: Integer[...] = 0
+    loud: Boolean = False
+    clk: Clock[talk, shout]
+
+    rules: [talk, shout, quiet]
+
+    def talk(self, n: Integer[1, 3]):
+        self.guard(self.count < 1000)
+        self.count += n
+        self.print('talk', n, 'count', self.count)
+
+    def shout(self):
+        self.guard(self.count % 7 == 0 and not self.loud)
+        self.loud = True
+        self.print('SHOUT', self.loud, sep = '-', end = '!\n')
+        self.print('twice')
+
+    def quiet(self):
+        self.guard(self.loud)
+        self.loud = False
+
+
+def run_atomic(sink, num_steps, print_headers = True):
+    sim = AtomicRuleSimulator(Talker(), random_seed = 3)
+    if sink is not None:
+        sim.log_to(sink)
+    with contextlib.redirect_stdout(io.StringIO()) as printed:
+        sim.run(num_steps, print_headers = print_headers)
+    return sim, printed.getvalue()
+
+
+num_steps = 100 if cli.args.quick else 2000
+
+print('text')
+for print_headers in (True, False):
+    reference, expected = run_atomic(None, num_steps, print_headers)
+    assert 'SHOUT-True!' in expected
+    text = io.StringIO()
+    sim, printed = run_atomic(TextSink(text, buffer_size = 7), num_steps, print_headers)
+    assert printed == '' and text.getvalue() == expected
+    assert sim.system._dp_model_state_hash == reference.system._dp_model_state_hash
+
+print('json lines')
+_, expected = run_atomic(None, num_steps)
+saved = io.StringIO()
+sim, printed = run_atomic(JsonLinesSink(saved), num_steps)
+entries = [json.loads(line) for line in saved.getvalue().splitlines()]
+assert printed == '' and len(entries) == len(expected.splitlines())
+talk = next(e for e in entries if e['method'] == 'talk')
+assert talk['rule_id'] == f"top.talk(n={talk['params']['n']})"
+assert talk['component'] == 'top' and talk['args'][0] == 'talk' and talk['args'][1] == talk['params']['n']
+assert all(0 <= e['step'] < num_steps for e in entries)
+assert [e['step'] for e in entries] == sorted(e['step'] for e in entries)
+assert any(e['args'] == ['SHOUT', True] for e in entries)
+
+print('null')
+sim, printed = run_atomic(NullSink(), num_steps)
+assert printed == ''
+assert sim.system._dp_model_state_hash == reference.system._dp_model_state_hash
+
+
+class Stuck(Model):
+    count: Integer[...] = 0
+    rules: [inc]
+
+    def inc(self):
+        self.guard(self.count < 3)
+        self.count += 1
+        self.print('inc')
+
+
+print('deadlock message')
+sim = AtomicRuleSimulator(Stuck(), random_seed = 1)
+text = io.StringIO()
+sim.log_to(TextSink(text))
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    sim.run(10)
+assert printed.getvalue() == '' and text.getvalue().endswith('System Deadlock\n')
+assert text.getvalue().count(':: inc') == 3
+
+print('clocked')
+num_cycles = 30 if cli.args.quick else 300
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    ClockedSimulator(Talker(), dict(period_ps = 1000), random_seed = 4).run(cycles = num_cycles)
+expected = printed.getvalue()
+text = io.StringIO()
+sim = ClockedSimulator(Talker(), dict(period_ps = 1000), random_seed = 4)
+sim.log_to(TextSink(text))
+sim.run(cycles = num_cycles)
+assert text.getvalue() == expected
+saved = io.StringIO()
+sim = ClockedSimulator(Talker(), dict(period_ps = 1000), random_seed = 4)
+sim.log_to(JsonLinesSink(saved))
+sim.run(cycles = num_cycles)
+times = [json.loads(line)['time_ps'] for line in saved.getvalue().splitlines()]
+assert len(times) == len(expected.splitlines()) and times == sorted(times) and times[-1] > 0
+
+print('back to printing')
+sim = AtomicRuleSimulator(Stuck(), random_seed = 1)
+sim.log_to(NullSink())
+sim.log_to(None)
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    sim.run(10)
+assert printed.getvalue().count(':: inc') == 3
@@ -0,0 +1,158 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for checksearch shared between worker processes
+
+checks
+    passing stimulus: matched in parallel, the parent ends with a matching rule history
+    failing stimulus: fails in parallel as sequentially, with failing states shared back
+    a search started sequentially with part of the stimulus can finish in parallel
+    with stimulus not complete, the search is sequential and waits for more
+    failing-state lookups and matches are counted in the workers
+'''
+
+import contextlib
+import io
+import random
+
+import cli
+from purple import (
+    Integer, Record, Tuple, Model, Port, StimulusIOTestbenchBase, StimulusInput, StimulusOutput,
+    StimulusIOCheckerState,
+)
+
+
+# a reorder buffer completing any held entry by tag, retiring in completion order by payload
+# so the search backtracks when it completes the wrong one of two equal tags
+class Entry(Record):
+    tag: Integer[2]
+    payload: Integer[16]
+
+
+class ReorderSpec(Model):
+    held: Tuple[Entry]
+    completed: Tuple[Integer[16]]
+    request: Port[Entry]
+    completion: Port[Integer[2]]
+    retirement: Port[Integer[16]]
+
+    rules: [accept, complete, retire]
+
+    def accept(self):
+        self.guard(len(self.held) < 4)
+        self.held.append(self.request)
+
+    def complete(self, slot: Integer[4]):
+        self.guard(slot < len(self.held) and len(self.completed) < 2)
+        entry = self.held.pop(slot)
+        self.completion = entry.tag
+        self.completed.append(entry.payload)
+
+    def retire(self):
+        self.guard(self.completed)
+        self.retirement = self.completed.pop(0)
+
+
+class ReorderChecker(StimulusIOTestbenchBase):
+    requests: StimulusInput[Entry]
+    completions: StimulusOutput[Integer[2]]
+    retirements: StimulusOutput[Integer[16]]
+    dut: ReorderSpec[
+        _.request << requests.port_for_spec_input,
+        _.completion >> completions.port_for_spec_output,
+        _.retirement >> retirements.port_for_spec_output,
+    ]
+
+    def stimulus_inputs(self):
+        return (self.requests,)
+
+    def stimulus_outputs(self):
+        return (self.completions, self.retirements)
+
+
+def stimulus(num_entries, seed):
+    'list of (queue name, value, time_ps) from a reference reorder buffer'
+    rng = random.Random(seed)
+    held = []
+    completed = []
+    num_accepted = 0
+    time_ps = 0
+    events = []
+    while num_accepted < num_entries or held or completed:
+        time_ps += 1000
+        choice = rng.random()
+        if completed and (choice < 0.5 or len(completed) == 2 or num_accepted == num_entries and not held):
+            events.append(('retirements', completed.pop(0), time_ps))
+        elif num_accepted < num_entries and len(held) < 4 and (not held or choice < 0.8):
+            entry = Entry(tag = rng.randrange(2), payload = rng.randrange(16))
+            held.append(entry)
+            events.append(('requests', entry, time_ps))
+            num_accepted += 1
+        else:
+            entry = held.pop(rng.randrange(len(held)))
+            completed.append(entry.payload)
+            events.append(('completions', entry.tag, time_ps))
+    return events
+
+
+def push(testbench, events):
+    for name,value,time_ps in events:
+        getattr(testbench, name).queue.push(value, time_ps)
+
+
+def checked(events, num_workers, checker_state = None, testbench = None):
+    if testbench is None:
+        testbench = ReorderChecker()
+        push(testbench, events)
+        testbench.finalise_all_stimulus()
+    if checker_state is None:
+        checker_state = StimulusIOCheckerState(testbench)
+    with contextlib.redirect_stdout(io.StringIO()):
+        checker_state = testbench.checksearch(checker_state, num_workers = num_workers)
+    return checker_state
+
+
+num_entries = 30 if cli.args.quick else 200
+events = stimulus(num_entries, 1)
+
+print('passing')
+sequential = checked(events, 0)
+parallel = checked(events, 3)
+assert sequential.passed() and parallel.passed()
+assert parallel.num_invocations > 0
+testbench = parallel.spec_testbench
+assert not testbench.any_unmatched_outputs()
+assert len(parallel.index_history) == len(parallel.rule_history) + 1
+
+print('failing')
+# the last retirement has the wrong payload, so every rule sequence must be tried
+name, payload, time_ps = events[-1]
+assert name == 'retirements'
+bad_events = events[:-1] + [(name, (payload + 1) % 16, time_ps)]
+sequential = checked(bad_events, 0)
+parallel = checked(bad_events, 4)
+assert sequential.failed() and parallel.failed()
+assert len(parallel.failing_state_hashes) > 0
+assert parallel.num_hash_lookups >= parallel.num_hash_matches > 0
+assert not parallel.rule_history
+
+print('resume in parallel')
+testbench = ReorderChecker()
+half = len(events) // 2
+push(testbench, events[:half])
+checker_state = checked(None, 0, testbench = testbench)
+assert checker_state.waiting_for_input() and checker_state.rule_history
+num_before = len(checker_state.rule_history)
+
+print('incomplete stimulus')
+checker_state = checked(None, 2, checker_state, testbench)
+assert checker_state.waiting_for_input() and len(checker_state.rule_history) == num_before
+
+push(testbench, events[half:])
+testbench.finalise_all_stimulus()
+checker_state = checked(None, 2, checker_state, testbench)
+assert checker_state.passed() and not testbench.any_unmatched_outputs()
+assert len(checker_state.rule_history) > num_before
@@ -0,0 +1,123 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for exhaustive rule evaluation in forked worker processes
+
+checks
+    same rule sequence as the serial exhaustive search, for the same seed
+    replicas kept in step with rules committed by guessing and by exhaustive search
+    weighted and adaptive selection
+    deadlock detection
+    replicas brought back in step after state changes made outside the simulator
+    exception in a rule is raised in the parent
+'''
+
+import cli
+from purple import Integer, Model, Tuple, AtomicRuleSimulator
+from purple.rule import Rule
+
+
+class Lane(Model):
+    fifo: Tuple[Integer[...]]
+    received: Integer[...] = 0
+
+    rules: [push, pop]
+
+    def push(self, value: Integer[8]):
+        self.guard(len(self.fifo) < 2 and value == self.received % 8)
+        self.guard(self.received + len(self.fifo) < 40)
+        self.fifo.append(value)
+
+    def pop(self):
+        self.guard(self.fifo)
+        self.fifo.pop(0)
+        self.received += 1
+
+
+class Top(Model):
+    a: Lane
+    b: Lane
+    limit: Integer[...] = 60
+    explode: Integer[...] = 0
+
+    rules: [boom]
+
+    def boom(self):
+        self.guard(self.explode == 0 and self.a.received + self.b.received >= self.limit)
+        assert False, 'boom'
+
+    # not a rule, invoked by the testbench
+    def skip(self):
+        self.a.received += 3
+
+
+class Quiet(Top):
+    explode: Integer[...] = 1
+
+
+def state(system):
+    return (system.a.received, tuple(system.a.fifo), system.b.received, tuple(system.b.fifo))
+
+def compare(make_sim, num_steps):
+    serial = make_sim(0)
+    parallel = make_sim(3)
+    for _ in range(num_steps):
+        serial.run(1, show_print = False, num_guards_before_exhaustive = 1)
+        parallel.run(1, show_print = False, num_guards_before_exhaustive = 1)
+        assert state(serial.system) == state(parallel.system)
+        assert serial.deadlocked == parallel.deadlocked
+        if serial.deadlocked:
+            break
+    parallel.close()
+    return serial
+
+
+num_steps = 150 if cli.args.quick else 1000
+
+print('same as serial')
+compare(lambda n: AtomicRuleSimulator(Quiet(), random_seed = 4, num_guard_workers = n), num_steps)
+
+print('weighted')
+def weighted(n):
+    sim = AtomicRuleSimulator(Quiet(), random_seed = 5, weighted = True, num_guard_workers = n)
+    sim.weighted_pool.set_component_weight(sim.system.b, 0)
+    return sim
+sim = compare(weighted, num_steps)
+assert sim.system.b.received == 0
+
+print('adaptive')
+compare(lambda n: AtomicRuleSimulator(Quiet(), random_seed = 6, adaptive = True, num_guard_workers = n), num_steps)
+
+print('deadlock')
+sim = compare(lambda n: AtomicRuleSimulator(Quiet(), random_seed = 7, num_guard_workers = n), 1000000)
+assert sim.deadlocked
+
+print('outside state changes')
+serial = AtomicRuleSimulator(Quiet(), random_seed = 9)
+parallel = AtomicRuleSimulator(Quiet(), random_seed = 9, num_guard_workers = 2)
+for step in range(num_steps):
+    if step % 10 == 5:
+        for sim in (serial, parallel):
+            system = sim.system
+            # a rule invoked directly, and a write by the testbench
+            Rule(system.a, system.a.pop, dict()).invoke(show_print = False)
+            Rule(system, system.skip, dict()).invoke(show_print = False)
+    serial.run(1, show_print = False, num_guards_before_exhaustive = 1)
+    parallel.run(1, show_print = False, num_guards_before_exhaustive = 1)
+    assert state(serial.system) == state(parallel.system)
+    assert serial.deadlocked == parallel.deadlocked
+    if serial.deadlocked:
+        break
+parallel.close()
+
+print('exception')
+sim = AtomicRuleSimulator(Top(), random_seed = 8, num_guard_workers = 2)
+try:
+    sim.run(1000000, show_print = False, num_guards_before_exhaustive = 1)
+    assert False
+except AssertionError as e:
+    assert str(e) == 'boom'
+sim.close()
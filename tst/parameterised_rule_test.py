@@ -0,0 +1,120 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for lazily-constructed parameterised rules
+
+checks
+    elaboration does not construct one Rule per parameter set
+    size of the parameter space
+    indexing matches enumeration order, first parameter most significant
+    sampling from a random generator
+    find_rule with some parameters fixed
+    records and unions as parameters
+'''
+
+import random
+import time
+from purple import Integer, Boolean, Record, Model, AtomicRuleSimulator, rule
+
+
+class Address(Record):
+    page: Integer[16] = 0
+    secure: Boolean = False
+
+
+class Big(Model):
+    total: Integer[...] = 0
+    last: Address
+    small: Integer[4] | Address = 0
+
+    rules: [write, pick, tick]
+
+    def write(self, a: Integer[256], b: Integer[256], address: Address):
+        self.guard(a != b)
+        self.total += 1
+        self.last = address
+
+    def pick(self, x: Integer[4] | Address):
+        self.small = x
+
+    def tick(self):
+        self.total += 1
+
+
+# would be 256 * 256 * 32 Rule objects if constructed eagerly
+constructed = 0
+original_init = rule.Rule.__init__
+
+def counting_init(self, *args):
+    global constructed
+    constructed += 1
+    original_init(self, *args)
+
+rule.Rule.__init__ = counting_init
+
+print('elaboration')
+t0 = time.time()
+system = Big()
+elaboration_s = time.time() - t0
+print('    seconds', elaboration_s, 'rules constructed', constructed)
+assert constructed <= 1 # only the rule without parameters
+assert elaboration_s < 1.0
+
+prules = {p.method_name:p for p in system._dp_rules}
+write, pick, tick = prules['write'], prules['pick'], prules['tick']
+
+print('size')
+assert write.size == len(write) == 256 * 256 * 32
+assert pick.size == len(pick) == 4 + 32
+assert tick.size == 1
+assert len(system.rule_sequence()) == write.size + pick.size + tick.size
+
+print('indexing')
+assert [str(r) for r in pick] == [str(pick[i]) for i in range(len(pick))]
+assert [r.params['x'] for r in pick][:4] == [0, 1, 2, 3]
+assert str(write[0]) == 'top.write(a=0, b=0, address=Address(page=0, secure=True))'
+assert str(write[1]) == 'top.write(a=0, b=0, address=Address(page=0, secure=False))'
+assert str(write[32]) == 'top.write(a=0, b=1, address=Address(page=0, secure=True))'
+assert str(write[-1]) == 'top.write(a=255, b=255, address=Address(page=15, secure=False))'
+assert tick[0] is tick[0] is next(system.find_rule(method_name = 'tick'))
+assert all(r.parameterised_rule is pick and r.param_index == i for i,r in enumerate(pick))
+assert write[12345].param_index == 12345
+first_few = []
+for r in write:
+    first_few.append(str(r))
+    if len(first_few) == 100:
+        break
+assert first_few == [str(write[i]) for i in range(100)]
+try:
+    write[write.size]
+    assert False
+except IndexError:
+    pass
+
+print('sampling')
+rand_gen = random.Random(3)
+for _ in range(100):
+    r = write.sample(rand_gen)
+    assert r.method_name == 'write'
+    assert 0 <= r.params['a'] < 256 and 0 <= r.params['b'] < 256
+
+print('find with fixed parameters')
+found = list(system.find_rule(method_name = 'write', params = dict(a = 7, b = 9)))
+assert len(found) == 32
+assert all(r.params['a'] == 7 and r.params['b'] == 9 for r in found)
+assert all(str(write[r.param_index]) == str(r) for r in found)
+assert not list(system.find_rule(method_name = 'write', params = dict(c = 1)))
+found = list(system.find_rule(method_name = 'pick', params = dict(x = Address(page = 3, secure = True))))
+assert len(found) == 1
+found[0].invoke(show_print = False)
+assert system.small.page == 3
+
+print('simulation')
+sim = AtomicRuleSimulator(system, random_seed = 1)
+sim.run(200, show_print = False)
+assert system.total > 0
+print('    rules constructed', constructed)
+assert constructed < 10000
@@ -0,0 +1,156 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for rule profiling
+
+checks
+    original methods restored when the profiler is disabled
+    same simulation results with and without profiling
+    invocation counts match the atomic-rule simulator, with and without the lean path
+    exceptions counted
+    clock edges counted, and rules invoked on them
+    checksearch calls and rules tested counted
+    JSON export
+'''
+
+import io
+import json
+
+import cli
+from purple import (
+    Integer, Boolean, Model, Port, Clock, AtomicRuleSimulator, ClockedSimulator,
+    StimulusIOTestbenchBase, StimulusInput, StimulusOutput, StimulusIOCheckerState,
+)
+from purple.rule import Rule
+from purple.profiling import Profiler, ProfilerInUse
+
+
+class Counter(Model):
+    count: Integer[...] = 0
+    odd: Boolean = False
+    clk: Clock[bump, wrap]
+
+    rules: [bump, wrap, explode]
+
+    def bump(self, n: Integer[1, 4]):
+        self.guard(self.count < 20)
+        self.count += n
+        self.odd = self.count % 2 == 1
+
+    def wrap(self):
+        self.guard(self.count >= 20)
+        self.count = 0
+
+    def explode(self):
+        self.guard(self.count == 1000)
+
+
+def run_atomic(lean_run, num_steps):
+    sim = AtomicRuleSimulator(Counter(), random_seed = 5, lean_run = lean_run)
+    sim.run(num_steps, show_print = False)
+    return sim
+
+
+num_steps = 200 if cli.args.quick else 5000
+original_invoke = Rule.invoke
+
+print('atomic')
+for lean_run in (True, False):
+    reference = run_atomic(lean_run, num_steps)
+    with Profiler() as profiler:
+        sim = run_atomic(lean_run, num_steps)
+    assert Rule.invoke is original_invoke
+    assert sim.system.count == reference.system.count
+    assert sim.system._dp_model_state_hash == reference.system._dp_model_state_hash
+
+    report = profiler.report()
+    totals = report['totals']
+    assert totals['invocations'] == sim.num_rule_evaluations
+    assert totals['invocations'] - totals['guarded'] >= sim.num_invocations > 0
+    assert totals['exceptions'] == 0
+    assert totals['leaf_writes'] > 0 and totals['hash_updates'] > 0 and totals['state_reads'] > 0
+    assert sum(e['invocations'] for e in report['methods']) == totals['invocations']
+    explode, = (e for e in report['methods'] if e['method'].endswith('explode'))
+    assert explode['guard_miss_ratio'] == 1.0
+    assert report['rules_by_guard_miss'][0]['guard_miss_ratio'] == 1.0
+    assert len(report['rules_by_time']) == min(10, report['num_rules'])
+
+print('exception')
+class Exploding(Counter):
+    def explode(self):
+        self.guard(self.count > 10)
+        assert False, 'boom'
+
+with Profiler() as profiler:
+    sim = AtomicRuleSimulator(Exploding(), random_seed = 1)
+    try:
+        sim.run(1000, show_print = False)
+        assert False
+    except AssertionError as e:
+        assert str(e) == 'boom'
+assert profiler.report()['totals']['exceptions'] == 1
+
+print('nested profilers')
+with Profiler():
+    try:
+        Profiler().enable()
+        assert False
+    except ProfilerInUse:
+        pass
+
+print('clocked')
+num_cycles = 50 if cli.args.quick else 500
+with Profiler() as profiler:
+    sim = ClockedSimulator(Counter(), dict(period_ps = 1000), random_seed = 2)
+    sim.run(cycles = num_cycles, show_print = False)
+report = profiler.report()
+clock, = report['clocks']
+assert clock['events'] == sim.clocks[0][0].num_events
+assert report['totals']['invocations'] == 2 * clock['events']
+assert report['totals']['invocations'] - report['totals']['guarded'] == clock['committed']
+
+
+class Echo(Model):
+    request: Port[Integer[4]]
+    response: Port[Integer[4]]
+    rules: [echo]
+
+    def echo(self):
+        self.response = self.request
+
+
+class EchoChecker(StimulusIOTestbenchBase):
+    requests: StimulusInput[Integer[4]]
+    responses: StimulusOutput[Integer[4]]
+    dut: Echo[_.request << requests.port_for_spec_input, _.response >> responses.port_for_spec_output]
+
+    def stimulus_inputs(self):
+        return (self.requests,)
+
+    def stimulus_outputs(self):
+        return (self.responses,)
+
+
+print('checksearch')
+testbench = EchoChecker()
+for i in range(20):
+    testbench.requests.queue.push(i % 4, i * 1000)
+    testbench.responses.queue.push(i % 4, i * 1000 + 500)
+testbench.finalise_all_stimulus()
+with Profiler() as profiler:
+    checker_state = testbench.checksearch(StimulusIOCheckerState(testbench))
+assert checker_state.passed()
+report = profiler.report()
+assert report['checksearch']['calls'] == 1
+assert report['checksearch']['rules_tested'] == checker_state.num_invocations
+assert report['totals']['invocations'] >= checker_state.num_invocations
+
+print('json')
+saved = io.StringIO()
+profiler.save_json(saved)
+loaded = json.loads(saved.getvalue())
+assert loaded['totals'] == report['totals'] and loaded['num_rules'] == report['num_rules']
+profiler.show(top = 3)
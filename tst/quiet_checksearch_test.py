@@ -0,0 +1,183 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for quiet checksearch, printing only the rule sequence found
+
+checks
+    passing: only the printout of the rule history, the same as its rules print when replayed
+    failing: only the printout of the deepest rule history reached
+    waiting for input: nothing printed, printout of the current history on demand
+    printout to a log sink
+    with sleep sets and in parallel
+'''
+
+import contextlib
+import io
+import random
+
+import cli
+from purple import (
+    Integer, Record, Tuple, Model, Port, StimulusIOTestbenchBase, StimulusInput, StimulusOutput,
+    StimulusIOCheckerState,
+)
+from purple.logsink import TextSink
+
+
+# a reorder buffer completing any held entry by tag, retiring in completion order by payload
+# so the search backtracks when it completes the wrong one of two equal tags
+class Entry(Record):
+    tag: Integer[2]
+    payload: Integer[16]
+
+
+class ReorderSpec(Model):
+    held: Tuple[Entry]
+    completed: Tuple[Integer[16]]
+    request: Port[Entry]
+    completion: Port[Integer[2]]
+    retirement: Port[Integer[16]]
+
+    rules: [accept, complete, retire]
+
+    def accept(self):
+        self.guard(len(self.held) < 4)
+        self.held.append(self.request)
+        self.print('accepted', self.held[-1].payload)
+
+    def complete(self, slot: Integer[4]):
+        self.guard(slot < len(self.held) and len(self.completed) < 2)
+        entry = self.held.pop(slot)
+        self.completion = entry.tag
+        self.completed.append(entry.payload)
+        self.print('completed', entry.payload)
+
+    def retire(self):
+        self.guard(self.completed)
+        self.retirement = self.completed.pop(0)
+        self.print('retired')
+
+
+class ReorderChecker(StimulusIOTestbenchBase):
+    requests: StimulusInput[Entry]
+    completions: StimulusOutput[Integer[2]]
+    retirements: StimulusOutput[Integer[16]]
+    dut: ReorderSpec[
+        _.request << requests.port_for_spec_input,
+        _.completion >> completions.port_for_spec_output,
+        _.retirement >> retirements.port_for_spec_output,
+    ]
+
+    def stimulus_inputs(self):
+        return (self.requests,)
+
+    def stimulus_outputs(self):
+        return (self.completions, self.retirements)
+
+
+def stimulus(num_entries, seed):
+    'list of (queue name, value, time_ps) from a reference reorder buffer'
+    rng = random.Random(seed)
+    held = []
+    completed = []
+    num_accepted = 0
+    time_ps = 0
+    events = []
+    while num_accepted < num_entries or held or completed:
+        time_ps += 1000
+        choice = rng.random()
+        if completed and (choice < 0.5 or len(completed) == 2 or num_accepted == num_entries and not held):
+            events.append(('retirements', completed.pop(0), time_ps))
+        elif num_accepted < num_entries and len(held) < 4 and (not held or choice < 0.8):
+            entry = Entry(tag = rng.randrange(2), payload = rng.randrange(16))
+            held.append(entry)
+            events.append(('requests', entry, time_ps))
+            num_accepted += 1
+        else:
+            entry = held.pop(rng.randrange(len(held)))
+            completed.append(entry.payload)
+            events.append(('completions', entry.tag, time_ps))
+    return events
+
+
+def new_testbench(events, finalise = True):
+    testbench = ReorderChecker()
+    for name,value,time_ps in events:
+        getattr(testbench, name).queue.push(value, time_ps)
+    if finalise:
+        testbench.finalise_all_stimulus()
+    return testbench
+
+
+def searched(testbench, checker_state, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as printed:
+        checker_state = testbench.checksearch(checker_state, **kwargs)
+    return checker_state, printed.getvalue()
+
+
+def replayed(checker_state):
+    'printout of the rules of the rule history, invoked again from the start'
+    rules = [invocation.rule for invocation in checker_state.rule_history]
+    for invocation in reversed(checker_state.rule_history):
+        invocation.revert_state()
+    with contextlib.redirect_stdout(io.StringIO()) as printed:
+        for rule in rules:
+            rule.invoke(check = False)
+    return printed.getvalue()
+
+
+num_entries = 30 if cli.args.quick else 200
+events = stimulus(num_entries, 1)
+
+print('passing')
+checker_state, loud = searched(new_testbench(events), None)
+testbench = new_testbench(events)
+quiet_state, quiet = searched(testbench, StimulusIOCheckerState(testbench, quiet = True))
+assert checker_state.passed() and quiet_state.passed()
+assert quiet.count('::') == len(quiet_state.rule_history) < loud.count('::')
+assert quiet_state.num_invocations == checker_state.num_invocations
+assert quiet == replayed(quiet_state)
+
+print('failing')
+name, payload, time_ps = events[-1]
+assert name == 'retirements'
+bad_events = events[:-1] + [(name, (payload + 1) % 16, time_ps)]
+testbench = new_testbench(bad_events)
+_, loud = searched(testbench, None)
+testbench = new_testbench(bad_events)
+quiet_state, quiet = searched(testbench, StimulusIOCheckerState(testbench, quiet = True))
+assert quiet_state.failed() and not quiet_state.rule_history
+deepest = len(quiet_state.deepest_history)
+assert deepest > 0 and quiet.count('::') == deepest < loud.count('::')
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    quiet_state.produce_printout(deepest = True, headers = False)
+assert printed.getvalue().count('accepted') == quiet.count('accepted') and '::' not in printed.getvalue()
+
+print('waiting for input')
+half = len(events) // 2
+testbench = new_testbench(events[:half], finalise = False)
+quiet_state, quiet = searched(testbench, StimulusIOCheckerState(testbench, quiet = True))
+assert quiet_state.waiting_for_input() and quiet == ''
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    quiet_state.produce_printout()
+assert printed.getvalue().count('::') == len(quiet_state.rule_history) > 0
+
+print('log sink')
+testbench = new_testbench(events)
+text = io.StringIO()
+testbench.log_to(TextSink(text))
+quiet_state, quiet = searched(testbench, StimulusIOCheckerState(testbench, quiet = True))
+assert quiet == '' and text.getvalue().count('::') == len(quiet_state.rule_history)
+
+print('sleep sets and parallel')
+testbench = new_testbench(events)
+quiet_state, quiet = searched(testbench, StimulusIOCheckerState(testbench, sleep_sets = True, quiet = True))
+assert quiet_state.passed() and quiet.count('::') == len(quiet_state.rule_history)
+testbench = new_testbench(bad_events)
+quiet_state, quiet = searched(testbench, StimulusIOCheckerState(testbench, sleep_sets = True, quiet = True))
+assert quiet_state.failed() and quiet.count('::') == len(quiet_state.deepest_history) > 0
+testbench = new_testbench(events)
+quiet_state, quiet = searched(testbench, StimulusIOCheckerState(testbench, quiet = True), num_workers = 2)
+assert quiet_state.passed() and quiet.count('::') == len(quiet_state.rule_history)
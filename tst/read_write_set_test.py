@@ -0,0 +1,128 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for per-invocation read-set and write-set
+
+checks
+    leaf ids are allocated at elaboration, in elaboration order, one per leaf
+    reads are only recorded when asked for
+    reads before a guard failure are recorded
+    reads through sub-components, records, unions, tuples and port handlers
+    writes are reported for all invocations
+'''
+
+from purple import Integer, Boolean, Model, Record, Tuple, Port
+
+
+class Inner(Record):
+    x: Integer[10] = 1
+    y: Boolean = False
+
+
+class Other(Record):
+    z: Integer[10] = 3
+
+
+class Sub(Model):
+    value: Integer[10] = 5
+    out: Port[Integer[10]] << read_value
+
+    def read_value(self):
+        return self.value
+
+
+class Top(Model):
+    a: Integer[10] = 0
+    b: Integer[10] = 0
+    inner: Inner
+    choice: Inner | Other = Inner()
+    queue: Tuple[Integer[10]]
+    from_sub: Port[Integer[10]]
+    sub: Sub[_.out >> from_sub]
+
+    rules: [copy_a_to_b, guarded_on_b, via_record, via_union, via_tuple, via_port]
+
+    def copy_a_to_b(self):
+        self.b = self.a
+
+    def guarded_on_b(self):
+        self.guard(self.b > 5)
+        self.a = 1
+
+    def via_record(self):
+        self.inner.x = self.inner.x + 1
+        self.inner.y = True
+
+    def via_union(self):
+        self.choice = Other(z = 4)
+
+    def via_tuple(self):
+        self.queue.append(self.a)
+
+    def via_port(self):
+        self.a = self.from_sub
+
+
+system = Top()
+table = system._dp_leaf_table
+
+print('leaf ids')
+names = [table.full_name(i) for i in range(len(table))]
+print('   ', names)
+assert len(set(names)) == len(names)
+assert names[:2] == ['top.a', 'top.b']
+for component_name,leaf_name in [(('top',), 'a'), (('top', 'inner'), 'x'), (('top', 'sub'), 'value')]:
+    leaf_id = table.find(component_name, leaf_name)
+    assert leaf_id is not None
+    assert table.key(leaf_id) == (component_name, leaf_name)
+assert table.find(('top',), 'choice') is not None
+assert table.find(('top',), 'nothing') is None
+
+
+def invoke(method_name, track_reads = True):
+    the_rule = next(system.find_rule(method_name = method_name))
+    return the_rule.invoke(show_print = False, track_reads = track_reads)
+
+
+print('tracking is optional')
+inv = invoke('copy_a_to_b', track_reads = False)
+assert inv.reads is None
+assert inv.writes == {(('top',), 'b')}
+
+print('simple read and write')
+inv = invoke('copy_a_to_b')
+# the current value of a written leaf is read to work out the change
+assert inv.reads == {(('top',), 'a'), (('top',), 'b')}
+assert inv.writes == {(('top',), 'b')}
+assert set(inv.write_ids) == {table.find(('top',), 'b')}
+
+print('reads before guard failure')
+inv = invoke('guarded_on_b')
+assert inv.guarded
+assert inv.reads == {(('top',), 'b')}
+assert not inv.writes
+
+print('records')
+inv = invoke('via_record')
+assert inv.reads == {(('top', 'inner'), 'x'), (('top', 'inner'), 'y')}
+assert inv.writes == {(('top', 'inner'), 'x'), (('top', 'inner'), 'y')}
+
+print('unions')
+inv = invoke('via_union')
+assert (('top',), 'choice') in inv.writes
+assert (('top', 'choice'), 'z') in inv.writes
+assert (('top', 'choice'), 'x') in inv.writes
+
+print('tuples')
+inv = invoke('via_tuple')
+assert (('top',), 'a') in inv.reads and (('top',), 'queue') in inv.reads
+assert inv.writes == {(('top',), 'queue')}
+
+print('ports')
+inv = invoke('via_port')
+assert inv.reads == {(('top', 'sub'), 'value'), (('top',), 'a')}
+assert inv.writes == {(('top',), 'a')}
+assert system.a == 5
@@ -0,0 +1,122 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the multi-seed regression runner
+
+checks
+    per-seed results match separate runs with a newly elaborated system
+    failures from exceptions and from a check function, with captured printout
+    deadlock status and invocation counts
+    in-process and process-pool runs give the same results
+    clocked simulator, with clock state reset between seeds
+    snapshot restore
+'''
+
+import cli
+from purple import (
+    Integer, Model, Clock, AtomicRuleSimulator, ClockedSimulator, SystemSnapshot, regress,
+)
+
+
+class Counter(Model):
+    value: Integer[...] = 0
+    stuck: Integer[2] = 0
+
+    rules: [increment, decrement, get_stuck]
+
+    def increment(self, step: Integer[1, 4]):
+        self.guard(not self.stuck)
+        self.value += step
+        assert self.value < 40, 'overflow'
+
+    def decrement(self):
+        self.guard(not self.stuck and self.value > 0)
+        self.value -= 1
+
+    def get_stuck(self):
+        self.guard(not self.stuck and self.value == 7)
+        self.print('stuck at', self.value)
+        self.stuck = 1
+
+
+class Ticker(Model):
+    ticks: Integer[...] = 0
+    clk: Clock[tick]
+
+    def tick(self, n: Integer[3]):
+        self.ticks += n
+
+
+def single_run(seed):
+    sim = AtomicRuleSimulator(Counter(), random_seed = seed)
+    try:
+        sim.run(30, show_print = False)
+    except AssertionError:
+        return 'error', sim.num_invocations
+    return sim.deadlocked, sim.num_invocations
+
+
+seeds = list(range(20 if cli.args.quick else 200))
+
+print('process pool')
+results = regress(Counter, AtomicRuleSimulator, seeds, run_args = (30,), num_workers = 4)
+results.show()
+assert [r.seed for r in results.seed_results] == seeds
+assert results.failed and results.deadlocked and results.passed
+for r in results.seed_results:
+    expected_deadlock, expected_invocations = single_run(r.seed)
+    if expected_deadlock == 'error':
+        assert not r.passed and 'overflow' in r.error
+    else:
+        assert r.passed and r.deadlocked == expected_deadlock
+        assert r.num_invocations == expected_invocations
+assert results.num_invocations == sum(r.num_invocations for r in results.seed_results)
+
+print('captured printout of failing seeds')
+assert all(r.output is None for r in results.passed)
+stuck_seed = results.deadlocked[0].seed
+
+print('check function')
+not_stuck = regress(
+    Counter, AtomicRuleSimulator, seeds, run_args = (30,), check = lambda sim: not sim.system.stuck,
+)
+assert {r.seed for r in not_stuck.failed} == {r.seed for r in results.failed} | {r.seed for r in results.deadlocked}
+assert 'stuck at 7' in next(r for r in not_stuck.failed if r.seed == stuck_seed).output
+
+print('in-process')
+serial = regress(Counter, AtomicRuleSimulator, seeds, run_args = (30,), num_workers = 0)
+assert [(r.passed, r.deadlocked, r.num_invocations) for r in serial.seed_results] == \
+    [(r.passed, r.deadlocked, r.num_invocations) for r in results.seed_results]
+
+print('coverage')
+coverage = regress(
+    Counter, AtomicRuleSimulator, seeds, run_args = (30,), num_workers = 2,
+    coverage = lambda sim: sim.system.value,
+)
+assert coverage.coverage == [r.coverage for r in coverage.seed_results if r.coverage is not None]
+
+print('clocked')
+clocked = regress(
+    Ticker, ClockedSimulator, [1, 2, 3, 1],
+    simulator_args = (dict(period_ps = 1000, phase_ps = 500),),
+    run_kwargs = dict(cycles = 20, show_print = False),
+    coverage = lambda sim: (sim.system.ticks, sim.time_ps, sim.clocks[0][0].num_events),
+    num_workers = 2,
+    chunk_size = 1,
+)
+assert all(r.passed for r in clocked.seed_results)
+ticks = [r.coverage for r in clocked.seed_results]
+assert ticks[0] == ticks[3]
+assert all(t[1:] == (20500, 21) for t in ticks)
+
+print('snapshot')
+system = Counter()
+initial = SystemSnapshot(system)
+sim = AtomicRuleSimulator(system, random_seed = 3)
+sim.run(20, show_print = False)
+initial.restore()
+assert system.value == 0 and system.stuck == 0
+assert system._dp_model_state_hash == initial.model_state_hash
@@ -0,0 +1,226 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for partial-order reduction of checksearch by sleep sets
+
+checks
+    independent lanes: same result, fewer rules tested, passing and failing
+    far fewer rules tested when no failing states are kept
+    dependent rules (a reorder buffer): same result as without sleep sets
+    a search resumed with more stimulus keeps its sleep sets
+'''
+
+import contextlib
+import io
+import random
+
+import cli
+from purple import (
+    Integer, Record, Tuple, Model, Port, StimulusIOTestbenchBase, StimulusInput, StimulusOutput,
+    StimulusIOCheckerState,
+)
+
+
+# lanes that each buffer up to two values, independently of the other lanes
+class Lane(Model):
+    held: Tuple[Integer[16]]
+    request: Port[Integer[16]]
+    response: Port[Integer[16]]
+
+    rules: [accept, respond]
+
+    def accept(self):
+        self.guard(len(self.held) < 2)
+        self.held.append(self.request)
+
+    def respond(self):
+        self.guard(self.held)
+        self.response = self.held.pop(0)
+
+
+class LanesChecker(StimulusIOTestbenchBase):
+    in_0: StimulusInput[Integer[16]]
+    in_1: StimulusInput[Integer[16]]
+    in_2: StimulusInput[Integer[16]]
+    out_0: StimulusOutput[Integer[16]]
+    out_1: StimulusOutput[Integer[16]]
+    out_2: StimulusOutput[Integer[16]]
+    lane_0: Lane[_.request << in_0.port_for_spec_input, _.response >> out_0.port_for_spec_output]
+    lane_1: Lane[_.request << in_1.port_for_spec_input, _.response >> out_1.port_for_spec_output]
+    lane_2: Lane[_.request << in_2.port_for_spec_input, _.response >> out_2.port_for_spec_output]
+
+    def stimulus_inputs(self):
+        return (self.in_0, self.in_1, self.in_2)
+
+    def stimulus_outputs(self):
+        return (self.out_0, self.out_1, self.out_2)
+
+
+def lanes_stimulus(num_values, seed):
+    'list of (queue name, value, time_ps), all inputs before all outputs'
+    rng = random.Random(seed)
+    events = []
+    for lane in range(3):
+        values = [rng.randrange(16) for _ in range(num_values)]
+        events.extend((f'in_{lane}', v, 1000) for v in values)
+        events.extend((f'out_{lane}', v, 2000) for v in values)
+    return sorted(events, key = lambda e: e[2])
+
+
+# a reorder buffer completing any held entry by tag, retiring in completion order by payload
+class Entry(Record):
+    tag: Integer[2]
+    payload: Integer[16]
+
+
+class ReorderSpec(Model):
+    held: Tuple[Entry]
+    completed: Tuple[Integer[16]]
+    request: Port[Entry]
+    completion: Port[Integer[2]]
+    retirement: Port[Integer[16]]
+
+    rules: [accept, complete, retire]
+
+    def accept(self):
+        self.guard(len(self.held) < 4)
+        self.held.append(self.request)
+
+    def complete(self, slot: Integer[4]):
+        self.guard(slot < len(self.held) and len(self.completed) < 2)
+        entry = self.held.pop(slot)
+        self.completion = entry.tag
+        self.completed.append(entry.payload)
+
+    def retire(self):
+        self.guard(self.completed)
+        self.retirement = self.completed.pop(0)
+
+
+class ReorderChecker(StimulusIOTestbenchBase):
+    requests: StimulusInput[Entry]
+    completions: StimulusOutput[Integer[2]]
+    retirements: StimulusOutput[Integer[16]]
+    dut: ReorderSpec[
+        _.request << requests.port_for_spec_input,
+        _.completion >> completions.port_for_spec_output,
+        _.retirement >> retirements.port_for_spec_output,
+    ]
+
+    def stimulus_inputs(self):
+        return (self.requests,)
+
+    def stimulus_outputs(self):
+        return (self.completions, self.retirements)
+
+
+def reorder_stimulus(num_entries, seed):
+    rng = random.Random(seed)
+    held = []
+    completed = []
+    num_accepted = 0
+    time_ps = 0
+    events = []
+    while num_accepted < num_entries or held or completed:
+        time_ps += 1000
+        choice = rng.random()
+        if completed and (choice < 0.5 or len(completed) == 2 or num_accepted == num_entries and not held):
+            events.append(('retirements', completed.pop(0), time_ps))
+        elif num_accepted < num_entries and len(held) < 4 and (not held or choice < 0.8):
+            entry = Entry(tag = rng.randrange(2), payload = rng.randrange(16))
+            held.append(entry)
+            events.append(('requests', entry, time_ps))
+            num_accepted += 1
+        else:
+            entry = held.pop(rng.randrange(len(held)))
+            completed.append(entry.payload)
+            events.append(('completions', entry.tag, time_ps))
+    return events
+
+
+def corrupted(events, name):
+    'the last value pushed to a queue is wrong'
+    i = max(i for i,e in enumerate(events) if e[0] == name)
+    _, value, time_ps = events[i]
+    return events[:i] + [(name, (value + 1) % 16, time_ps)] + events[i + 1:]
+
+
+class NoStore:
+    '''failing-state store which keeps nothing, like a full bounded store but with a search
+    that does not depend on which model state hashes collide (which varies with the hash seed)
+    '''
+    def add(self, model_state_hash):
+        pass
+
+    def __contains__(self, model_state_hash):
+        return False
+
+    def __len__(self):
+        return 0
+
+
+def checked(
+    testbench_cls, events, sleep_sets,
+    checker_state = None, testbench = None, finalise = True, failing_state_hashes = None,
+):
+    if testbench is None:
+        testbench = testbench_cls()
+    for name,value,time_ps in events:
+        getattr(testbench, name).queue.push(value, time_ps)
+    if finalise:
+        testbench.finalise_all_stimulus()
+    if checker_state is None:
+        checker_state = StimulusIOCheckerState(testbench, failing_state_hashes, sleep_sets = sleep_sets)
+    with contextlib.redirect_stdout(io.StringIO()):
+        checker_state = testbench.checksearch(checker_state)
+    return checker_state
+
+
+print('independent lanes')
+num_values = 3 if cli.args.quick else 5
+events = lanes_stimulus(num_values, 1)
+plain = checked(LanesChecker, events, False)
+reduced = checked(LanesChecker, events, True)
+assert plain.passed() and reduced.passed()
+assert not reduced.spec_testbench.any_unmatched_outputs()
+
+bad_events = corrupted(events, 'out_0')
+plain = checked(LanesChecker, bad_events, False)
+reduced = checked(LanesChecker, bad_events, True)
+assert plain.failed() and reduced.failed()
+assert reduced.num_sleep_skips > 0
+assert len(reduced.failing_state_hashes) == len(plain.failing_state_hashes)
+assert reduced.num_invocations < plain.num_invocations
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    reduced.show('reduced', 0, 0)
+assert 'sleeping rules skipped' in printed.getvalue()
+
+print('no store')
+bad_events = corrupted(lanes_stimulus(1 if cli.args.quick else 2, 2), 'out_1')
+plain = checked(LanesChecker, bad_events, False, failing_state_hashes = NoStore())
+reduced = checked(LanesChecker, bad_events, True, failing_state_hashes = NoStore())
+assert plain.failed() and reduced.failed()
+assert reduced.num_invocations * 2 < plain.num_invocations
+
+print('dependent rules')
+num_entries = 20 if cli.args.quick else 150
+for seed in range(2 if cli.args.quick else 4):
+    events = reorder_stimulus(num_entries, seed)
+    assert checked(ReorderChecker, events, False).passed()
+    assert checked(ReorderChecker, events, True).passed()
+    bad_events = corrupted(events, 'retirements')
+    assert checked(ReorderChecker, bad_events, False).failed()
+    assert checked(ReorderChecker, bad_events, True).failed()
+
+print('resumed')
+events = reorder_stimulus(num_entries, 4)
+half = len(events) // 2
+checker_state = checked(ReorderChecker, events[:half], True, finalise = False)
+assert checker_state.waiting_for_input()
+assert len(checker_state.sleep_history) == len(checker_state.index_history)
+checker_state = checked(None, events[half:], True, checker_state, checker_state.spec_testbench)
+assert checker_state.passed()
+assert len(checker_state.sleep_history) == len(checker_state.index_history)
@@ -0,0 +1,163 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the memory-bounded failing-state store used by checksearch
+
+checks
+    same membership as a set while nothing is evicted, including after deletions
+    memory stays within the ceiling and the number of entries is bounded
+    clock eviction keeps entries that are looked up
+    Bloom tier remembers evicted entries, with few false positives
+    checksearch passes with a store much smaller than the failing states, and reports the hit ratio
+'''
+
+import contextlib
+import io
+import random
+
+import cli
+from purple import (
+    Integer, Record, Tuple, Model, Port, StimulusIOTestbenchBase, StimulusInput, StimulusOutput,
+    StimulusIOCheckerState,
+)
+from purple.statestore import CompactStateStore
+
+rng = random.Random(1)
+num_hashes = 2000 if cli.args.quick else 50000
+
+print('membership')
+store = CompactStateStore(max_bytes = num_hashes * 30)
+added = set()
+for _ in range(num_hashes):
+    h = rng.getrandbits(100) - 2**99
+    store.add(h)
+    added.add(h)
+assert store.num_evicted == 0 and len(store) == len(added)
+assert all(h in store for h in added)
+assert sum(rng.getrandbits(100) in store for _ in range(1000)) == 0
+
+print('deletion')
+keys = [k for k in store.keys if k]
+for k in keys[::3]:
+    store.delete(store.slot(k))
+remaining = set(keys) - set(keys[::3])
+assert len(store) == len(remaining)
+assert all(store.keys[store.slot(k)] == k for k in remaining)
+assert all(not store.keys[store.slot(k)] for k in keys[::3])
+
+print('ceiling and eviction')
+store = CompactStateStore(max_bytes = 4096)
+assert store.memory_bytes <= 4096
+hot = [rng.getrandbits(64) for _ in range(20)]
+for h in hot:
+    store.add(h)
+for _ in range(num_hashes):
+    store.add(rng.getrandbits(64))
+    for h in hot[:10]:
+        assert h in store
+assert len(store) <= store.max_entries and store.num_evicted > 0
+assert store.memory_bytes <= 4096
+
+print('bloom')
+store = CompactStateStore(max_bytes = 8192, bloom_fraction = 0.5)
+assert store.memory_bytes <= 8192
+first = [rng.getrandbits(64) for _ in range(400)]
+for h in first:
+    store.add(h)
+for _ in range(400):
+    store.add(rng.getrandbits(64))
+assert store.num_evicted > 0
+assert all(h in store for h in first)
+assert sum(rng.getrandbits(64) in store for _ in range(1000)) < 50
+
+
+# a reorder buffer completing any held entry by tag, retiring in completion order by payload
+# so the search backtracks when it completes the wrong one of two equal tags
+class Entry(Record):
+    tag: Integer[2]
+    payload: Integer[16]
+
+
+class ReorderSpec(Model):
+    held: Tuple[Entry]
+    completed: Tuple[Integer[16]]
+    request: Port[Entry]
+    completion: Port[Integer[2]]
+    retirement: Port[Integer[16]]
+
+    rules: [accept, complete, retire]
+
+    def accept(self):
+        self.guard(len(self.held) < 4)
+        self.held.append(self.request)
+
+    def complete(self, slot: Integer[4]):
+        self.guard(slot < len(self.held) and len(self.completed) < 2)
+        entry = self.held.pop(slot)
+        self.completion = entry.tag
+        self.completed.append(entry.payload)
+
+    def retire(self):
+        self.guard(self.completed)
+        self.retirement = self.completed.pop(0)
+
+
+class ReorderChecker(StimulusIOTestbenchBase):
+    requests: StimulusInput[Entry]
+    completions: StimulusOutput[Integer[2]]
+    retirements: StimulusOutput[Integer[16]]
+    dut: ReorderSpec[
+        _.request << requests.port_for_spec_input,
+        _.completion >> completions.port_for_spec_output,
+        _.retirement >> retirements.port_for_spec_output,
+    ]
+
+    def stimulus_inputs(self):
+        return (self.requests,)
+
+    def stimulus_outputs(self):
+        return (self.completions, self.retirements)
+
+
+def checked(num_entries, failing_state_hashes):
+    testbench = ReorderChecker()
+    rng = random.Random(2)
+    held = []
+    completed = []
+    num_accepted = 0
+    time_ps = 0
+    while num_accepted < num_entries or held or completed:
+        time_ps += 1000
+        choice = rng.random()
+        if completed and (choice < 0.5 or len(completed) == 2 or num_accepted == num_entries and not held):
+            testbench.retirements.queue.push(completed.pop(0), time_ps)
+        elif num_accepted < num_entries and len(held) < 4 and (not held or choice < 0.8):
+            entry = Entry(tag = rng.randrange(2), payload = rng.randrange(16))
+            held.append(entry)
+            testbench.requests.queue.push(entry, time_ps)
+            num_accepted += 1
+        else:
+            entry = held.pop(rng.randrange(len(held)))
+            completed.append(entry.payload)
+            testbench.completions.queue.push(entry.tag, time_ps)
+    testbench.finalise_all_stimulus()
+    checker_state = StimulusIOCheckerState(testbench, failing_state_hashes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        checker_state = testbench.checksearch(checker_state)
+    return checker_state
+
+
+print('checksearch')
+num_entries = 60 if cli.args.quick else 300
+exact = checked(num_entries, None)
+bounded = checked(num_entries, CompactStateStore(max_bytes = 300))
+assert exact.passed() and bounded.passed()
+assert len(exact.failing_state_hashes) > bounded.failing_state_hashes.max_entries
+assert bounded.failing_state_hashes.num_evicted > 0
+assert bounded.num_invocations >= exact.num_invocations
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    bounded.show('bounded', 0, 0)
+assert 'failing-state hit ratio' in printed.getvalue() and 'evicted' in printed.getvalue()
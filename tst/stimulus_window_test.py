@@ -0,0 +1,191 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the stimulus retention window of checksearch
+
+checks
+    checking stimulus as it arrives with a history window passes, keeping few stimulus entries
+    with a window too small to backtrack far enough, StimulusWindowTooSmall rather than fail
+    a failing search with a window reports StimulusWindowTooSmall, and report_after_fail works
+    reading a reclaimed entry raises StimulusWindowTooSmall
+    quiet search prints committed rules as they are committed, then the rest
+'''
+
+import contextlib
+import io
+import random
+
+import cli
+from purple import (
+    Integer, Record, Tuple, Model, Port, StimulusIOTestbenchBase, StimulusInput, StimulusOutput,
+    StimulusIOCheckerState,
+)
+from purple.verif import StimulusWindowTooSmall
+
+
+# a reorder buffer completing any held entry by tag, retiring in completion order by payload
+# so the search backtracks when it completes the wrong one of two equal tags
+class Entry(Record):
+    tag: Integer[2]
+    payload: Integer[16]
+
+
+class ReorderSpec(Model):
+    held: Tuple[Entry]
+    completed: Tuple[Integer[16]]
+    request: Port[Entry]
+    completion: Port[Integer[2]]
+    retirement: Port[Integer[16]]
+
+    rules: [accept, complete, retire]
+
+    def accept(self):
+        self.guard(len(self.held) < 4)
+        self.held.append(self.request)
+        self.print('accepted')
+
+    def complete(self, slot: Integer[4]):
+        self.guard(slot < len(self.held) and len(self.completed) < 2)
+        entry = self.held.pop(slot)
+        self.completion = entry.tag
+        self.completed.append(entry.payload)
+
+    def retire(self):
+        self.guard(self.completed)
+        self.retirement = self.completed.pop(0)
+
+
+class ReorderChecker(StimulusIOTestbenchBase):
+    requests: StimulusInput[Entry]
+    completions: StimulusOutput[Integer[2]]
+    retirements: StimulusOutput[Integer[16]]
+    dut: ReorderSpec[
+        _.request << requests.port_for_spec_input,
+        _.completion >> completions.port_for_spec_output,
+        _.retirement >> retirements.port_for_spec_output,
+    ]
+
+    def stimulus_inputs(self):
+        return (self.requests,)
+
+    def stimulus_outputs(self):
+        return (self.completions, self.retirements)
+
+
+def stimulus(num_entries, seed):
+    'list of (queue name, value, time_ps) from a reference reorder buffer'
+    rng = random.Random(seed)
+    held = []
+    completed = []
+    num_accepted = 0
+    time_ps = 0
+    events = []
+    while num_accepted < num_entries or held or completed:
+        time_ps += 1000
+        choice = rng.random()
+        if completed and (choice < 0.5 or len(completed) == 2 or num_accepted == num_entries and not held):
+            events.append(('retirements', completed.pop(0), time_ps))
+        elif num_accepted < num_entries and len(held) < 4 and (not held or choice < 0.8):
+            entry = Entry(tag = rng.randrange(2), payload = rng.randrange(16))
+            held.append(entry)
+            events.append(('requests', entry, time_ps))
+            num_accepted += 1
+        else:
+            entry = held.pop(rng.randrange(len(held)))
+            completed.append(entry.payload)
+            events.append(('completions', entry.tag, time_ps))
+    return events
+
+
+def num_kept(testbench):
+    return sum(len(sq.queue.shared_state.store) for sq in testbench.stimulus_inputs() + testbench.stimulus_outputs())
+
+
+def checked_as_it_arrives(events, history_window, chunk_ps = 10000, quiet = False, testbench = None):
+    '''push stimulus up to each multiple of chunk_ps and search it, as the implementation
+    simulation would; returns the checker state and the most stimulus entries kept'''
+    testbench = ReorderChecker() if testbench is None else testbench
+    checker_state = StimulusIOCheckerState(testbench, history_window = history_window, quiet = quiet)
+    max_kept = 0
+    time_ps = 0
+    i = 0
+    while True:
+        time_ps += chunk_ps
+        while i < len(events) and events[i][2] <= time_ps:
+            name, value, t = events[i]
+            getattr(testbench, name).queue.push(value, t)
+            i += 1
+        if i == len(events):
+            testbench.finalise_all_stimulus()
+        checker_state = testbench.checksearch(checker_state)
+        max_kept = max(max_kept, num_kept(testbench))
+        if not checker_state.waiting_for_input():
+            return checker_state, max_kept
+
+
+num_entries = 100 if cli.args.quick else 1000
+events = stimulus(num_entries, 1)
+
+print('window')
+with contextlib.redirect_stdout(io.StringIO()):
+    unbounded, max_kept = checked_as_it_arrives(events, None)
+    assert unbounded.passed() and max_kept == len(events) and unbounded.num_committed == 0
+    windowed, max_kept = checked_as_it_arrives(events, 8)
+assert windowed.passed()
+assert windowed.num_committed > 0 and len(windowed.rule_history) <= 8 + 30
+assert windowed.num_committed + len(windowed.rule_history) == len(unbounded.rule_history)
+assert max_kept < 60 < len(events)
+testbench = windowed.spec_testbench
+assert not testbench.any_unmatched_outputs()
+assert testbench.requests.queue.shared_state.num_reclaimed > 0
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    windowed.show('windowed', 0, 0)
+assert 'rules committed' in printed.getvalue()
+
+print('window too small')
+try:
+    with contextlib.redirect_stdout(io.StringIO()):
+        checked_as_it_arrives(events, 0)
+    assert False
+except StimulusWindowTooSmall:
+    pass
+
+print('failing')
+name, payload, time_ps = events[-1]
+assert name == 'retirements'
+bad_events = events[:-1] + [(name, (payload + 1) % 16, time_ps)]
+testbench = ReorderChecker()
+try:
+    with contextlib.redirect_stdout(io.StringIO()):
+        checked_as_it_arrives(bad_events, 8, testbench = testbench)
+    assert False
+except StimulusWindowTooSmall as e:
+    assert 'history_window 8' in str(e)
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    testbench.report_after_fail(4)
+assert 'last match' in printed.getvalue()
+with contextlib.redirect_stdout(io.StringIO()):
+    failed, _ = checked_as_it_arrives(bad_events, None)
+    assert failed.failed()
+
+print('reclaimed entry')
+testbench = ReorderChecker()
+for name,value,t in events[:20]:
+    getattr(testbench, name).queue.push(value, t)
+queue = testbench.requests.queue
+queue.shared_state.reclaim(2)
+try:
+    queue.peek()
+    assert False
+except StimulusWindowTooSmall:
+    pass
+assert len(queue) == len([e for e in events[:20] if e[0] == 'requests'])
+
+print('quiet')
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    quiet, _ = checked_as_it_arrives(events, 8, quiet = True)
+assert quiet.passed()
+assert printed.getvalue().count('accepted') == num_entries
@@ -0,0 +1,166 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for the trace of leaf changes
+
+checks
+    value of any leaf at any step, against the state after each step
+    changes to all leaves of a record between two times
+    queries only decompress the chunks they need
+    values decoded when a system is given
+    clocked simulator, with time in ps
+    after undo and checkpoint restore, values follow the timeline recorded last
+    unfinished trace file rejected
+'''
+
+import io
+import os
+import tempfile
+
+import cli
+from purple import Integer, Boolean, Tuple, Record, Model, Clock, AtomicRuleSimulator, ClockedSimulator
+from purple.checkpoint import encode_leaves
+from purple.tracing import TraceReader, TraceFormatError
+
+
+class Pair(Record):
+    a: Integer[8] = 0
+    b: Boolean = False
+
+
+class Traced(Model):
+    head: Integer[16] = 0
+    pair: Pair = Pair()
+    items: Tuple[Integer[8]]
+    rare: Integer[...] = 0
+    clk: Clock[move, set_pair]
+
+    rules: [move, set_pair, push, pop, bump_rare]
+
+    def move(self, n: Integer[1, 3]):
+        self.head = (self.head + n) % 16
+
+    def set_pair(self, a: Integer[8]):
+        self.guard(a != self.pair.a)
+        self.pair.a = a
+        self.pair.b = a % 2 == 1
+
+    def push(self, v: Integer[8]):
+        self.guard(len(self.items) < 4)
+        self.items.append(v)
+
+    def pop(self):
+        self.guard(self.items)
+        self.items.pop()
+
+    def bump_rare(self):
+        self.guard(self.head == 15 and self.pair.a == 7)
+        self.rare += 1
+
+
+def leaf_values(sim):
+    table = sim.system._dp_leaf_table
+    return {table.full_name(i):v for i,v in enumerate(encode_leaves(sim.system))}
+
+
+def run_recorded(sim, path, num_steps, step, **kwargs):
+    'run, recording the trace and the state after every step'
+    sim.record_trace(path, **kwargs)
+    states = {sim.trace_time(): leaf_values(sim)}
+    for _ in range(num_steps):
+        step(sim)
+        states[sim.trace_time()] = leaf_values(sim)
+    sim.stop_trace()
+    return states
+
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, 'trace')
+num_steps = 200 if cli.args.quick else 3000
+
+print('atomic')
+sim = AtomicRuleSimulator(Traced(), random_seed = 2)
+states = run_recorded(sim, path, num_steps, lambda s: s.run(1, show_print = False), chunk_size = 16)
+names = list(states[0])
+assert 'top.head' in names and 'top.pair.a' in names
+
+with TraceReader(path) as reader:
+    assert len(reader.chunks) > 10
+    assert reader.first_time == 0 and reader.last_time <= num_steps
+    for time in range(0, num_steps + 1, 7):
+        for name in names:
+            assert reader.value_at(name, time) == states[time][name], (name, time)
+
+    print('changes')
+    t1, t2 = num_steps // 4, num_steps // 2
+    expected = []
+    for time in range(t1, t2 + 1):
+        for name in ('top.pair.a', 'top.pair.b'):
+            if states[time][name] != states[time - 1][name]:
+                expected.append((time, name, states[time][name]))
+    assert reader.changes('top.pair', t1, t2) == expected
+    assert reader.changes('top.head') == [(0, 'top.head', 0)] + [
+        (t, 'top.head', states[t]['top.head']) for t in range(1, num_steps + 1)
+        if states[t]['top.head'] != states[t - 1]['top.head']
+    ]
+
+    print('chunks read')
+    reader.cache.clear()
+    reader.value_at('top.head', num_steps)
+    assert len(reader.cache) == 1
+    reader.cache.clear()
+    reader.changes('top.pair.a', t1, t1)
+    assert len(reader.cache) <= 2
+
+print('decoded')
+with TraceReader(path, sim.system) as reader:
+    assert reader.value_at('top.items', num_steps) == sim.system.items
+    assert reader.value_at('top.pair.b', num_steps) == sim.system.pair.b
+
+print('clocked')
+sim = ClockedSimulator(Traced(), dict(period_ps = 1000), random_seed = 3)
+states = run_recorded(sim, path, num_steps // 10, lambda s: s.run(cycles = 1, show_print = False))
+with TraceReader(path) as reader:
+    assert reader.last_time == sim.time_ps
+    # the initial values are recorded at time 0, before the first edge
+    assert reader.changes('top.head', 0, 0)[0] == (0, 'top.head', 0)
+    for time,values in states.items():
+        for name,value in values.items():
+            if time > 0:
+                assert reader.value_at(name, time + 500) == value
+
+print('undo and restore')
+sim = AtomicRuleSimulator(Traced(), random_seed = 4)
+sim.keep_history()
+sim.record_trace(path, chunk_size = 8)
+sim.run(50, show_print = False)
+saved = io.BytesIO()
+sim.save(saved)
+sim.run(30, show_print = False)
+sim.step_back(50)
+assert sim.num_invocations == 30
+sim.run(40, show_print = False)
+saved.seek(0)
+sim.restore(saved)
+final_values = leaf_values(sim)
+sim.stop_trace()
+with TraceReader(path) as reader:
+    for name,value in final_values.items():
+        assert reader.value_at(name, 50) == value
+
+print('unfinished')
+sim = AtomicRuleSimulator(Traced(), random_seed = 5)
+sim.record_trace(path)
+sim.run(10, show_print = False)
+try:
+    TraceReader(path)
+    assert False
+except TraceFormatError:
+    pass
+sim.stop_trace()
+TraceReader(path).close()
+os.remove(path)
+os.rmdir(directory)
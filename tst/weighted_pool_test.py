@@ -0,0 +1,142 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for weighted rule selection in the Atomic-Rule simulator
+
+checks
+    default weights give uniform selection per Rule, including parameterised rules
+    per-rule and per-component weights, changed during simulation
+    per-parameter-set weights, and resetting them with a weight for the whole rule
+    per-parameter-set weights in a parameter space too large to store densely
+    zero weights, including in the exhaustive fallback
+'''
+
+import cli
+import random
+from purple import Integer, Boolean, Model, AtomicRuleSimulator
+from purple.simulator import ParamWeights
+
+
+class Sub(Model):
+    count_a: Integer[...] = 0
+    count_b: Integer[...] = 0
+    count_b_flag: Integer[...] = 0
+
+    rules: [increment_a, increment_b]
+
+    def increment_a(self):
+        self.count_a += 1
+
+    def increment_b(self, flag: Boolean):
+        self.count_b += 1
+        if flag:
+            self.count_b_flag += 1
+
+
+class Top(Model):
+    sub: Sub
+    count: Integer[...] = 0
+    count_guarded: Integer[...] = 0
+
+    rules: [increment, guarded]
+
+    def increment(self):
+        self.count += 1
+
+    def guarded(self):
+        self.guard(self.count == 0 and self.count_guarded == 0)
+        self.count_guarded += 1
+
+
+def counts(system):
+    return dict(
+        a = system.sub.count_a,
+        b = system.sub.count_b,
+        flag = system.sub.count_b_flag,
+        top = system.count + system.count_guarded,
+    )
+
+def run(sim, n):
+    before = counts(sim.system)
+    sim.run(n, show_print = False)
+    return {k:v - before[k] for k,v in counts(sim.system).items()}
+
+def near(value, expected):
+    return abs(value - expected) < 0.1 * expected + 30
+
+
+n = 2000 if cli.args.quick else 20000
+
+print('default weights')
+sim = AtomicRuleSimulator(Top(), random_seed = 1, weighted = True)
+assert len(sim.weighted_pool) == len(sim.all_rules) == 5
+c = run(sim, n)
+print('   ', c)
+# increment_b has 2 rules, guarded is chosen but (almost) always fails
+assert near(c['a'], n / 4) and near(c['b'], 2 * n / 4) and near(c['top'], n / 4)
+
+print('rule weight')
+sim.weighted_pool.set_rule_weight(3, method_name = 'increment_a')
+c = run(sim, n)
+print('   ', c)
+assert near(c['a'], 3 * n / 6) and near(c['b'], 2 * n / 6) and near(c['top'], n / 6)
+
+print('component weight')
+sim.weighted_pool.set_component_weight(sim.system.sub, 0.5)
+c = run(sim, n)
+print('   ', c)
+assert near(c['a'], 1.5 * n / 3.5) and near(c['b'], n / 3.5) and near(c['top'], n / 3.5)
+
+print('zero weights')
+sim.weighted_pool.set_component_weight(sim.system, 0)
+c = run(sim, 100)
+assert c == dict(a = 0, b = 0, flag = 0, top = 0)
+assert sim.deadlocked
+
+print('parameter set weight')
+sim = AtomicRuleSimulator(Top(), random_seed = 3, weighted = True)
+sim.weighted_pool.set_rule_weight(4, method_name = 'increment_b', params = dict(flag = True))
+c = run(sim, n)
+print('   ', c)
+assert near(c['a'], n / 7) and near(c['b'], 5 * n / 7) and near(c['flag'], 4 * n / 7) and near(c['top'], n / 7)
+sim.weighted_pool.set_rule_weight(0, component = sim.system.sub, params = dict(flag = True))
+c = run(sim, n)
+print('   ', c)
+assert c['flag'] == 0 and near(c['a'], n / 3) and near(c['b'], n / 3)
+sim.weighted_pool.set_rule_weight(1, method_name = 'increment_b')
+c = run(sim, n)
+print('   ', c)
+assert near(c['b'], 2 * n / 4) and near(c['flag'], n / 4)
+
+print('sparse parameter set weights')
+size = 10 ** 12
+weights = ParamWeights(size, 1.0)
+for param_index in (0, 5, 6, size - 1):
+    weights.set(param_index, 0.0)
+weights.set(7, size / 2)
+assert weights.total() == size - 5 + size / 2 and weights.num_weighted() == size - 4
+assert weights.weight(5) == 0 and weights.weight(7) == size / 2 and weights.weight(8) == 1
+assert [weights.nth_default(i) for i in range(5)] == [1, 2, 3, 4, 8]
+assert weights.nth_default(size - 6) == size - 2
+rand_gen = random.Random(4)
+chosen = [weights.choose(rand_gen) for _ in range(n)]
+print('   ', sum(c == 7 for c in chosen))
+assert near(sum(c == 7 for c in chosen), n / 3)
+assert not any(c in (0, 5, 6, size - 1) for c in chosen)
+weights.set(7, 0.0)
+weights.default = 0.0
+weights.set(size - 1, 2.0)
+assert weights.total() == 2 and weights.num_weighted() == 1
+assert all(weights.choose(rand_gen) == size - 1 for _ in range(100))
+
+print('exhaustive fallback only finds rules with weight')
+sim = AtomicRuleSimulator(Top(), random_seed = 2, weighted = True)
+sim.weighted_pool.set_component_weight(sim.system.sub, 0)
+sim.weighted_pool.set_rule_weight(0, method_name = 'increment')
+c = run(sim, 10)
+# guarded can fire only once, then nothing has weight and can run
+assert c == dict(a = 0, b = 0, flag = 0, top = 1)
+assert sim.deadlocked
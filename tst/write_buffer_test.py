@@ -0,0 +1,101 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Purple Tests
+======================
+
+test for buffered writes in clock events
+
+checks
+    same results and model state hash as unbuffered clock events
+    rules see their own writes and the pre-edge values of other rules' writes
+    guarded rules and rules raising exceptions leave no changes
+    same leaf written by two rules on one edge is reported
+'''
+
+import cli
+from purple import Integer, Tuple, Model, Clock, ClockedSimulator
+from purple.clock import WriteConflict
+
+
+class Swapper(Model):
+    x: Integer[...] = 1
+    y: Integer[...] = 2
+    history: Tuple[Integer[...]]
+    steps: Integer[...] = 0
+    phase: Integer[...] = 0
+    clk: Clock[move_x, move_y, log, maybe]
+
+    def move_x(self):
+        # pre-edge y, whatever order the rules are invoked in
+        self.x = self.y + 1
+        self.x = self.x * 2
+
+    def move_y(self, n: Integer[3]):
+        self.y = self.x + n
+
+    def log(self):
+        self.guard(self.steps % 3 != 2)
+        self.history.append(self.x)
+        if len(self.history) > 4:
+            self.history.pop(0)
+        self.steps += 1
+
+    def maybe(self, fail: Integer[2]):
+        # writes then guard fails, sometimes
+        self.phase = self.steps
+        self.guard(not fail)
+        self.phase = 0 if self.phase >= 5 else self.phase + 1
+        self.guard(self.phase != 3)
+
+
+def state(system):
+    return system.x, system.y, tuple(system.history), system.steps, system.phase, system._dp_model_state_hash
+
+
+def run(buffered, num_cycles):
+    sim = ClockedSimulator(Swapper(), dict(period_ps = 1000), random_seed = 3, buffered_writes = buffered)
+    states = []
+    for _ in sim.run_one_step(sim.sim_end_time(cycles = num_cycles), False, False):
+        states.append(state(sim.system))
+    return states
+
+
+num_cycles = 50 if cli.args.quick else 1000
+
+print('same as unbuffered')
+unbuffered = run(False, num_cycles)
+buffered = run(True, num_cycles)
+assert unbuffered == buffered
+# both from pre-edge values x = 1, y = 2
+assert buffered[0][0] == 6 and buffered[0][1] in (1, 2, 3)
+
+print('exception in a rule')
+class Exploding(Swapper):
+    def move_y(self, n: Integer[3]):
+        self.y = 100
+        assert n < 2, 'boom'
+        self.y = self.x + n
+
+sim = ClockedSimulator(Exploding(), dict(period_ps = 1000), random_seed = 1, buffered_writes = True)
+try:
+    sim.run(cycles = 100, show_print = False)
+    assert False
+except AssertionError as e:
+    assert str(e) == 'boom'
+assert sim.system.y != 100
+
+print('conflict')
+class Conflicting(Swapper):
+    clk: Clock[move_x, move_y, also_x]
+
+    def also_x(self):
+        self.guard(self.y > 10)
+        self.x = 0
+
+sim = ClockedSimulator(Conflicting(), dict(period_ps = 1000), random_seed = 2, buffered_writes = True)
+try:
+    sim.run(cycles = 100, show_print = False)
+    assert False
+except WriteConflict as e:
+    assert 'top.x' in str(e) and 'also_x' in str(e) and 'move_x' in str(e)
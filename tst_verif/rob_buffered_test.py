@@ -0,0 +1,50 @@
+'''
+MIT Licence: Copyright (c) 2025 Baya Systems <https://bayasystems.com>
+
+Buffered-write clock events on the ROB implementations and checker
+
+checks
+    both ROB implementations reach the same state with and without buffered writes
+    the checking simulation passes with buffered writes on the implementation
+'''
+
+import random
+from rob_implementation_test import Implementation_Testbench, RobImplSimulator
+from rob_simple_impl_test import Simple_Implementation_Testbench
+from rob_checker_test import Config, RobCheckerSimulator
+from cli import args
+
+
+def final_state(testbench_class, seed, n, buffered):
+    tb = testbench_class()
+    sim = RobImplSimulator(tb, dict(frequency_GHz = 1.0, name = 'clk'), random_seed = seed, buffered_writes = buffered)
+    sim.run(cycles_of_fastest_clock = n, show_print = False, print_headers = False)
+    return sim.time_ps, tb._dp_model_state_hash
+
+
+class BufferedRobCheckerSimulator(RobCheckerSimulator):
+    def run_one_step(self, final_time_ps, show_print, print_headers):
+        while True:
+            clock, clock_name = min(self.clocks)
+            if clock.next_event_time_ps > final_time_ps:
+                break
+            self.time_ps = clock.next_event_time_ps
+            self.spec_testbench.copy_implementation_io(self.system, self.time_ps)
+            selected_rules = self.select_rules(clock, clock_name)
+            clock.event(selected_rules, show_print, print_headers, buffered = True)
+            yield
+
+
+if __name__ == args.test_name + '_test':
+    n = 100 if args.quick else 2000
+    for tbc in (Implementation_Testbench, Simple_Implementation_Testbench):
+        seed = random.randrange(0x1_0000_0000)
+        print(tbc.__name__, 'seed =', seed)
+        plain = final_state(tbc, seed, n, False)
+        buffered = final_state(tbc, seed, n, True)
+        assert plain == buffered, f'{tbc.__name__} differs with buffered writes, seed = {seed}'
+
+    print('checker')
+    sim = BufferedRobCheckerSimulator()
+    result = sim.run_checking_simulation(Config.total_ps, Config.ps_per_checksearch)
+    assert result, f'failed with seed = {sim.seed}'